@@ -1,10 +1,152 @@
+import os
 from functools import lru_cache
 from app.services.pipeline_service import RAGPipelineService
 from app.services.embedder_service import EmbedderService
 from app.services.qdrant_service import QdrantService
+from app.services.llm_cache import LLMResponseCache
+from app.services.search_cache import SearchResultCache
+from app.services.cache_backends import create_cache_backend
+from app.services.single_flight import SingleFlight
+from app.services.admission_controller import AdmissionController
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.llm_generator import LLMGenerator
+from app.services.global_pipeline_monitor import GlobalPipelineMonitor
+from app.services.faq_index import FAQIndex
+from app.services.title_index import TitleIndex
+from app.services.collection_versions import AliasWatcher, CollectionManager
+from app.services.cache_warmer import CacheWarmer
+from app.services.usage_accounting import UsageAccountant
+from app.core.logging import logger
+from app.core.config import settings
+from app.core.startup_profiler import StartupProfiler
 
 _pipeline_service_judgement = None
 _pipeline_service_laws = None
+_llm_cache = None
+_search_cache = None
+_query_flight = SingleFlight()
+_admission_controller = None
+_llm_breaker = None
+_usage_accountant = None
+_llm_generator = None
+_embedder_service = None
+
+def get_embedder_service() -> EmbedderService:
+    """Embedder shared by both pipelines, so the model is loaded once."""
+    global _embedder_service
+    if _embedder_service is None:
+        _embedder_service = EmbedderService()
+    return _embedder_service
+
+def preload_shared_models() -> None:
+    """
+    Load model weights and the tokenizer in the gunicorn master before workers fork, so every worker
+    shares them copy-on-write. No inference runs here: thread pools and connections are created per worker.
+    """
+    import tiktoken
+    get_embedder_service().model
+    tiktoken.get_encoding("cl100k_base")
+
+def warm_up_services(profiler: StartupProfiler) -> None:
+    """Load the embedding model and tokenizer before serving, recording each step in the profiler."""
+    timings = get_embedder_service().warm_up()
+    profiler.record("warm_up.embedder_load", timings["load_ms"])
+    profiler.record("warm_up.embedder_first_encode", timings["first_encode_ms"])
+    with profiler.phase("warm_up.tokenizer"):
+        GlobalPipelineMonitor().encoding
+
+def get_llm_generator() -> LLMGenerator:
+    """LLM provider chain shared by both pipelines, so provider latency history is shared too."""
+    global _llm_generator
+    if _llm_generator is None:
+        _llm_generator = LLMGenerator.from_settings()
+    return _llm_generator
+
+def get_admission_controller() -> AdmissionController:
+    """Admission controller bounding in-flight LLM calls for both pipelines, or None when disabled."""
+    global _admission_controller
+    if _admission_controller is None and settings.ADMISSION_ENABLED:
+        _admission_controller = AdmissionController(
+            max_concurrent=settings.ADMISSION_MAX_CONCURRENT,
+            max_per_user=settings.ADMISSION_MAX_PER_USER,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            max_wait_seconds=settings.ADMISSION_MAX_WAIT_SECONDS
+        )
+    return _admission_controller
+
+def get_llm_breaker() -> CircuitBreaker:
+    """Circuit breaker around LLM calls of both pipelines, which share the provider chain, or None when disabled."""
+    global _llm_breaker
+    if _llm_breaker is None and settings.LLM_BREAKER_ENABLED:
+        _llm_breaker = CircuitBreaker(
+            window=settings.LLM_BREAKER_WINDOW,
+            min_calls=settings.LLM_BREAKER_MIN_CALLS,
+            failure_rate=settings.LLM_BREAKER_FAILURE_RATE,
+            slow_call_ms=settings.LLM_BREAKER_SLOW_MS or None,
+            open_seconds=settings.LLM_BREAKER_OPEN_SECONDS
+        )
+    return _llm_breaker
+
+def get_usage_accountant() -> UsageAccountant:
+    """Per-user and per-pipeline usage accounting with budgets, or None when disabled."""
+    global _usage_accountant
+    if _usage_accountant is None and settings.USAGE_ACCOUNTING:
+        _usage_accountant = UsageAccountant(
+            windows=[float(window) for window in settings.USAGE_WINDOWS.split(",") if window.strip()],
+            bucket_seconds=settings.USAGE_BUCKET_SECONDS,
+            db_path=settings.USAGE_DB,
+            flush_seconds=settings.USAGE_FLUSH_SECONDS,
+            budget_window_seconds=settings.USAGE_BUDGET_WINDOW_SECONDS,
+            max_requests=settings.USAGE_USER_MAX_REQUESTS,
+            max_tokens=settings.USAGE_USER_MAX_TOKENS,
+            max_llm_seconds=settings.USAGE_USER_MAX_LLM_SECONDS
+        )
+    return _usage_accountant
+
+def get_query_flight() -> SingleFlight:
+    """Single-flight group that coalesces concurrent identical queries."""
+    return _query_flight
+
+def get_llm_cache() -> LLMResponseCache:
+    """LLM response cache shared by both pipelines, or None when disabled."""
+    global _llm_cache
+    if _llm_cache is None and settings.LLM_CACHE_ENABLED:
+        _llm_cache = LLMResponseCache(
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.LLM_CACHE_TTL_SECONDS or None,
+            backend=create_cache_backend(
+                settings.LLM_CACHE_DB, table="llm_cache", max_entries=settings.LLM_CACHE_DB_MAX_ENTRIES
+            )
+        )
+    return _llm_cache
+
+def search_cache_location() -> str:
+    """
+    SEARCH_CACHE_DB, else LLM_CACHE_DB: a Redis URL is shared as is, a SQLite file gets a sibling file
+    ("<name>.search<ext>") so vector searches and LLM calls do not contend for the same write lock.
+    """
+    if settings.SEARCH_CACHE_DB or not settings.LLM_CACHE_DB:
+        return settings.SEARCH_CACHE_DB
+    if settings.LLM_CACHE_DB.startswith(("redis://", "rediss://", "unix://")):
+        return settings.LLM_CACHE_DB
+    root, extension = os.path.splitext(settings.LLM_CACHE_DB)
+    return f"{root}.search{extension}"
+
+def get_search_cache() -> SearchResultCache:
+    """Search result cache shared by both collections, or None when disabled."""
+    global _search_cache
+    if _search_cache is None and settings.SEARCH_CACHE_ENABLED:
+        _search_cache = SearchResultCache(
+            max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS or None,
+            quantum=settings.SEARCH_CACHE_QUANTUM,
+            backend=create_cache_backend(
+                search_cache_location(),
+                table="search_cache",
+                max_entries=settings.SEARCH_CACHE_DB_MAX_ENTRIES
+            )
+        )
+    return _search_cache
 
 def get_judgement_pipeline_service() -> RAGPipelineService:
     global _pipeline_service_judgement
@@ -15,12 +157,17 @@ def get_judgement_pipeline_service() -> RAGPipelineService:
 @lru_cache
 async def initialize_judgement_pipeline_service(qdrant_client) -> None:
     global _pipeline_service_judgement
-    qdrant_service = QdrantService(client=qdrant_client, collection_name="judgement")
-    embedder_service = EmbedderService()
+    qdrant_service = QdrantService(client=qdrant_client, collection_name="judgement", search_cache=get_search_cache())
+    embedder_service = get_embedder_service()
     _pipeline_service_judgement = RAGPipelineService(
         qdrant_service=qdrant_service,
         embedder_service=embedder_service,
-        type="judgement"
+        type="judgement",
+        generator=get_llm_generator(),
+        llm_cache=get_llm_cache(),
+        admission_controller=get_admission_controller(),
+        circuit_breaker=get_llm_breaker(),
+        title_index=create_title_index()
     )
 
 def get_laws_pipeline_service() -> RAGPipelineService:
@@ -32,10 +179,85 @@ def get_laws_pipeline_service() -> RAGPipelineService:
 @lru_cache
 async def initialize_laws_pipeline_service(qdrant_client) -> None:
     global _pipeline_service_laws
-    qdrant_service = QdrantService(client=qdrant_client, collection_name="laws")
-    embedder_service = EmbedderService()
+    qdrant_service = QdrantService(client=qdrant_client, collection_name="laws", search_cache=get_search_cache())
+    embedder_service = get_embedder_service()
     _pipeline_service_laws = RAGPipelineService(
         qdrant_service=qdrant_service,
         embedder_service=embedder_service,
-        type="law"
-    )
\ No newline at end of file
+        type="law",
+        generator=get_llm_generator(),
+        llm_cache=get_llm_cache(),
+        admission_controller=get_admission_controller(),
+        circuit_breaker=get_llm_breaker(),
+        faq_index=create_faq_index(qdrant_client),
+        faq_rewrite=settings.FAQ_REWRITE
+    )
+
+def create_faq_index(qdrant_client) -> FAQIndex:
+    """FAQ index over the stored laws questions, or None when disabled or not built yet."""
+    if not settings.FAQ_ENABLED:
+        return None
+    if not qdrant_client.collection_exists(settings.FAQ_COLLECTION_NAME):
+        logger.warning(
+            f"FAQ fast path disabled: collection {settings.FAQ_COLLECTION_NAME} does not exist "
+            "(build it with `python run_faq_index.py build`)"
+        )
+        return None
+    return FAQIndex(QdrantService(client=qdrant_client, collection_name="faq"), threshold=settings.FAQ_THRESHOLD)
+
+def create_title_index() -> TitleIndex:
+    """Title index of the judgements, or None when disabled or not built yet."""
+    if not settings.TITLE_INDEX_ENABLED:
+        return None
+    if not os.path.exists(settings.TITLE_INDEX_PATH):
+        logger.warning(
+            f"Title lookup disabled: {settings.TITLE_INDEX_PATH} does not exist "
+            "(build it with `python run_title_index.py build`)"
+        )
+        return None
+    index = TitleIndex.load(settings.TITLE_INDEX_PATH, threshold=settings.TITLE_MATCH_THRESHOLD)
+    logger.info(f"Loaded title index: {index.stats()}")
+    return index
+
+def create_alias_watcher(qdrant_client) -> AliasWatcher:
+    """Watcher of both collection aliases that refreshes per-collection state when a reindex swaps one."""
+    manager = CollectionManager(qdrant_client)
+    watcher = AliasWatcher(
+        manager, [settings.COLLECTION_NAME, settings.COLLECTION_NAME2], settings.COLLECTION_WATCH_SECONDS
+    )
+
+    def refresh_after_swap(alias: str, previous: str, collection_name: str):
+        invalidate_search_results(alias, collection_name)
+        # Raises (and is logged) if the new version was built with another model than this process embeds with
+        manager.check(alias)
+        # Point ids are reassigned by a reindex, so the title index of the old version points at the wrong documents
+        if alias == settings.COLLECTION_NAME and _pipeline_service_judgement is not None:
+            _pipeline_service_judgement.title_index = create_title_index()
+
+    def invalidate_search_results(alias: str, collection_name: str):
+        # Versioned by the registry, so every worker (and the shared cache tier) switches to the same keys
+        search_cache = get_search_cache()
+        if search_cache is not None:
+            search_cache.set_version(alias, f"{collection_name}:{watcher.epochs.get(alias, 0)}")
+
+    for alias, collection_name in watcher.current.items():
+        if collection_name is not None:
+            invalidate_search_results(alias, collection_name)
+    watcher.on_swap(refresh_after_swap)
+    watcher.on_write(invalidate_search_results)
+    return watcher
+
+def create_cache_warmer() -> CacheWarmer:
+    """Warm-up of the caches from the query log, or None when the log or the warm-up is disabled."""
+    query_log = GlobalPipelineMonitor().query_log
+    if query_log is None or settings.CACHE_WARMUP_QUERIES <= 0:
+        return None
+    return CacheWarmer(
+        query_log,
+        {"judgement": get_judgement_pipeline_service(), "laws": get_laws_pipeline_service()},
+        limit=settings.CACHE_WARMUP_QUERIES,
+        min_count=settings.CACHE_WARMUP_MIN_COUNT,
+        concurrency=settings.CACHE_WARMUP_CONCURRENCY,
+        budget_seconds=settings.CACHE_WARMUP_SECONDS,
+        generate=settings.CACHE_WARMUP_GENERATE
+    )
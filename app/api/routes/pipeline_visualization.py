@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Request, HTTPException, Query
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from sse_starlette.sse import EventSourceResponse
@@ -6,7 +6,11 @@ import json
 import asyncio
 import os
 import time
+from typing import Optional
 from app.services.global_pipeline_monitor import GlobalPipelineMonitor
+from app.api.dependencies import (
+    get_llm_cache, get_search_cache, get_query_flight, get_admission_controller, get_llm_breaker, get_llm_generator, get_laws_pipeline_service
+)
 from app.core.logging import logger
 
 router = APIRouter()
@@ -72,4 +76,61 @@ async def monitor_pipeline(request: Request):
             await monitor.unregister_client(client_queue)
     
     # Return the EventSourceResponse
-    return EventSourceResponse(event_generator())
\ No newline at end of file
+    return EventSourceResponse(event_generator())
+
+@router.get("/pipeline/history")
+async def get_pipeline_history(
+    limit: int = Query(50, ge=1, le=1000),
+    pipeline_type: Optional[str] = None,
+    since: Optional[float] = None
+):
+    """
+    Return recently completed pipeline traces (stage timings, token counts, pipeline type, user_id),
+    newest first. The visualizer loads this on connect so past runs are visible after the fact.
+    """
+    monitor = GlobalPipelineMonitor()
+    traces = monitor.trace_store.history(limit=limit, pipeline_type=pipeline_type, since=since)
+    return {"count": len(traces), "traces": traces}
+
+@router.get("/pipeline/aggregate")
+async def get_pipeline_aggregate(
+    window_seconds: float = Query(3600, gt=0),
+    pipeline_type: Optional[str] = None
+):
+    """
+    Return per-stage latency percentiles (p50/p95/p99) and token statistics
+    for pipeline runs completed within the trailing time window.
+    Long windows are read from PIPELINE_HISTORY_DB, on a worker thread.
+    """
+    monitor = GlobalPipelineMonitor()
+    return await asyncio.to_thread(
+        monitor.trace_store.aggregate, window_seconds=window_seconds, pipeline_type=pipeline_type
+    )
+
+@router.get("/pipeline/metrics")
+async def get_pipeline_metrics():
+    """
+    Return live counters of the components that sit in front of the pipeline:
+    request coalescing (executions vs coalesced requests), the search result and LLM response caches,
+    LLM admission control (in-flight calls, queue depth, wait times, rejections), the LLM circuit breaker,
+    per-provider LLM latency with hedging and fallback counts, FAQ fast path hits and the query log.
+    """
+    llm_cache = get_llm_cache()
+    search_cache = get_search_cache()
+    query_log = GlobalPipelineMonitor().query_log
+    admission_controller = get_admission_controller()
+    llm_breaker = get_llm_breaker()
+    try:
+        faq_index = get_laws_pipeline_service().faq_index
+    except RuntimeError:
+        faq_index = None
+    return {
+        "single_flight": get_query_flight().stats(),
+        "search_cache": search_cache.stats() if search_cache is not None else None,
+        "llm_cache": llm_cache.stats() if llm_cache is not None else None,
+        "admission": admission_controller.stats() if admission_controller is not None else None,
+        "llm_breaker": llm_breaker.stats() if llm_breaker is not None else None,
+        "llm": get_llm_generator().stats(),
+        "faq": faq_index.stats() if faq_index is not None else None,
+        "query_log": query_log.stats() if query_log is not None else None
+    }
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-from app.api.dependencies import get_judgement_pipeline_service, get_laws_pipeline_service
-from app.services.pipeline_service import RAGPipelineService
+from typing import List, Optional, Dict, Any, Tuple
+from app.api.dependencies import (
+    get_judgement_pipeline_service, get_laws_pipeline_service, get_query_flight, get_usage_accountant
+)
+from app.services.pipeline_service import RAGPipelineService, faq_document
 from app.services.global_pipeline_monitor import GlobalPipelineMonitor
-from app.core.exceptions import QueryProcessingError
+from app.services.query_log import normalize_query
+from app.core.exceptions import QueryProcessingError, AdmissionRejectedError
 from app.core.logging import logger
 import time
 
@@ -22,19 +25,168 @@ class Document(BaseModel):
 class QueryRequest(BaseModel):
     query: str
     user_id: Optional[str] = None
+    include_content: bool = Field(True, description="Return the text of the source documents")
+    snippet_chars: Optional[int] = Field(None, ge=0, description="Truncate each document's text to this many characters")
+    fields: Optional[List[str]] = Field(None, description="Metadata fields to return (all when omitted)")
 
 class QueryResponse(BaseModel):
     answer: str
     documents: List[Dict[str, Any]] = []
     time_taken: float
+    source: str = "rag"
+    degraded: bool = Field(False, description="The answer is an extractive summary of the documents, not generated")
+
+def project_documents(
+    documents: List[Dict[str, Any]],
+    include_content: bool = True,
+    snippet_chars: Optional[int] = None,
+    fields: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """Response documents reduced to the requested content and metadata fields."""
+    projected = []
+    for document in documents:
+        metadata = document.get("metadata", {})
+        if fields is not None:
+            metadata = {field: metadata[field] for field in fields if field in metadata}
+        item: Dict[str, Any] = {"metadata": metadata}
+        if include_content:
+            content = document.get("content", "")
+            item["content"] = content if snippet_chars is None else content[:snippet_chars]
+        projected.append(item)
+    return projected
+
+def flight_key(
+    pipeline_service: RAGPipelineService,
+    pipeline_type: str,
+    query_text: str,
+    user_id: Optional[str] = None,
+    metadata_fields: Optional[List[str]] = None
+) -> Tuple:
+    """
+    Single-flight key of a query. Metadata fields are selected in the database, so queries with different
+    selections don't coalesce. With admission control, LLM calls are admitted under the caller's user_id, so
+    each user's queries coalesce only with their own: otherwise one user at the per-user limit would pass
+    their 429 to others, and followers would get answers without taking a per-user slot.
+    """
+    key = (pipeline_type, normalize_query(query_text), tuple(metadata_fields) if metadata_fields is not None else None)
+    if pipeline_service.admission_controller is not None and user_id is not None:
+        key += (user_id,)
+    return key
+
+async def execute_query(
+    query_text: str,
+    pipeline_service: RAGPipelineService,
+    user_id: Optional[str] = None,
+    metadata_fields: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Run embedding, search, context building and generation, broadcasting stage events."""
+    monitor = GlobalPipelineMonitor()
+
+    # Track embedding generation
+    embedding_start = time.time()
+    await monitor.start_embedding()
+    query_embedding = await pipeline_service.embedder_service.get_query_embedding(query_text)
+    embedding_end = time.time()
+    embedding_time_ms = (embedding_end - embedding_start) * 1000
+    await monitor.complete_embedding(len(query_embedding), embedding_time_ms)
+
+    # FAQ fast path: a confident match with a stored question skips retrieval and context building
+    faq_answer = await pipeline_service.answer_from_faq(query_text, query_embedding, user_id)
+    if faq_answer is not None:
+        match = faq_answer["match"]
+        answer_tokens = await monitor.complete_faq_answer(
+            match.question, match.score, faq_answer["answer"], faq_answer["lookup_ms"] + faq_answer["rewrite_ms"]
+        )
+        return {
+            "answer": faq_answer["answer"],
+            "documents": [faq_document(match)],
+            "stage_metrics": {
+                "embedding": embedding_time_ms,
+                "search": faq_answer["lookup_ms"],
+                "context": 0.0,
+                "llm": faq_answer["rewrite_ms"]
+            },
+            "context_tokens": 0,
+            "answer_tokens": answer_tokens,
+            "llm_cached": faq_answer["llm_cached"],
+            "retrieval": None,
+            "compression": None,
+            "source": faq_answer["source"],
+            "degraded": None,
+            "llm_called": faq_answer["source"] == "faq_rewrite" and not faq_answer["llm_cached"],
+            "rewrite_skipped": faq_answer["rewrite_skipped"],
+            "faq_score": match.score
+        }
+    
+    # Track vector search
+    search_start = time.time()
+    await monitor.start_search()
+    search_results, selection = await pipeline_service.retrieve(query_embedding, metadata_fields, query_text)
+    search_end = time.time()
+    search_time_ms = (search_end - search_start) * 1000
+    await monitor.complete_search(len(search_results), search_time_ms, selection)
+    
+    # Track context building
+    context_start = time.time()
+    await monitor.start_context_building()
+    documents = [{"content": result.payload["content"]} for result in search_results]
+    documents, compression = await pipeline_service.build_context(query_embedding, documents)
+    
+    # Calculate combined context size
+    combined_context = "\n".join([document["content"] for document in documents])
+    context_end = time.time()
+    context_time_ms = (context_end - context_start) * 1000
+    context_tokens = await monitor.complete_context_building(combined_context, context_time_ms, compression)
+    
+    # Track LLM generation
+    llm_start = time.time()
+    await monitor.start_llm_generation()
+    answer, llm_cached, degraded = await pipeline_service.generate_answer_within_deadline(query_text, documents, user_id)
+    if degraded is not None:
+        # Past the deadline or with the LLM unavailable: answer from the retrieved documents alone
+        answer = await pipeline_service.extractive_summary(query_embedding, documents)
+    llm_end = time.time()
+    llm_time_ms = (llm_end - llm_start) * 1000
+    answer_tokens = await monitor.complete_llm_generation(answer, llm_time_ms, llm_cached)
+
+    return {
+        "answer": answer,
+        "documents": [
+            {
+                "content": result.payload["content"],
+                "metadata": result.payload.get("metadata", {})
+            } for result in search_results
+        ],
+        "stage_metrics": {
+            "embedding": embedding_time_ms,
+            "search": search_time_ms,
+            "context": context_time_ms,
+            "llm": llm_time_ms
+        },
+        "context_tokens": context_tokens,
+        "answer_tokens": answer_tokens,
+        "llm_cached": llm_cached,
+        "retrieval": selection,
+        "compression": compression,
+        "source": "rag",
+        "degraded": degraded,
+        "llm_called": not llm_cached and degraded != "circuit_open"
+    }
 
 async def monitored_process_query(
     query_text: str, 
     pipeline_service: RAGPipelineService,
     pipeline_type: str,
-    user_id: Optional[str] = None
+    user_id: Optional[str] = None,
+    include_content: bool = True,
+    snippet_chars: Optional[int] = None,
+    fields: Optional[List[str]] = None
 ) -> Dict[str, Any]:
-    """Process a query while monitoring and broadcasting pipeline events."""
+    """
+    Process a query while monitoring and broadcasting pipeline events.
+    Concurrent identical queries share one execution; each caller still gets its own
+    new_query and complete events, timed from its own arrival, and its own document projection.
+    """
     start_time = time.time()
     
     # Get the global pipeline monitor
@@ -43,82 +195,69 @@ async def monitored_process_query(
     try:
         # Notify that a new query is being processed
         await monitor.new_query(query_text, pipeline_type, user_id)
-        
-        # Track embedding generation
-        embedding_start = time.time()
-        await monitor.start_embedding()
-        query_embedding = await pipeline_service.embedder_service.get_query_embedding(query_text)
-        embedding_end = time.time()
-        embedding_time_ms = (embedding_end - embedding_start) * 1000
-        await monitor.complete_embedding(len(query_embedding), embedding_time_ms)
-        
-        # Track vector search
-        search_start = time.time()
-        await monitor.start_search()
-        search_results = await pipeline_service.qdrant_service.search_similar(query_embedding)
-        search_end = time.time()
-        search_time_ms = (search_end - search_start) * 1000
-        await monitor.complete_search(len(search_results), search_time_ms)
-        
-        # Track context building
-        context_start = time.time()
-        await monitor.start_context_building()
-        pipeline_input = {
-            "prompt_builder": {
-                "question": query_text,
-                "documents": [
-                    {"content": result.payload["content"]} for result in search_results
-                ]
-            }
-        }
-        
-        # Calculate combined context size
-        combined_context = "\n".join([result.payload["content"] for result in search_results])
-        context_end = time.time()
-        context_time_ms = (context_end - context_start) * 1000
-        await monitor.complete_context_building(combined_context, context_time_ms)
-        
-        # Track LLM generation
-        llm_start = time.time()
-        await monitor.start_llm_generation()
-        result = pipeline_service.pipeline.run(pipeline_input)
-        answer = result["llm"]["replies"][0]
-        llm_end = time.time()
-        llm_time_ms = (llm_end - llm_start) * 1000
-        await monitor.complete_llm_generation(answer, llm_time_ms)
+        usage = get_usage_accountant()
+        if usage is not None:
+            usage.check(user_id)
+
+        metadata_fields = sorted(set(fields)) if fields is not None else None
+        result, coalesced = await get_query_flight().do(
+            flight_key(pipeline_service, pipeline_type, query_text, user_id, metadata_fields),
+            lambda: execute_query(query_text, pipeline_service, user_id, metadata_fields)
+        )
+        answer = result["answer"]
+        if usage is not None:
+            # Coalesced callers and cache hits cost no LLM tokens or time of their own
+            charged = result["llm_called"] and not coalesced
+            usage.record(
+                user_id,
+                pipeline_type,
+                prompt_tokens=result["context_tokens"] if charged else 0,
+                completion_tokens=result["answer_tokens"] if charged and result["degraded"] is None else 0,
+                llm_ms=result["stage_metrics"]["llm"] if charged else 0.0
+            )
         
         response = {
             "answer": answer,
-            "documents": [
-                {
-                    "content": result.payload["content"],
-                    "metadata": result.payload.get("metadata", {})
-                } for result in search_results
-            ]
+            "documents": project_documents(result["documents"], include_content, snippet_chars, metadata_fields),
+            "source": result["source"],
+            "degraded": result["degraded"] is not None
         }
         
         # Complete the pipeline
         end_time = time.time()
         total_time_ms = (end_time - start_time) * 1000
 
-        # Collect all stage metrics
-        stage_metrics = {
-            "embedding": embedding_time_ms,
-            "search": search_time_ms,
-            "context": context_time_ms,
-            "llm": llm_time_ms
-        }
-
         # Record query info for reference
         query_info = {
             "query": query_text,
-            "pipeline_type": pipeline_type
+            "pipeline_type": pipeline_type,
+            "user_id": user_id or "anonymous",
+            "context_tokens": result["context_tokens"],
+            "answer_tokens": result["answer_tokens"],
+            "llm_cached": result["llm_cached"],
+            "coalesced": coalesced,
+            "source": result["source"]
         }
+        if result["retrieval"]:
+            query_info["retrieval_rule"] = result["retrieval"]["rule"]
+            query_info["retrieved_k"] = result["retrieval"]["k"]
+            query_info["top_score"] = result["retrieval"]["scores"][0] if result["retrieval"]["scores"] else None
+            query_info["duplicates_collapsed"] = result["retrieval"]["duplicates_collapsed"]
+            query_info["title_matches"] = result["retrieval"]["title_matches"]
+        if result["degraded"] is not None:
+            query_info["degraded"] = result["degraded"]
+        if result.get("faq_score") is not None:
+            query_info["faq_score"] = result["faq_score"]
+        if result.get("rewrite_skipped") is not None:
+            query_info["faq_rewrite_skipped"] = result["rewrite_skipped"]
+        if result["compression"]:
+            query_info["compression_ratio"] = result["compression"]["compression_ratio"]
+            query_info["compression_time_ms"] = result["compression"]["time_ms"]
 
         await monitor.complete_pipeline(
             answer, 
             total_time_ms,
-            stage_metrics,
+            result["stage_metrics"],
             query_info
         )
         
@@ -127,6 +266,9 @@ async def monitored_process_query(
         
         return response
         
+    except AdmissionRejectedError as e:
+        await monitor.report_error(f"Query rejected: {e.message}")
+        raise
     except Exception as e:
         error_message = f"Pipeline execution failed: {str(e)}"
         logger.error(error_message)
@@ -146,9 +288,14 @@ async def query_judgements(
             request.query, 
             pipeline_service,
             "judgement",
-            request.user_id
+            request.user_id,
+            request.include_content,
+            request.snippet_chars,
+            request.fields
         )
         return result
+    except AdmissionRejectedError as e:
+        raise HTTPException(status_code=429, detail=e.message, headers={"Retry-After": str(e.retry_after)})
     except QueryProcessingError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -165,8 +312,13 @@ async def query_laws(
             request.query, 
             pipeline_service,
             "laws",
-            request.user_id
+            request.user_id,
+            request.include_content,
+            request.snippet_chars,
+            request.fields
         )
         return result
+    except AdmissionRejectedError as e:
+        raise HTTPException(status_code=429, detail=e.message, headers={"Retry-After": str(e.retry_after)})
     except QueryProcessingError as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
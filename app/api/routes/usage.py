@@ -0,0 +1,42 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from app.api.dependencies import get_usage_accountant
+from app.services.usage_accounting import ANONYMOUS, PIPELINE, USER, UsageAccountant
+
+router = APIRouter(prefix="/usage")
+
+def require_accountant() -> UsageAccountant:
+    accountant = get_usage_accountant()
+    if accountant is None:
+        raise HTTPException(status_code=404, detail="Usage accounting is disabled")
+    return accountant
+
+@router.get("")
+async def get_usage(
+    window_seconds: Optional[float] = Query(None, gt=0),
+    limit: int = Query(10, ge=1, le=1000),
+    by: str = Query("total_tokens", pattern="^(requests|prompt_tokens|completion_tokens|total_tokens|llm_seconds)$")
+):
+    """
+    Return usage (requests, prompt and completion tokens, LLM seconds) per pipeline for every window,
+    and the heaviest users within `window_seconds` (the shortest window when omitted), ranked by `by`.
+    """
+    accountant = require_accountant()
+    window = window_seconds or accountant.windows[0]
+    pipelines = [item["name"] for item in accountant.top(PIPELINE, accountant.windows[-1])]
+    return {
+        "windows": accountant.windows,
+        "pipelines": {name: accountant.usage(PIPELINE, name) for name in pipelines},
+        "top_users": {"window_seconds": window, "by": by, "users": accountant.top(USER, window, limit, by)},
+        "stats": accountant.stats()
+    }
+
+@router.get("/users/{user_id}")
+async def get_user_usage(user_id: str):
+    """Return a user's usage for every window and what is left of their budget ("anonymous" for requests without user_id)."""
+    accountant = require_accountant()
+    return {
+        "user_id": user_id,
+        "usage": accountant.usage(USER, user_id),
+        "budget": accountant.budget(user_id) if user_id != ANONYMOUS else None
+    }
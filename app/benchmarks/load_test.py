@@ -0,0 +1,322 @@
+"""
+End-to-end load test of the /v1/query/* endpoints against stand-in services.
+Requests go through the real FastAPI app in-process (httpx ASGI transport), so routing,
+validation, monitoring and serialization are all part of the measurement.
+"""
+import asyncio
+import json
+import os
+import subprocess
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+from app.benchmarks.stubs import build_stub_pipeline_service
+from app.core.logging import logger
+from app.services.adaptive_retrieval import RetrievalPolicy
+from app.services.admission_controller import AdmissionController
+from app.services.global_pipeline_monitor import GlobalPipelineMonitor
+from app.services.pipeline_trace_store import summarize, TRACE_STAGES
+
+DEFAULT_QUERIES = [
+    "Tell me about 'Central Bureau Of Investigation vs Mohammed Yousuf on 25 January, 2016' case in detail",
+    "What is the procedure for filing a plaint in a civil case in India?",
+    "Can a non-compoundable offence be compounded after a settlement with the bank?",
+    "What are the grounds for granting anticipatory bail?",
+    "How is cheating under section 420 IPC proved at trial?",
+    "What remedies does a tenant have against illegal eviction?",
+    "When can a High Court quash criminal proceedings under section 482 CrPC?",
+    "What evidence is required to prove a criminal conspiracy?",
+]
+
+ENDPOINTS = {
+    "judgement": "/v1/query/judgements",
+    "laws": "/v1/query/laws",
+}
+
+
+class EventLoopLagMonitor:
+    """Measure how late the event loop wakes up a task that sleeps for a fixed interval."""
+
+    def __init__(self, interval_ms: float = 10.0):
+        self.interval_ms = interval_ms
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        interval = self.interval_ms / 1000
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag_ms = (time.perf_counter() - started - interval) * 1000
+            self.samples.append(max(lag_ms, 0.0))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+def current_commit() -> Optional[str]:
+    """Return the short git commit of the working tree, if available."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+async def run_load_test(
+    pipelines: List[str] = ("judgement", "laws"),
+    total_requests: int = 200,
+    concurrency: int = 16,
+    llm_latency_ms: float = 800.0,
+    llm_jitter_ms: float = 100.0,
+    search_latency_ms: float = 0.0,
+    document_count: int = 1000,
+    use_real_embedder: bool = False,
+    queries: Optional[List[str]] = None,
+    timeout_seconds: float = 120.0,
+    max_llm_concurrency: int = 0,
+    llm_queue_size: int = 64,
+    llm_max_wait_seconds: float = 10.0,
+    llm_spike_probability: float = 0.0,
+    llm_spike_ms: float = 0.0,
+    llm_prefill_ms_per_1k_chars: float = 0.0,
+    hedge: bool = False,
+    retrieval_policy: Optional[RetrievalPolicy] = None,
+    compress_max_chars: int = 0
+) -> Dict[str, Any]:
+    """
+    Drive the query endpoints with `concurrency` concurrent clients until `total_requests` have completed.
+    Returns throughput, client-observed latency, per-stage latency and event-loop lag statistics.
+    With `max_llm_concurrency` > 0, LLM calls go through an AdmissionController, so overload shows up
+    as 429 responses in the status counts instead of unbounded latency. `llm_spike_probability` and
+    `llm_spike_ms` inject LLM tail spikes, and `hedge` backs the fake LLM with a second, hedged provider.
+    `retrieval_policy` decides how many hits go into each prompt; with `llm_prefill_ms_per_1k_chars` the fake
+    LLM gets slower with longer prompts, so the effect of retrieval depth on answer latency shows up.
+    `compress_max_chars` > 0 enables extractive context compression with that character budget.
+    """
+    # Imported here so the stand-ins are wired before the app sees any request
+    from app.main import app
+    from app.api.dependencies import get_judgement_pipeline_service, get_laws_pipeline_service
+
+    embedder = None
+    if use_real_embedder:
+        from app.services.embedder_service import EmbedderService
+        embedder = EmbedderService()
+
+    admission_controller = None
+    if max_llm_concurrency > 0:
+        admission_controller = AdmissionController(
+            max_concurrent=max_llm_concurrency,
+            max_queue=llm_queue_size,
+            max_wait_seconds=llm_max_wait_seconds
+        )
+
+    services = {}
+    for pipeline_type in pipelines:
+        services[pipeline_type] = await build_stub_pipeline_service(
+            pipeline_type,
+            document_count=document_count,
+            llm_latency_ms=llm_latency_ms,
+            llm_jitter_ms=llm_jitter_ms,
+            search_latency_ms=search_latency_ms,
+            embedder=embedder,
+            admission_controller=admission_controller,
+            llm_spike_probability=llm_spike_probability,
+            llm_spike_ms=llm_spike_ms,
+            llm_prefill_ms_per_1k_chars=llm_prefill_ms_per_1k_chars,
+            hedge=hedge,
+            retrieval_policy=retrieval_policy,
+            compress_max_chars=compress_max_chars
+        )
+
+    if "judgement" in services:
+        app.dependency_overrides[get_judgement_pipeline_service] = lambda: services["judgement"]
+    if "laws" in services:
+        app.dependency_overrides[get_laws_pipeline_service] = lambda: services["laws"]
+
+    queries = list(queries or DEFAULT_QUERIES)
+
+    # Collect per-stage timings from the pipeline monitor's "complete" events
+    monitor = GlobalPipelineMonitor()
+    events_queue = await monitor.register_client()
+
+    latencies_ms: List[float] = []
+    status_counts: Dict[str, int] = {}
+    counter = iter(range(total_requests))
+    lag_monitor = EventLoopLagMonitor()
+
+    async def worker(client: httpx.AsyncClient):
+        for request_index in counter:
+            pipeline_type = pipelines[request_index % len(pipelines)]
+            payload = {
+                "query": queries[request_index % len(queries)],
+                "user_id": f"bench-user-{request_index % concurrency}"
+            }
+            started = time.perf_counter()
+            try:
+                response = await client.post(ENDPOINTS[pipeline_type], json=payload)
+                status = str(response.status_code)
+            except Exception as e:
+                logger.error(f"Benchmark request failed: {str(e)}")
+                status = type(e).__name__
+            latencies_ms.append((time.perf_counter() - started) * 1000)
+            status_counts[status] = status_counts.get(status, 0) + 1
+
+    transport = httpx.ASGITransport(app=app)
+    lag_monitor.start()
+    started = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=timeout_seconds) as client:
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    finally:
+        wall_time_s = time.perf_counter() - started
+        await lag_monitor.stop()
+        await monitor.unregister_client(events_queue)
+        app.dependency_overrides.clear()
+
+    stage_samples: Dict[str, List[float]] = {stage: [] for stage in TRACE_STAGES + ["total"]}
+    coalesced = 0
+    context_tokens: List[float] = []
+    retrieved_k: List[float] = []
+    compression_ratio: List[float] = []
+    compression_time_ms: List[float] = []
+    while not events_queue.empty():
+        event_name, data = events_queue.get_nowait()
+        if event_name != "complete":
+            continue
+        if data.get("coalesced"):
+            coalesced += 1
+        if isinstance(data.get("context_tokens"), (int, float)):
+            context_tokens.append(data["context_tokens"])
+        if isinstance(data.get("retrieved_k"), (int, float)):
+            retrieved_k.append(data["retrieved_k"])
+        if isinstance(data.get("compression_ratio"), (int, float)):
+            compression_ratio.append(data["compression_ratio"])
+            compression_time_ms.append(data["compression_time_ms"])
+        for stage in stage_samples:
+            value = data.get(f"{stage}_time_ms")
+            if isinstance(value, (int, float)):
+                stage_samples[stage].append(value)
+
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": current_commit(),
+        "config": {
+            "pipelines": list(pipelines),
+            "total_requests": total_requests,
+            "concurrency": concurrency,
+            "llm_latency_ms": llm_latency_ms,
+            "llm_jitter_ms": llm_jitter_ms,
+            "search_latency_ms": search_latency_ms,
+            "document_count": document_count,
+            "use_real_embedder": use_real_embedder,
+            "max_llm_concurrency": max_llm_concurrency,
+            "llm_spike_probability": llm_spike_probability,
+            "llm_spike_ms": llm_spike_ms,
+            "llm_prefill_ms_per_1k_chars": llm_prefill_ms_per_1k_chars,
+            "hedge": hedge,
+            "retrieval": (retrieval_policy or RetrievalPolicy(top_k=10)).describe(),
+            "compress_max_chars": compress_max_chars
+        },
+        "wall_time_seconds": wall_time_s,
+        "throughput_rps": len(latencies_ms) / wall_time_s if wall_time_s > 0 else 0.0,
+        "status_counts": status_counts,
+        "coalesced_requests": coalesced,
+        "admission": admission_controller.stats() if admission_controller is not None else None,
+        "llm": {pipeline_type: service.llm.stats() for pipeline_type, service in services.items()},
+        "context_tokens": summarize(context_tokens),
+        "retrieved_k": summarize(retrieved_k),
+        "compression": {
+            "ratio": summarize(compression_ratio),
+            "time_ms": summarize(compression_time_ms)
+        },
+        "latency_ms": summarize(latencies_ms),
+        "stages_ms": {stage: summarize(values) for stage, values in stage_samples.items()},
+        "event_loop_lag_ms": summarize(lag_monitor.samples)
+    }
+
+
+def save_results(results: Dict[str, Any], output_dir: str = "benchmark_results") -> str:
+    """Save benchmark results as JSON and return the file path."""
+    os.makedirs(output_dir, exist_ok=True)
+    commit = results.get("commit") or "nocommit"
+    filename = os.path.join(output_dir, f"load_test_{commit}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+    return filename
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the relative change of the headline numbers against a baseline run."""
+
+    def change(new, old):
+        if new is None or old in (None, 0):
+            return None
+        return (new - old) / old
+
+    comparison = {
+        "baseline_commit": baseline.get("commit"),
+        "current_commit": current.get("commit"),
+        "throughput_rps": change(current["throughput_rps"], baseline["throughput_rps"]),
+        "latency_ms": {},
+        "stages_ms": {},
+        "event_loop_lag_ms": {}
+    }
+    for pct in ("p50", "p95", "p99"):
+        comparison["latency_ms"][pct] = change(current["latency_ms"].get(pct), baseline["latency_ms"].get(pct))
+        comparison["event_loop_lag_ms"][pct] = change(
+            current["event_loop_lag_ms"].get(pct), baseline["event_loop_lag_ms"].get(pct)
+        )
+        for stage, stats in current["stages_ms"].items():
+            comparison["stages_ms"].setdefault(stage, {})[pct] = change(
+                stats.get(pct), baseline["stages_ms"].get(stage, {}).get(pct)
+            )
+    return comparison
+
+
+def print_report(results: Dict[str, Any], comparison: Optional[Dict[str, Any]] = None):
+    """Print a human readable summary of a load test run."""
+
+    def fmt(value):
+        return "-" if value is None else f"{value:.1f}"
+
+    print(f"\n===== LOAD TEST RESULTS ({results.get('commit') or 'unknown commit'}) =====")
+    print(f"Requests: {sum(results['status_counts'].values())}  Status: {results['status_counts']}")
+    print(f"Wall time: {results['wall_time_seconds']:.2f}s  Throughput: {results['throughput_rps']:.2f} req/s")
+    print(f"Coalesced requests: {results.get('coalesced_requests', 0)}")
+    if results.get("admission"):
+        admission = results["admission"]
+        print(f"LLM admission: {admission['admitted']} admitted, rejected {admission['rejected']}, "
+              f"queue wait p95 {fmt(admission['wait_ms'].get('p95'))} ms")
+    if results.get("retrieved_k", {}).get("count"):
+        print(f"Retrieved k: mean {fmt(results['retrieved_k'].get('mean'))}  "
+              f"Context tokens: p50 {fmt(results['context_tokens'].get('p50'))} / "
+              f"p95 {fmt(results['context_tokens'].get('p95'))}")
+    if results.get("compression", {}).get("ratio", {}).get("count"):
+        compression = results["compression"]
+        print(f"Context compression: ratio p50 {fmt(compression['ratio'].get('p50'))}x, "
+              f"time p50 {fmt(compression['time_ms'].get('p50'))} / p95 {fmt(compression['time_ms'].get('p95'))} ms")
+    print(f"{'':<12}{'p50':>10}{'p95':>10}{'p99':>10}")
+    rows = [("request", results["latency_ms"])] + list(results["stages_ms"].items())
+    rows.append(("loop lag", results["event_loop_lag_ms"]))
+    for name, stats in rows:
+        print(f"{name:<12}{fmt(stats.get('p50')):>10}{fmt(stats.get('p95')):>10}{fmt(stats.get('p99')):>10}")
+
+    if comparison:
+        print(f"\n===== CHANGE VS {comparison['baseline_commit']} =====")
+        throughput_change = comparison["throughput_rps"]
+        print(f"Throughput: {'-' if throughput_change is None else f'{throughput_change:+.1%}'}")
+        for pct, value in comparison["latency_ms"].items():
+            print(f"Request {pct}: {'-' if value is None else f'{value:+.1%}'}")
@@ -0,0 +1,108 @@
+"""
+Response size benchmark: bytes on the wire and serialization time of a query response under the
+document projections of QueryRequest (full, snippet, metadata only), rendered with the standard
+library JSON encoder and with orjson, and compressed with gzip and brotli (when installed).
+"""
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.api.routes.query import project_documents
+from app.benchmarks.stubs import synthetic_documents
+from app.core import compression
+
+PROJECTIONS = {
+    "full": {},
+    "snippet_300": {"snippet_chars": 300},
+    "metadata_only": {"include_content": False},
+    "titles_only": {"include_content": False, "fields": ["Titles", "Doc_url"]}
+}
+
+
+def time_ms(function: Callable[[], Any], iterations: int) -> float:
+    """Median wall time of `function` in milliseconds."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def build_response(documents: List[Dict[str, Any]], answer_words: int = 250, **projection) -> Dict[str, Any]:
+    return {
+        "answer": " ".join(["The court held that the appeal succeeds on the evidence."] * (answer_words // 10)),
+        "documents": project_documents(documents, **projection),
+        "time_taken": 1.234,
+        "source": "rag"
+    }
+
+
+def measure_projection(response: Dict[str, Any], iterations: int = 50) -> Dict[str, Any]:
+    stdlib_body = JSONResponse(response).body
+    orjson_body = ORJSONResponse(response).body
+    result = {
+        "json_bytes": len(stdlib_body),
+        "orjson_bytes": len(orjson_body),
+        "json_render_ms": time_ms(lambda: JSONResponse(response), iterations),
+        "orjson_render_ms": time_ms(lambda: ORJSONResponse(response), iterations),
+        "encodings": {}
+    }
+    encodings = ["gzip"] + (["br"] if compression.brotli is not None else [])
+    for encoding in encodings:
+        compressed = compression.compress(orjson_body, encoding)
+        result["encodings"][encoding] = {
+            "bytes": len(compressed),
+            "ratio": len(orjson_body) / len(compressed),
+            "compress_ms": time_ms(lambda: compression.compress(orjson_body, encoding), iterations)
+        }
+    return result
+
+
+def run_response_benchmark(
+    document_count: int = 10,
+    words_per_document: int = 3000,
+    iterations: int = 50,
+    projections: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    documents = synthetic_documents("judgement", document_count, words_per_document)
+    results = {}
+    for name, projection in (projections or PROJECTIONS).items():
+        results[name] = measure_projection(build_response(documents, **projection), iterations)
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "config": {
+            "document_count": document_count,
+            "words_per_document": words_per_document,
+            "iterations": iterations,
+            "brotli_available": compression.brotli is not None
+        },
+        "projections": results
+    }
+
+
+def save_results(results: Dict[str, Any], output_dir: str = "benchmark_results") -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    filename = os.path.join(output_dir, f"response_size_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+    return filename
+
+
+def print_report(results: Dict[str, Any]):
+    config = results["config"]
+    print("\n===== RESPONSE SIZE BENCHMARK =====")
+    print(f"{config['document_count']} documents x {config['words_per_document']} words, "
+          f"median of {config['iterations']} runs, brotli {'on' if config['brotli_available'] else 'not installed'}")
+    print(f"{'projection':<16}{'bytes':>10}{'json ms':>10}{'orjson ms':>11}{'gzip bytes':>12}{'gzip ms':>9}{'br bytes':>10}{'br ms':>8}")
+    for name, row in results["projections"].items():
+        gzip_row = row["encodings"]["gzip"]
+        br_row = row["encodings"].get("br")
+        br = f"{br_row['bytes']:>10}{br_row['compress_ms']:>8.2f}" if br_row else f"{'-':>10}{'-':>8}"
+        print(f"{name:<16}{row['orjson_bytes']:>10}{row['json_render_ms']:>10.2f}{row['orjson_render_ms']:>11.2f}"
+              f"{gzip_row['bytes']:>12}{gzip_row['compress_ms']:>9.2f}{br}")
@@ -0,0 +1,283 @@
+"""
+Stand-ins for the external services used by the RAG pipeline, so the FastAPI app
+can be benchmarked without Gemini, Qdrant or (optionally) the embedding model.
+"""
+import asyncio
+import hashlib
+import random
+import re
+import time
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+from qdrant_client.http import models
+
+from app.core.config import settings
+from app.services.adaptive_retrieval import RetrievalPolicy
+from app.services.admission_controller import AdmissionController
+from app.services.context_compressor import ContextCompressor
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_generator import LLMGenerator, LLMProvider
+from app.services.pipeline_service import RAGPipelineService
+
+
+class FakeLLMProvider(LLMProvider):
+    """
+    Deterministic local stand-in for an LLM provider.
+    The reply is derived from a hash of the prompt and arrives after a configurable latency;
+    occasional latency spikes and failures can be injected to exercise fallback and hedging.
+    `prefill_ms_per_1k_chars` adds latency proportional to the prompt length, like input token processing.
+    """
+
+    def __init__(
+        self,
+        name: str = "fake-gemini",
+        latency_ms: float = 800.0,
+        jitter_ms: float = 0.0,
+        spike_probability: float = 0.0,
+        spike_ms: float = 0.0,
+        failure_rate: float = 0.0,
+        answer_words: int = 120,
+        prefill_ms_per_1k_chars: float = 0.0,
+        seed: int = 0
+    ):
+        self.name = name
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.spike_probability = spike_probability
+        self.spike_ms = spike_ms
+        self.failure_rate = failure_rate
+        self.answer_words = answer_words
+        self.prefill_ms_per_1k_chars = prefill_ms_per_1k_chars
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        delay_ms = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        delay_ms += self.prefill_ms_per_1k_chars * len(prompt) / 1000
+        if self._random.random() < self.spike_probability:
+            delay_ms += self.spike_ms
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+        if self._random.random() < self.failure_rate:
+            raise RuntimeError(f"{self.name} failed")
+
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        words = [f"term{digest[i % len(digest)]}{i}" for i in range(self.answer_words)]
+        return f"[{self.name} {digest[:12]}] " + " ".join(words)
+
+
+class LocalRedisStandIn:
+    """
+    In-process replacement for a Redis client, implementing the subset used by RedisCacheBackend
+    (get, set with `ex`, scan_iter and delete), so shared-cache code runs without a Redis server.
+    """
+
+    def __init__(self):
+        self.data: Dict[str, Any] = {}
+
+    def get(self, key: str):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.time():
+            del self.data[key]
+            return None
+        return value
+
+    def set(self, key: str, value, ex: Optional[int] = None):
+        self.data[key] = (value, time.time() + ex if ex is not None else None)
+        return True
+
+    def scan_iter(self, match: str = "*"):
+        prefix = match.rstrip("*")
+        return [key for key in list(self.data) if key.startswith(prefix)]
+
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+
+class HashingEmbedder:
+    """
+    Deterministic stand-in for EmbedderService based on feature hashing of word tokens.
+    Texts sharing words get similar vectors, which is enough to exercise retrieval.
+    """
+
+    def __init__(self, dimension: int = settings.VECTOR_SIZE):
+        self.dimension = dimension
+
+    def encode(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            bucket = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[bucket % self.dimension] += 1.0 if (bucket >> 63) == 0 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def encode_batch(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        return np.vstack([self.encode(text) for text in texts]) if texts else np.zeros((0, self.dimension), dtype=np.float32)
+
+    async def get_document_embeddings(self, documents: List[Dict]) -> np.ndarray:
+        return self.encode_batch([doc["content"] for doc in documents])
+
+    async def get_query_embedding(self, query: str) -> np.ndarray:
+        return self.encode(query)
+
+
+class InMemoryVectorStore:
+    """
+    In-memory replacement for QdrantService using exact cosine search over a NumPy matrix.
+    Returns qdrant ScoredPoint objects so route code is exercised unchanged.
+    """
+
+    def __init__(self, collection_name: str = "judgement", search_latency_ms: float = 0.0):
+        self.collection_name = collection_name
+        self.search_latency_ms = search_latency_ms
+        self.vectors = np.zeros((0, settings.VECTOR_SIZE), dtype=np.float32)
+        self.payloads: List[Dict[str, Any]] = []
+
+    def add(self, vectors: np.ndarray, payloads: List[Dict[str, Any]]):
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms > 0, norms, 1.0)
+        self.vectors = np.vstack([self.vectors, matrix])
+        self.payloads.extend(payloads)
+
+    async def search_similar(self, query_vector: np.ndarray, top_k: int = 10, with_payload=True):
+        if self.search_latency_ms > 0:
+            time.sleep(self.search_latency_ms / 1000)
+        if len(self.payloads) == 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        scores = self.vectors @ (query / norm if norm > 0 else query)
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            models.ScoredPoint(
+                id=int(idx), version=0, score=float(scores[idx]), payload=select_payload(self.payloads[idx], with_payload)
+            )
+            for idx in top
+        ]
+
+    async def retrieve_payloads(self, ids: List[int], with_payload=True) -> Dict[int, Dict[str, Any]]:
+        return {idx: select_payload(self.payloads[idx], with_payload) for idx in ids}
+
+
+def select_payload(payload: Dict[str, Any], with_payload) -> Dict[str, Any]:
+    """Apply a Qdrant-style payload selector (True, False or a list of dotted keys) to a payload."""
+    if with_payload is True:
+        return payload
+    if not with_payload:
+        return {}
+    selected: Dict[str, Any] = {}
+    for path in with_payload:
+        keys = path.split(".")
+        value = payload
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            target = selected
+            for key in keys[:-1]:
+                target = target.setdefault(key, {})
+            target[keys[-1]] = value
+    return selected
+
+
+def synthetic_documents(pipeline_type: str, count: int, words_per_document: int = 400, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Generate deterministic documents shaped like the ingested judgement / law payloads.
+    The text is split into sentences of 8-20 words so sentence-level processing has something to work on.
+    """
+    rng = random.Random(seed)
+    vocabulary = [
+        "appeal", "accused", "bail", "contract", "court", "evidence", "high", "judgement", "petition",
+        "property", "section", "supreme", "tenant", "trial", "witness", "conspiracy", "compounding",
+        "plaint", "civil", "criminal", "procedure", "cheating", "bank", "loan", "investigation", "order"
+    ]
+
+    documents = []
+    for idx in range(count):
+        words = [rng.choice(vocabulary) for _ in range(words_per_document)]
+        sentences = []
+        while words:
+            length = rng.randint(8, 20)
+            sentence, words = words[:length], words[length:]
+            sentences.append(" ".join(sentence).capitalize() + ".")
+        text = " ".join(sentences)
+        if pipeline_type == "judgement":
+            title = f"State vs Party {idx} on {1 + idx % 28} January, {2000 + idx % 24}"
+            documents.append({
+                "content": f"Title: {title} Court name: High Court Judgement Text: {text}",
+                "metadata": {"Titles": title, "Doc_url": f"https://example.org/doc/{idx}", "Doc_size": len(text)}
+            })
+        else:
+            question = f"What does the law say about {rng.choice(vocabulary)} and {rng.choice(vocabulary)} ({idx})?"
+            documents.append({
+                "content": f"Question: {question} Answer: {text}",
+                "metadata": {"question": question, "answer": text}
+            })
+    return documents
+
+
+async def build_stub_pipeline_service(
+    pipeline_type: str,
+    document_count: int = 1000,
+    llm_latency_ms: float = 800.0,
+    llm_jitter_ms: float = 0.0,
+    search_latency_ms: float = 0.0,
+    embedder: Optional[Any] = None,
+    llm_cache: Optional[LLMResponseCache] = None,
+    admission_controller: Optional[AdmissionController] = None,
+    llm_spike_probability: float = 0.0,
+    llm_spike_ms: float = 0.0,
+    llm_prefill_ms_per_1k_chars: float = 0.0,
+    hedge: bool = False,
+    retrieval_policy: Optional[RetrievalPolicy] = None,
+    compress_max_chars: int = 0
+) -> RAGPipelineService:
+    """
+    Build a RAGPipelineService wired to stand-ins.
+    Pass a real EmbedderService as `embedder` to include model inference in the measurements,
+    and an `llm_cache` to measure cached generation (without one, every query pays the LLM latency).
+    With `hedge`, a second fake provider with the same latency profile backs up the first.
+    `retrieval_policy` defaults to a fixed top 10, independent of the RETRIEVAL_* settings, and
+    `compress_max_chars` > 0 compresses the context to that many characters.
+    """
+    embedder = embedder or HashingEmbedder()
+    collection_name = "judgement" if pipeline_type == "judgement" else "laws"
+    store = InMemoryVectorStore(collection_name, search_latency_ms=search_latency_ms)
+
+    documents = synthetic_documents(pipeline_type, document_count)
+    vectors = await embedder.get_document_embeddings(documents)
+    store.add(vectors, documents)
+
+    providers = [
+        FakeLLMProvider(
+            name=name,
+            latency_ms=llm_latency_ms,
+            jitter_ms=llm_jitter_ms,
+            spike_probability=llm_spike_probability,
+            spike_ms=llm_spike_ms,
+            prefill_ms_per_1k_chars=llm_prefill_ms_per_1k_chars,
+            seed=seed
+        )
+        for seed, name in enumerate(["fake-gemini", "fake-groq"][:2 if hedge else 1])
+    ]
+
+    return RAGPipelineService(
+        qdrant_service=store,
+        embedder_service=embedder,
+        type="judgement" if pipeline_type == "judgement" else "law",
+        generator=LLMGenerator(providers, hedge=hedge),
+        llm_cache=llm_cache,
+        admission_controller=admission_controller,
+        retrieval_policy=retrieval_policy or RetrievalPolicy(top_k=10),
+        context_compressor=ContextCompressor(embedder, max_chars=compress_max_chars) if compress_max_chars > 0 else None
+    )
@@ -0,0 +1,116 @@
+"""
+Vector transport benchmark: time, peak Python allocations (tracemalloc) and request bytes of sending one
+batch of embeddings to Qdrant, comparing
+  - list_batch: embeddings converted with `.tolist()` by the embedder and upserted as a models.Batch (REST JSON),
+  - array_rest: the float32 matrix passed to `upload_collection`, converted by the client per batch (REST JSON),
+  - array_grpc: the same with `prefer_grpc`, encoded as protobuf packed floats,
+and the same for a single query vector. Requests are encoded the way qdrant-client encodes them but not sent,
+so no Qdrant server is needed.
+"""
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+import numpy as np
+from qdrant_client import grpc
+from qdrant_client.conversions.conversion import RestToGrpc
+from qdrant_client.http import models
+
+from app.core.config import settings
+
+
+def measure(function: Callable[[], Any], iterations: int) -> Dict[str, Any]:
+    """Median time, peak traced allocation and (for encoded requests) output size of a conversion."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    body = function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"time_ms": statistics.median(samples), "peak_alloc_kib": peak / 1024, "request_bytes": len(body) if isinstance(body, bytes) else None}
+
+
+def list_batch_request(embeddings: np.ndarray) -> bytes:
+    vectors = embeddings.tolist()
+    batch = models.Batch(ids=list(range(len(vectors))), vectors=vectors)
+    return models.PointsBatch(batch=batch).model_dump_json().encode()
+
+
+def array_rest_request(embeddings: np.ndarray) -> bytes:
+    points = [
+        models.PointStruct(id=idx, vector=vector)
+        for idx, vector in enumerate(embeddings.tolist())
+    ]
+    return models.PointsList(points=points).model_dump_json().encode()
+
+
+def array_grpc_request(embeddings: np.ndarray) -> bytes:
+    points = [
+        grpc.PointStruct(id=RestToGrpc.convert_extended_point_id(idx), vectors=RestToGrpc.convert_vector_struct(vector))
+        for idx, vector in enumerate(embeddings.tolist())
+    ]
+    return grpc.UpsertPoints(collection_name=settings.COLLECTION_NAME, points=points).SerializeToString()
+
+
+def list_query_request(embedding: np.ndarray) -> bytes:
+    return json.dumps({"vector": embedding.tolist(), "limit": 10}).encode()
+
+
+def grpc_query_request(embedding: np.ndarray) -> bytes:
+    return grpc.SearchPoints(
+        collection_name=settings.COLLECTION_NAME, vector=embedding.tolist(), limit=10
+    ).SerializeToString()
+
+
+def run_vector_benchmark(batch_size: int = 100, dimension: int = settings.VECTOR_SIZE, iterations: int = 50) -> Dict[str, Any]:
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((batch_size, dimension)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    query = embeddings[0].copy()
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "config": {"batch_size": batch_size, "dimension": dimension, "iterations": iterations},
+        "embedder_output": {
+            "tolist": measure(embeddings.tolist, iterations),
+            "float32_array_bytes": embeddings.nbytes
+        },
+        "batch": {
+            "list_batch": measure(lambda: list_batch_request(embeddings), iterations),
+            "array_rest": measure(lambda: array_rest_request(embeddings), iterations),
+            "array_grpc": measure(lambda: array_grpc_request(embeddings), iterations)
+        },
+        "query": {
+            "rest": measure(lambda: list_query_request(query), iterations * 20),
+            "grpc": measure(lambda: grpc_query_request(query), iterations * 20)
+        }
+    }
+
+
+def save_results(results: Dict[str, Any], output_dir: str = "benchmark_results") -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    filename = os.path.join(output_dir, f"vector_transport_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+    return filename
+
+
+def print_report(results: Dict[str, Any]):
+    config = results["config"]
+    print("\n===== VECTOR TRANSPORT BENCHMARK =====")
+    print(f"{config['batch_size']} x {config['dimension']} float32 embeddings, median of {config['iterations']} runs")
+    tolist = results["embedder_output"]["tolist"]
+    print(f"Embedder output: float32 matrix {results['embedder_output']['float32_array_bytes'] / 1024:.0f} KiB; "
+          f".tolist() {tolist['time_ms']:.2f} ms, {tolist['peak_alloc_kib']:.0f} KiB allocated")
+    print(f"{'upsert request':<16}{'time ms':>10}{'peak KiB':>10}{'bytes':>10}")
+    for name, row in results["batch"].items():
+        print(f"{name:<16}{row['time_ms']:>10.2f}{row['peak_alloc_kib']:>10.0f}{row['request_bytes']:>10}")
+    print(f"{'query request':<16}{'time ms':>10}{'peak KiB':>10}{'bytes':>10}")
+    for name, row in results["query"].items():
+        print(f"{name:<16}{row['time_ms']:>10.3f}{row['peak_alloc_kib']:>10.1f}{row['request_bytes']:>10}")
@@ -4,14 +4,174 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "NyAI Saathi"
     QDRANT_HOST: str = "localhost"
     QDRANT_PORT: str = "6333"
+    # gRPC sends vectors as packed float32 instead of JSON text (needs QDRANT_GRPC_PORT reachable)
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_GRPC_PORT: int = 6334
     COLLECTION_NAME: str = "legal_documents"
     COLLECTION_NAME2: str = "indian_laws"
     VECTOR_SIZE: int = 384
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
-    GOOGLE_API_KEY: str
+    # COLLECTION_NAME and COLLECTION_NAME2 are aliases of versioned collections recorded in COLLECTION_REGISTRY_NAME;
+    # servers check every COLLECTION_WATCH_SECONDS whether a reindex swapped them
+    COLLECTION_REGISTRY_NAME: str = "collection_versions"
+    COLLECTION_WATCH_SECONDS: float = 30.0
+    # Lock file taken by the worker processes of a host while missing collections are created and ingested
+    COLLECTION_LOCK_FILE: str = "data/collections.lock"
+    GOOGLE_API_KEY: str = ""
     LLAMA3_API_KEY: str = ""
     HUGGINGFACE_TOKEN: str = ""
     GROQ_API_KEY: str = ""
+    STATIC_DIR: str = "/var/www/nyai-static"
+    STARTUP_WARM_UP: bool = True
+
+    # Near-duplicate judgements at ingestion (MinHash/LSH over the judgement text): "drop" skips them,
+    # "link" stores them with metadata.duplicate_of set to the canonical point id, "off" disables detection.
+    # QUERY_DEDUP collapses duplicate hits at query time (linked ones, and near-identical leading text)
+    DEDUP_MODE: str = "link"
+    DEDUP_THRESHOLD: float = 0.85
+    DEDUP_NUM_PERM: int = 128
+    DEDUP_SHINGLE_SIZE: int = 5
+    DEDUP_MAX_ENTRIES: int = 200000
+    DEDUP_REPORT_DIR: str = "ingestion_reports"
+    QUERY_DEDUP: bool = True
+
+    # Retrieval depth. With RETRIEVAL_ADAPTIVE, RETRIEVAL_FETCH_K hits are fetched and cut per collection:
+    # "gap" stops at the largest score drop of at least the cut value, "relative" keeps hits scoring at least
+    # the cut value times the top score, and between RETRIEVAL_MIN_K and RETRIEVAL_MAX_K hits are kept
+    RETRIEVAL_TOP_K: int = 10
+    RETRIEVAL_ADAPTIVE: bool = False
+    RETRIEVAL_FETCH_K: int = 20
+    RETRIEVAL_MIN_K: int = 2
+    RETRIEVAL_MAX_K: int = 10
+    JUDGEMENT_CUT_RULE: str = "gap"
+    JUDGEMENT_CUT_VALUE: float = 0.05
+    LAWS_CUT_RULE: str = "relative"
+    LAWS_CUT_VALUE: float = 0.9
+
+    # FAQ fast path for the laws pipeline: a query whose nearest stored question (FAQ_COLLECTION_NAME) scores
+    # at least FAQ_THRESHOLD is answered with the stored answer, optionally rewritten by the LLM
+    FAQ_ENABLED: bool = False
+    FAQ_COLLECTION_NAME: str = "indian_laws_questions"
+    FAQ_THRESHOLD: float = 0.92
+    FAQ_REWRITE: bool = False
+
+    # Title index of the judgements: a query naming a case ("A vs B on 25 January, 2016") gets the matching
+    # judgement ahead of the vector hits. Written at ingestion or by `run_title_index.py build`
+    TITLE_INDEX_ENABLED: bool = False
+    TITLE_INDEX_PATH: str = "title_index/judgements.json"
+    TITLE_MATCH_THRESHOLD: float = 0.9
+    TITLE_MATCH_LIMIT: int = 2
+
+    # Extractive context compression: keep the retrieved sentences most similar to the query,
+    # up to COMPRESSION_MAX_CHARS characters of context
+    JUDGEMENT_COMPRESSION: bool = False
+    LAWS_COMPRESSION: bool = False
+    COMPRESSION_MAX_CHARS: int = 6000
+    COMPRESSION_MIN_SENTENCE_CHARS: int = 20
+    COMPRESSION_BATCH_SIZE: int = 64
+
+    # HTTP response compression (brotli when installed and accepted, else gzip) for bodies of at least
+    # RESPONSE_COMPRESSION_MIN_BYTES; the pipeline event stream is never compressed
+    RESPONSE_COMPRESSION: bool = True
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024
+    RESPONSE_GZIP_LEVEL: int = 4
+    RESPONSE_BROTLI_QUALITY: int = 4
+
+    # Pipeline trace history used by the visualizer (empty path keeps history in memory only). Traces are
+    # written to the file every PIPELINE_HISTORY_FLUSH_SECONDS, with hashed queries and without user ids
+    PIPELINE_HISTORY_SIZE: int = 500
+    PIPELINE_HISTORY_DB: str = ""
+    PIPELINE_HISTORY_DB_MAX_ROWS: int = 100000
+    PIPELINE_HISTORY_FLUSH_SECONDS: float = 5.0
+
+    # LLM-judge evaluation (shared rate limit across all concurrently evaluated metrics)
+    EVAL_JUDGE_MODEL: str = "gemini-2.0-flash"
+    EVAL_REQUESTS_PER_MINUTE: float = 60
+    EVAL_BURST: int = 10
+    EVAL_MAX_RETRIES: int = 4
+    EVAL_REQUEST_TIMEOUT_SECONDS: float = 60.0
+
+    # LLM providers, tried in order; hedging sends a duplicate request to the next provider
+    # once the current one runs longer than its recent LLM_HEDGE_PERCENTILE latency
+    LLM_PROVIDERS: str = "gemini"
+    LLM_MODEL: str = "gemini-2.0-flash"
+    GROQ_MODEL: str = "llama-3.3-70b-versatile"
+    LLM_TIMEOUT_SECONDS: float = 30.0
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_PERCENTILE: float = 95
+    LLM_HEDGE_MIN_DELAY_MS: float = 500.0
+    LLM_HEDGE_INITIAL_DELAY_MS: float = 2000.0
+
+    # Degraded answers: a request whose LLM call runs past LLM_DEADLINE_SECONDS (0 waits for the provider chain),
+    # fails, or is refused by the open circuit breaker gets the retrieved documents with "degraded": true and an
+    # extractive summary of up to DEGRADED_SUMMARY_CHARS from the top DEGRADED_SUMMARY_DOCUMENTS (0 chars: none).
+    # With LLM_COMPLETE_LATE the abandoned call finishes into the LLM cache. The breaker opens when at least
+    # LLM_BREAKER_FAILURE_RATE of the last LLM_BREAKER_WINDOW calls failed or took over LLM_BREAKER_SLOW_MS,
+    # and lets a probe through after LLM_BREAKER_OPEN_SECONDS
+    LLM_DEADLINE_SECONDS: float = 15.0
+    LLM_COMPLETE_LATE: bool = True
+    DEGRADED_SUMMARY_CHARS: int = 600
+    DEGRADED_SUMMARY_DOCUMENTS: int = 3
+    LLM_BREAKER_ENABLED: bool = True
+    LLM_BREAKER_WINDOW: int = 20
+    LLM_BREAKER_MIN_CALLS: int = 5
+    LLM_BREAKER_FAILURE_RATE: float = 0.5
+    LLM_BREAKER_SLOW_MS: float = 10000.0
+    LLM_BREAKER_OPEN_SECONDS: float = 30.0
+
+    # Exact-match LLM response cache. LLM_CACHE_DB is a SQLite file or a redis:// URL shared by all workers;
+    # empty keeps the cache in each process's memory only. TTL of 0 disables expiry
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 1024
+    LLM_CACHE_TTL_SECONDS: float = 86400
+    LLM_CACHE_DB: str = ""
+    LLM_CACHE_DB_MAX_ENTRIES: int = 100000
+
+    # Cache of vector search results, invalidated when a collection is re-ingested or swapped. Query vectors are
+    # rounded to SEARCH_CACHE_QUANTUM before hashing. TTL of 0 disables expiry. SEARCH_CACHE_DB is a SQLite file
+    # or a redis:// URL shared by all workers (defaults to a sibling file of LLM_CACHE_DB, or the same Redis);
+    # empty everywhere keeps it per process
+    SEARCH_CACHE_ENABLED: bool = True
+    SEARCH_CACHE_MAX_ENTRIES: int = 2048
+    SEARCH_CACHE_TTL_SECONDS: float = 3600
+    SEARCH_CACHE_QUANTUM: float = 1e-4
+    SEARCH_CACHE_DB: str = ""
+    SEARCH_CACHE_DB_MAX_ENTRIES: int = 100000
+
+    # Anonymized query frequencies in a SQLite file shared by the workers: counts per hashed normalized query,
+    # no user ids, and the query text only for queries asked at least QUERY_LOG_MIN_COUNT times (queries with
+    # e-mail addresses or long numbers are not counted); empty disables the log and the startup warm-up
+    QUERY_LOG_DB: str = ""
+    QUERY_LOG_MAX_QUERIES: int = 10000
+    QUERY_LOG_FLUSH_SECONDS: float = 30.0
+    QUERY_LOG_MIN_COUNT: int = 3
+    # Background replay of the most frequent logged queries after startup (0 queries disables it)
+    CACHE_WARMUP_QUERIES: int = 100
+    CACHE_WARMUP_MIN_COUNT: int = 3
+    CACHE_WARMUP_CONCURRENCY: int = 2
+    CACHE_WARMUP_SECONDS: float = 120.0
+    CACHE_WARMUP_GENERATE: bool = False
+
+    # Usage accounting per user and pipeline (requests, prompt/completion tokens, LLM time) over USAGE_WINDOWS
+    # (comma-separated seconds), counted in buckets of USAGE_BUCKET_SECONDS. USAGE_DB is a SQLite file shared by
+    # the workers and written every USAGE_FLUSH_SECONDS; empty keeps usage in memory only. Users over a budget
+    # within USAGE_BUDGET_WINDOW_SECONDS get 429 (0 disables a budget; requests without user_id are not budgeted)
+    USAGE_ACCOUNTING: bool = True
+    USAGE_WINDOWS: str = "3600,86400"
+    USAGE_BUCKET_SECONDS: float = 60.0
+    USAGE_DB: str = ""
+    USAGE_FLUSH_SECONDS: float = 30.0
+    USAGE_BUDGET_WINDOW_SECONDS: float = 86400
+    USAGE_USER_MAX_REQUESTS: int = 0
+    USAGE_USER_MAX_TOKENS: int = 0
+    USAGE_USER_MAX_LLM_SECONDS: float = 0
+
+    # Admission control for LLM calls (requests over the limits queue, then get 429 past the deadline)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_CONCURRENT: int = 8
+    ADMISSION_MAX_PER_USER: int = 2
+    ADMISSION_MAX_QUEUE: int = 64
+    ADMISSION_MAX_WAIT_SECONDS: float = 10.0
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding='utf-8')
 
@@ -2,4 +2,26 @@ class QueryProcessingError(Exception):
     """Exception raised when query processing fails"""
     def __init__(self, message: str):
         self.message = message
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+class AdmissionRejectedError(Exception):
+    """Exception raised when a request cannot be admitted to the LLM stage in time"""
+    def __init__(self, message: str, retry_after: int):
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(self.message)
+
+class EmbeddingModelMismatchError(Exception):
+    """Exception raised when a collection was built with another embedding model or dimension than configured"""
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+class LLMConfigurationError(Exception):
+    """Exception raised at startup when the configured LLM providers cannot be built"""
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+class UsageBudgetExceededError(AdmissionRejectedError):
+    """Exception raised when a user has used up a request, token or LLM time budget for the current window"""
@@ -0,0 +1,76 @@
+"""
+Startup profiling: per-phase timings of the app's startup (client creation, service initialization,
+model warm-up) and per-module import timings of the serving path.
+"""
+import re
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+class StartupProfiler:
+    """
+    Records named startup phases and their durations in milliseconds.
+    Dotted names ("warm_up.tokenizer") are sub-steps of a phase and are left out of the total.
+    """
+
+    def __init__(self):
+        self.phases: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def record(self, name: str, time_ms: float):
+        self.phases.append({"phase": name, "time_ms": time_ms})
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "phases": list(self.phases),
+            "total_ms": sum(phase["time_ms"] for phase in self.phases if "." not in phase["phase"])
+        }
+
+
+startup_profiler = StartupProfiler()
+
+
+def profile_imports(module: str = "app.main", top: int = 25) -> Dict[str, Any]:
+    """
+    Import `module` in a fresh interpreter with `-X importtime` and return the total import time
+    and the `top` modules by cumulative import time (in milliseconds).
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    imports = []
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append({
+                "module": name,
+                "depth": len(indent) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000
+            })
+
+    total = next((item for item in imports if item["module"] == module), None)
+    return {
+        "module": module,
+        "total_ms": total["cumulative_ms"] if total else None,
+        "modules_imported": len(imports),
+        "top_imports": sorted(imports, key=lambda item: item["cumulative_ms"], reverse=True)[:top]
+    }
@@ -1,43 +1,60 @@
+import fcntl
+import os
+from contextlib import contextmanager
+
 from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance
 from app.core.config import settings
 from app.core.logging import logger
-from app.services.dataset_service import DatasetService
+from app.services.collection_versions import CollectionManager
 
-async def get_qdrant_client() -> QdrantClient:
-    client = QdrantClient(
+def create_qdrant_client() -> QdrantClient:
+    """Client for the configured Qdrant server, without checking the collections."""
+    return QdrantClient(
         host=settings.QDRANT_HOST,
-        port=settings.QDRANT_PORT
+        port=settings.QDRANT_PORT,
+        grpc_port=settings.QDRANT_GRPC_PORT,
+        prefer_grpc=settings.QDRANT_PREFER_GRPC
     )
-    try:
-        client.get_collection(settings.COLLECTION_NAME)
-        print(f'Qdrant connection successfull!\nCollection {settings.COLLECTION_NAME} exist')
-        client.get_collection(settings.COLLECTION_NAME2)
-        print(f'Collection {settings.COLLECTION_NAME2} exist')
-    except:
-        if not client.collection_exists(settings.COLLECTION_NAME):
-            client.create_collection(
-                collection_name=settings.COLLECTION_NAME,
-                vectors_config=VectorParams(
-                    size=settings.VECTOR_SIZE,
-                    distance=Distance.COSINE
-                )
-            )
-            logger.info(f'Created collection {settings.COLLECTION_NAME}')
-         
-        
-        if not client.collection_exists(settings.COLLECTION_NAME2):
-            client.create_collection(
-                collection_name=settings.COLLECTION_NAME2,
-                vectors_config=VectorParams(
-                    size=settings.VECTOR_SIZE,
-                    distance=Distance.COSINE
-                )
-            )
-            logger.info(f'Created collection {settings.COLLECTION_NAME2}')
-        
 
-        await initialize_collection_with_data(client)
+@contextmanager
+def collections_lock():
+    """
+    Exclusive lock on COLLECTION_LOCK_FILE, held by one process of the host at a time. Worker processes
+    starting together take it in turn, so only the first one creates and ingests missing collections.
+    """
+    directory = os.path.dirname(settings.COLLECTION_LOCK_FILE)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(settings.COLLECTION_LOCK_FILE, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+async def get_qdrant_client() -> QdrantClient:
+    """
+    Client with both collections in place: missing ones are created as the first version behind their alias
+    and ingested, existing ones are checked against EMBEDDING_MODEL / VECTOR_SIZE (EmbeddingModelMismatchError).
+    Creation and ingestion run under `collections_lock`; processes that get the lock afterwards find the
+    collections in place and only check them.
+    """
+    client = create_qdrant_client()
+    manager = CollectionManager(client)
+    aliases = (settings.COLLECTION_NAME, settings.COLLECTION_NAME2)
+    if any(manager.resolve(alias) is None for alias in aliases):
+        with collections_lock():
+            created = False
+            for alias in aliases:
+                if manager.ensure(alias):
+                    logger.info(f'Created collection {alias}')
+                    created = True
+            if created:
+                await initialize_collection_with_data(client)
+
+    for alias in aliases:
+        manager.check(alias)
+        print(f'Collection {alias} exist ({manager.resolve(alias)})')
 
     return client
 
@@ -52,15 +69,16 @@ async def check_connection() -> bool:
         return False
     
 async def initialize_collection_with_data(client: QdrantClient):
-    collection_info = client.get_collection(settings.COLLECTION_NAME)
-    if collection_info.points_count > 0:
+    # Ingestion dependencies (datasets, huggingface_hub) are only imported when a collection is empty
+    from app.services.dataset_service import DatasetService
+
+    if client.count(settings.COLLECTION_NAME).count > 0:
         logger.info(f'Collection {settings.COLLECTION_NAME} already contains documents')
     else: 
         logger.info('Starting judgement dataset upload process...')
         await DatasetService.load_judgements_dataset(client)
 
-    collection_info = client.get_collection(settings.COLLECTION_NAME2)
-    if collection_info.points_count > 0:
+    if client.count(settings.COLLECTION_NAME2).count > 0:
         logger.info(f'Collection {settings.COLLECTION_NAME2} already contains documents')
         return
     logger.info('Starting laws dataset upload process...')
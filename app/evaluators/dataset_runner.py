@@ -0,0 +1,227 @@
+"""
+Dataset-scale evaluation: runs a query set through retrieval, generation and the LLM judge
+with bounded concurrency, and writes per-query and aggregate results to Parquet.
+"""
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import pandas as pd
+
+from app.dependencies.qdrant import get_qdrant_client
+from app.evaluators import evaluation
+from app.evaluators.judge_client import track_usage
+from app.services.llm_cache import LLMResponseCache
+from app.services.embedder_service import EmbedderService
+from app.services.qdrant_service import QdrantService
+
+# Query set dataset_type values mapped to QdrantService collection names
+COLLECTIONS = {
+    "judgement": "judgement",
+    "indian_laws": "laws",
+    "laws": "laws",
+}
+
+LATENCY_COLUMNS = ["embedding_ms", "search_ms", "retrieval_ms", "generation_ms", "evaluation_ms", "total_ms"]
+
+
+def load_query_set(path: str) -> List[Dict[str, Any]]:
+    """
+    Load a query set from JSONL or Parquet.
+    Each record needs `query` and `dataset_type` ("judgement" or "indian_laws");
+    `id` and `ground_truth` are optional.
+    """
+    if path.endswith(".parquet"):
+        records = pd.read_parquet(path).to_dict(orient="records")
+    else:
+        with open(path) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+
+    for index, record in enumerate(records):
+        if not record.get("query"):
+            raise ValueError(f"Query set record {index} has no 'query'")
+        if record.get("dataset_type", "judgement") not in COLLECTIONS:
+            raise ValueError(f"Query set record {index} has unknown dataset_type '{record.get('dataset_type')}'")
+        record.setdefault("id", str(index))
+        record.setdefault("dataset_type", "judgement")
+    return records
+
+
+def build_context(search_results, max_context_length: int) -> str:
+    """Join the retrieved documents' content, truncated to max_context_length characters."""
+    context = "\n\n".join(result.payload.get("content", "") for result in search_results)
+    if len(context) > max_context_length:
+        context = context[:max_context_length] + "..."
+    return context
+
+
+async def evaluate_query(
+    record: Dict[str, Any],
+    embedder: EmbedderService,
+    qdrant_services: Dict[str, QdrantService],
+    top_k: int,
+    judge_mode: str,
+    max_context_length: int
+) -> Dict[str, Any]:
+    """Run one query through retrieval, generation and evaluation and return a flat result row."""
+    dataset_type = record["dataset_type"]
+    row = {
+        "id": str(record["id"]),
+        "dataset_type": dataset_type,
+        "query": record["query"],
+        "top_k": top_k,
+        "error": None,
+    }
+    query_start = time.perf_counter()
+
+    try:
+        stage_start = time.perf_counter()
+        query_embedding = await embedder.get_query_embedding(record["query"])
+        row["embedding_ms"] = (time.perf_counter() - stage_start) * 1000
+
+        stage_start = time.perf_counter()
+        search_results = await qdrant_services[COLLECTIONS[dataset_type]].search_similar(query_embedding, top_k)
+        row["search_ms"] = (time.perf_counter() - stage_start) * 1000
+        row["retrieval_ms"] = row["embedding_ms"] + row["search_ms"]
+        row["results_count"] = len(search_results)
+        row["top_score"] = float(search_results[0].score) if search_results else None
+        row["retrieved_ids"] = json.dumps([str(result.id) for result in search_results])
+
+        if not search_results:
+            raise ValueError("No search results found")
+
+        context = build_context(search_results, max_context_length)
+        row["context_length"] = len(context)
+
+        with track_usage() as generation_usage:
+            stage_start = time.perf_counter()
+            answer = await evaluation.getQueryResponse(record["query"], context, dataset_type)
+            row["generation_ms"] = (time.perf_counter() - stage_start) * 1000
+        row["generation_cached"] = generation_usage.cache_hits > 0
+        row["answer"] = answer
+
+        stage_start = time.perf_counter()
+        eval_results = await evaluation.comprehensive_evaluate(
+            record["query"], context, answer, record.get("ground_truth"), judge_mode
+        )
+        row["evaluation_ms"] = (time.perf_counter() - stage_start) * 1000
+
+        for metric, value in eval_results.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                row[metric] = float(value)
+        row["judge_failures"] = len(eval_results.get("failed_metrics", []))
+        judge_usage = eval_results.get("judge_usage", {})
+        row["judge_calls"] = judge_usage.get("calls", 0)
+        row["judge_tokens"] = judge_usage.get("total_tokens", 0)
+        row["judge_cache_hits"] = judge_usage.get("cache_hits", 0)
+    except Exception as e:
+        row["error"] = str(e)
+        print(f"Error evaluating query {row['id']}: {str(e)}")
+
+    row["total_ms"] = (time.perf_counter() - query_start) * 1000
+    return row
+
+
+def aggregate_results(results: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate per-query rows by dataset type: mean scores, latency percentiles and error counts."""
+    metric_columns = [
+        column for column in list(evaluation.JUDGE_METRICS) + ["answer_similarity", "weighted_average"]
+        if column in results.columns
+    ]
+
+    rows = []
+    for dataset_type, group in results.groupby("dataset_type"):
+        succeeded = group[group["error"].isna()]
+        row = {
+            "dataset_type": dataset_type,
+            "queries": len(group),
+            "errors": int(group["error"].notna().sum()),
+        }
+        for column in metric_columns:
+            row[f"{column}_mean"] = succeeded[column].mean()
+        for column in LATENCY_COLUMNS:
+            if column in succeeded.columns:
+                row[f"{column}_p50"] = succeeded[column].quantile(0.5)
+                row[f"{column}_p95"] = succeeded[column].quantile(0.95)
+        for column in ("judge_calls", "judge_tokens", "judge_cache_hits", "judge_failures"):
+            if column in succeeded.columns:
+                row[f"{column}_total"] = succeeded[column].sum()
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+async def run_dataset_evaluation(
+    query_set_path: str,
+    output_dir: str = "evaluation_results",
+    concurrency: int = 4,
+    top_k: int = 5,
+    judge_mode: str = "per_metric",
+    cache_path: Optional[str] = "evaluation_results/judge_cache.sqlite",
+    max_context_length: int = 8000,
+    embedder: Optional[EmbedderService] = None,
+    qdrant_services: Optional[Dict[str, QdrantService]] = None
+) -> Dict[str, Any]:
+    """
+    Evaluate every query in the query set with at most `concurrency` queries in flight.
+    Judge replies are cached on disk in `cache_path` for the duration of the run, so re-runs only pay for
+    new or changed prompts; the judge client's previous cache is restored afterwards.
+    `embedder` and `qdrant_services` (by collection name) default to the configured model and Qdrant server.
+    """
+    records = load_query_set(query_set_path)
+    print(f"Loaded {len(records)} queries from {query_set_path}")
+
+    if embedder is None:
+        embedder = EmbedderService()
+    if qdrant_services is None:
+        client = await get_qdrant_client()
+        qdrant_services = {name: QdrantService(client, name) for name in set(COLLECTIONS.values())}
+
+    previous_cache = evaluation.judge_client.cache
+    if cache_path:
+        evaluation.judge_client.cache = LLMResponseCache(ttl_seconds=None, db_path=cache_path)
+    try:
+        semaphore = asyncio.Semaphore(concurrency)
+        completed = 0
+
+        async def bounded(record):
+            nonlocal completed
+            async with semaphore:
+                row = await evaluate_query(record, embedder, qdrant_services, top_k, judge_mode, max_context_length)
+            completed += 1
+            if completed % 10 == 0 or completed == len(records):
+                print(f"Evaluated {completed}/{len(records)} queries")
+            return row
+
+        start = time.perf_counter()
+        rows = await asyncio.gather(*(bounded(record) for record in records))
+        wall_time_s = time.perf_counter() - start
+    finally:
+        evaluation.judge_client.cache = previous_cache
+
+    results = pd.DataFrame(rows)
+    aggregate = aggregate_results(results)
+    aggregate["wall_time_seconds"] = wall_time_s
+    aggregate["judge_mode"] = judge_mode
+
+    os.makedirs(output_dir, exist_ok=True)
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    per_query_path = os.path.join(output_dir, f"dataset_evaluation_{run_id}_queries.parquet")
+    aggregate_path = os.path.join(output_dir, f"dataset_evaluation_{run_id}_aggregate.parquet")
+    results.to_parquet(per_query_path, index=False)
+    aggregate.to_parquet(aggregate_path, index=False)
+
+    print("\n===== DATASET EVALUATION RESULTS =====")
+    print(aggregate.T)
+    print(f"\nWall time: {wall_time_s:.1f}s for {len(records)} queries")
+    print(f"Per-query results saved to {per_query_path}")
+    print(f"Aggregate results saved to {aggregate_path}")
+
+    return {
+        "queries": len(records),
+        "wall_time_seconds": wall_time_s,
+        "per_query_path": per_query_path,
+        "aggregate_path": aggregate_path,
+    }
@@ -3,29 +3,41 @@ from app.services.qdrant_service import QdrantService
 from app.services.embedder_service import EmbedderService
 from app.evaluators.context import judgement_context, laws_context
 from app.dependencies.qdrant import get_qdrant_client
+from app.evaluators.judge_client import JudgeClient, track_usage
+from app.evaluators.structured_judge import structured_evaluate, JUDGE_METRICS
 from app.core.config import settings
-import google.generativeai as genai
+from app.core.logging import logger
 import pandas as pd
 import os
 import re
 import json
+import time
 from datetime import datetime
-from dotenv import load_dotenv
+from typing import Optional
 
-# Load environment variables
-load_dotenv()
+# Shared async judge client: all metrics and evaluations draw from the same rate limit
+judge_client = JudgeClient(
+    model_name=settings.EVAL_JUDGE_MODEL,
+    requests_per_minute=settings.EVAL_REQUESTS_PER_MINUTE,
+    burst=settings.EVAL_BURST,
+    max_retries=settings.EVAL_MAX_RETRIES,
+    timeout_seconds=settings.EVAL_REQUEST_TIMEOUT_SECONDS,
+    api_key=settings.GOOGLE_API_KEY
+)
 
-# Get API key
-if hasattr(settings, "GOOGLE_API_KEY"):
-    api_key = settings.GOOGLE_API_KEY
-else:
-    api_key = os.environ.get("GOOGLE_API_KEY")
-
-if not api_key:
-    raise ValueError("Google API Key not found in settings or environment variables")
-
-# Configure Gemini API
-genai.configure(api_key=api_key)
+async def _score(metric_label: str, prompt: str) -> Optional[float]:
+    """Send a judge prompt and parse the numerical score from the reply (None if the call or parse fails)."""
+    try:
+        response = await judge_client.generate(prompt)
+        score_text = response.text.strip()
+        score_match = re.search(r'\b(\d+(\.\d+)?)\b', score_text)
+        if score_match:
+            return float(score_match.group(1))
+        logger.error(f"Error evaluating {metric_label}: no score in judge reply {score_text[:100]!r}")
+        return None
+    except Exception as e:
+        logger.error(f"Error evaluating {metric_label}: {e}")
+        return None
 
 async def getQueryResponse(query: str, context: str, context_type: str = "judgement") -> str:
     """Get a response from Gemini for a legal query with context."""
@@ -52,8 +64,7 @@ async def getQueryResponse(query: str, context: str, context_type: str = "judgem
         """
 
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
+        response = await judge_client.generate(prompt)
         return response.text
     except Exception as e:
         print(f"Error generating content: {e}")
@@ -82,17 +93,7 @@ async def evaluate_faithfulness(context: str, answer: str) -> float:
     5. Return ONLY the numerical score between 0 and 10.
     """
     
-    try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-        score_text = response.text.strip()
-        score_match = re.search(r'\b(\d+(\.\d+)?)\b', score_text)
-        if score_match:
-            return float(score_match.group(1))
-        return 5.0
-    except Exception as e:
-        print(f"Error evaluating faithfulness: {e}")
-        return 5.0
+    return await _score("faithfulness", prompt)
 
 async def evaluate_answer_relevancy(question: str, answer: str) -> float:
     """
@@ -116,17 +117,7 @@ async def evaluate_answer_relevancy(question: str, answer: str) -> float:
     4. Return ONLY the numerical score between 0 and 10.
     """
     
-    try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-        score_text = response.text.strip()
-        score_match = re.search(r'\b(\d+(\.\d+)?)\b', score_text)
-        if score_match:
-            return float(score_match.group(1))
-        return 5.0
-    except Exception as e:
-        print(f"Error evaluating answer relevancy: {e}")
-        return 5.0
+    return await _score("answer relevancy", prompt)
 
 async def evaluate_context_relevancy(question: str, context: str) -> float:
     """
@@ -150,17 +141,7 @@ async def evaluate_context_relevancy(question: str, context: str) -> float:
     4. Return ONLY the numerical score between 0 and 10.
     """
     
-    try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-        score_text = response.text.strip()
-        score_match = re.search(r'\b(\d+(\.\d+)?)\b', score_text)
-        if score_match:
-            return float(score_match.group(1))
-        return 5.0
-    except Exception as e:
-        print(f"Error evaluating context relevancy: {e}")
-        return 5.0
+    return await _score("context relevancy", prompt)
 
 async def evaluate_context_precision(question: str, answer: str, context: str) -> float:
     """
@@ -187,17 +168,7 @@ async def evaluate_context_precision(question: str, answer: str, context: str) -
     4. Return ONLY the numerical score between 0 to 10.
     """
     
-    try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-        score_text = response.text.strip()
-        score_match = re.search(r'\b(\d+(\.\d+)?)\b', score_text)
-        if score_match:
-            return float(score_match.group(1))
-        return 5.0
-    except Exception as e:
-        print(f"Error evaluating context precision: {e}")
-        return 5.0
+    return await _score("context precision", prompt)
 
 async def evaluate_answer_completeness(question: str, answer: str, context: str) -> float:
     """
@@ -224,17 +195,7 @@ async def evaluate_answer_completeness(question: str, answer: str, context: str)
     4. Return ONLY the numerical score between 0 and 10.
     """
     
-    try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-        score_text = response.text.strip()
-        score_match = re.search(r'\b(\d+(\.\d+)?)\b', score_text)
-        if score_match:
-            return float(score_match.group(1))
-        return 5.0
-    except Exception as e:
-        print(f"Error evaluating answer completeness: {e}")
-        return 5.0
+    return await _score("answer completeness", prompt)
 
 async def evaluate_citation_quality(answer: str) -> float:
     """
@@ -255,17 +216,7 @@ async def evaluate_citation_quality(answer: str) -> float:
     4. Return ONLY the numerical score between 0 and 10.
     """
     
-    try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-        score_text = response.text.strip()
-        score_match = re.search(r'\b(\d+(\.\d+)?)\b', score_text)
-        if score_match:
-            return float(score_match.group(1))
-        return 5.0
-    except Exception as e:
-        print(f"Error evaluating citation quality: {e}")
-        return 5.0
+    return await _score("citation quality", prompt)
 
 async def evaluate_legal_reasoning(question: str, answer: str) -> float:
     """
@@ -289,84 +240,97 @@ async def evaluate_legal_reasoning(question: str, answer: str) -> float:
     4. Return ONLY the numerical score between 0 and 10.
     """
     
-    try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-        score_text = response.text.strip()
-        score_match = re.search(r'\b(\d+(\.\d+)?)\b', score_text)
-        if score_match:
-            return float(score_match.group(1))
-        return 5.0
-    except Exception as e:
-        print(f"Error evaluating legal reasoning: {e}")
-        return 5.0
+    return await _score("legal reasoning", prompt)
 
-async def comprehensive_evaluate(question: str, context: str, answer: str, ground_truth: str = None):
-    """Run comprehensive RAG evaluation with multiple metrics."""
-    # Existing implementation unchanged
-    
-    # Initialize with base metrics that don't need ground truth
-    metrics = {}
+async def evaluate_answer_similarity(question: str, answer: str, ground_truth: str) -> dict:
+    """
+    Evaluate the answer against an answer generated from the ground-truth context.
+    The two calls are dependent, so they run in sequence within this metric.
+    """
+    # Generate ground truth answer for comparison
+    ground_truth_answer = await getQueryResponse(question, ground_truth)
     
-    print("Evaluating faithfulness...")
-    metrics["faithfulness"] = await evaluate_faithfulness(context, answer)
+    # Semantic similarity evaluation using Gemini
+    similarity_prompt = f"""
+    Task: Rate the semantic similarity between these two legal texts on a scale from 0 to 10.
     
-    print("Evaluating answer relevancy...")
-    metrics["answer_relevancy"] = await evaluate_answer_relevancy(question, answer)
+    Text 1 (Generated Answer):
+    {answer}
     
-    print("Evaluating context relevancy...")
-    metrics["context_relevancy"] = await evaluate_context_relevancy(question, context)
+    Text 2 (Ground Truth Answer):
+    {ground_truth_answer}
     
-    print("Evaluating context precision...")
-    metrics["context_precision"] = await evaluate_context_precision(question, answer, context)
+    Instructions:
+    1. Consider semantic meaning and legal content, not just lexical overlap.
+    2. Return ONLY the numerical score between 0 and 10.
+    """
     
-    print("Evaluating answer completeness...")
-    metrics["answer_completeness"] = await evaluate_answer_completeness(question, answer, context)
+    return {
+        "answer_similarity": await _score("answer similarity", similarity_prompt),
+        "ground_truth_answer": ground_truth_answer
+    }
+
+JUDGE_MODES = ("per_metric", "single_call")
+
+async def comprehensive_evaluate(question: str, context: str, answer: str, ground_truth: str = None, judge_mode: str = "per_metric"):
+    """
+    Run comprehensive RAG evaluation with multiple metrics.
+    Metrics are independent, so they are evaluated concurrently on the shared rate-limited judge client;
+    wall time approaches the slowest single metric instead of the sum of all of them.
     
-    print("Evaluating citation quality...")
-    metrics["citation_quality"] = await evaluate_citation_quality(answer)
+    judge_mode:
+        "per_metric" sends one prompt per metric.
+        "single_call" scores all base metrics in one structured JSON call, sending the context only once.
+    """
+    if judge_mode not in JUDGE_MODES:
+        raise ValueError(f"Unknown judge mode '{judge_mode}', expected one of {JUDGE_MODES}")
     
-    print("Evaluating legal reasoning...")
-    metrics["legal_reasoning"] = await evaluate_legal_reasoning(question, answer)
+    if judge_mode == "single_call":
+        metric_tasks = {
+            "structured_judge": structured_evaluate(judge_client, question, context, answer)
+        }
+    else:
+        metric_tasks = {
+            "faithfulness": evaluate_faithfulness(context, answer),
+            "answer_relevancy": evaluate_answer_relevancy(question, answer),
+            "context_relevancy": evaluate_context_relevancy(question, context),
+            "context_precision": evaluate_context_precision(question, answer, context),
+            "answer_completeness": evaluate_answer_completeness(question, answer, context),
+            "citation_quality": evaluate_citation_quality(answer),
+            "legal_reasoning": evaluate_legal_reasoning(question, answer),
+        }
     
     # If ground truth is available, add golden-reference metrics
     if ground_truth:
-        # Ground truth comparison
-        print("Evaluating against ground truth...")
-        
-        # Generate ground truth answer for comparison
-        ground_truth_answer = await getQueryResponse(question, ground_truth)
-        
-        # Semantic similarity evaluation using Gemini
-        try:
-            similarity_prompt = f"""
-            Task: Rate the semantic similarity between these two legal texts on a scale from 0 to 10.
-            
-            Text 1 (Generated Answer):
-            {answer}
-            
-            Text 2 (Ground Truth Answer):
-            {ground_truth_answer}
-            
-            Instructions:
-            1. Consider semantic meaning and legal content, not just lexical overlap.
-            2. Return ONLY the numerical score between 0 and 10.
-            """
-            
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            response = model.generate_content(similarity_prompt)
-            score_text = response.text.strip()
-            score_match = re.search(r'\b(\d+(\.\d+)?)\b', score_text)
-            
-            if score_match:
-                metrics["answer_similarity"] = float(score_match.group(1))
-            else:
-                metrics["answer_similarity"] = 5.0
-                
-            metrics["ground_truth_answer"] = ground_truth_answer
-        except Exception as e:
-            print(f"Error evaluating answer similarity: {e}")
-            metrics["answer_similarity"] = 5.0
+        metric_tasks["answer_similarity"] = evaluate_answer_similarity(question, answer, ground_truth)
+    
+    metric_timings = {}
+    
+    async def timed(name, coroutine):
+        metric_start = time.perf_counter()
+        value = await coroutine
+        metric_timings[name] = (time.perf_counter() - metric_start) * 1000
+        return name, value
+    
+    print(f"Evaluating {len(metric_tasks)} metric tasks concurrently ({judge_mode})...")
+    evaluation_start = time.perf_counter()
+    with track_usage() as usage:
+        results = await asyncio.gather(*(timed(name, task) for name, task in metric_tasks.items()))
+    
+    # Keep metrics in their declared order
+    metrics = {}
+    for name, value in results:
+        if isinstance(value, dict):
+            metrics.update(value)
+        else:
+            metrics[name] = value
+    
+    metrics["timings_ms"] = {
+        "per_metric": {name: metric_timings[name] for name in metric_tasks},
+        "wall_time": (time.perf_counter() - evaluation_start) * 1000
+    }
+    metrics["judge_mode"] = judge_mode
+    metrics["judge_usage"] = usage.as_dict()
     
     # Calculate overall weighted score
     # Higher weights for legal-specific metrics
@@ -383,15 +347,112 @@ async def comprehensive_evaluate(question: str, context: str, answer: str, groun
     if "answer_similarity" in metrics:
         weights["answer_similarity"] = 1.0
     
-    weighted_sum = sum(metrics[metric] * weights[metric] for metric in metrics if isinstance(metrics[metric], (int, float)))
+    # Metrics the judge failed to score are None; they are reported and left out of the average
+    weighted_sum = sum(metrics[metric] * weights[metric] for metric in metrics if metric in weights and isinstance(metrics[metric], (int, float)))
     total_weight = sum(weights[metric] for metric in metrics if metric in weights and isinstance(metrics[metric], (int, float)))
-    weighted_average = weighted_sum / total_weight
+    weighted_average = weighted_sum / total_weight if total_weight else None
     
     metrics["weighted_average"] = weighted_average
+    metrics["failed_metrics"] = [metric for metric in weights if metric in metrics and metrics[metric] is None]
     
     return metrics
 
-async def evaluate_dataset(dataset_type: str = "judgement"):
+async def compare_judge_modes(question: str, context: str, answer: str, ground_truth: str = None) -> dict:
+    """
+    Evaluate the same sample with both judge modes and report token usage, latency and score agreement.
+    Both modes run one after another so their latencies are not skewed by sharing the rate limit.
+    """
+    per_metric = await comprehensive_evaluate(question, context, answer, ground_truth, judge_mode="per_metric")
+    single_call = await comprehensive_evaluate(question, context, answer, ground_truth, judge_mode="single_call")
+    
+    # Metrics either mode failed to score are excluded from the agreement statistics and counted instead
+    differences = {
+        metric: abs(per_metric[metric] - single_call[metric]) for metric in JUDGE_METRICS
+        if per_metric[metric] is not None and single_call[metric] is not None
+    }
+    
+    def summary(result):
+        return {
+            "scores": {metric: result[metric] for metric in JUDGE_METRICS},
+            "weighted_average": result["weighted_average"],
+            "failed_metrics": [metric for metric in result["failed_metrics"] if metric in JUDGE_METRICS],
+            "judge_error": result.get("judge_error"),
+            "wall_time_ms": result["timings_ms"]["wall_time"],
+            "usage": result["judge_usage"]
+        }
+    
+    per_metric_tokens = per_metric["judge_usage"]["total_tokens"]
+    single_call_tokens = single_call["judge_usage"]["total_tokens"]
+    both_averaged = per_metric["weighted_average"] is not None and single_call["weighted_average"] is not None
+    
+    return {
+        "per_metric": summary(per_metric),
+        "single_call": summary(single_call),
+        "agreement": {
+            "compared_metrics": len(differences),
+            "failures": len(JUDGE_METRICS) - len(differences),
+            "absolute_difference": differences,
+            "mean_absolute_difference": sum(differences.values()) / len(differences) if differences else None,
+            "max_absolute_difference": max(differences.values()) if differences else None,
+            "within_one_point": (
+                sum(1 for diff in differences.values() if diff <= 1.0) / len(differences) if differences else None
+            ),
+            "weighted_average_difference": (
+                abs(per_metric["weighted_average"] - single_call["weighted_average"]) if both_averaged else None
+            )
+        },
+        "token_reduction": 1 - single_call_tokens / per_metric_tokens if per_metric_tokens else None,
+        "speedup": (
+            per_metric["timings_ms"]["wall_time"] / single_call["timings_ms"]["wall_time"]
+            if single_call["timings_ms"]["wall_time"] else None
+        )
+    }
+
+async def compare_judge_modes_report(dataset_types=("judgement", "indian_laws")) -> dict:
+    """
+    Run the judge mode comparison on the reference contexts and save the report.
+    Uses the fixed contexts from app.evaluators.context, so no vector store is needed.
+    """
+    samples = {
+        "judgement": (
+            "Tell me about 'Central Bureau Of Investigation vs Mohammed Yousuf on 25 January, 2016' case in detail",
+            judgement_context
+        ),
+        "indian_laws": ("What is the procedure for filing a plaint in a civil case in India?", laws_context),
+    }
+    
+    report = {"timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "comparisons": {}, "failures": 0}
+    for dataset_type in dataset_types:
+        query, context = samples[dataset_type]
+        print(f"\n===== COMPARING JUDGE MODES FOR {dataset_type.upper()} =====")
+        answer = await getQueryResponse(query, context, dataset_type)
+        comparison = await compare_judge_modes(query, context, answer)
+        report["comparisons"][dataset_type] = comparison
+        report["failures"] += comparison["agreement"]["failures"]
+        
+        print(f"{'Mode':<14}{'Calls':>8}{'Tokens':>10}{'Wall ms':>10}{'Weighted':>10}{'Failed':>8}")
+        for mode in JUDGE_MODES:
+            mode_summary = comparison[mode]
+            weighted = mode_summary['weighted_average']
+            print(f"{mode:<14}{mode_summary['usage']['calls']:>8}{mode_summary['usage']['total_tokens']:>10}"
+                  f"{mode_summary['wall_time_ms']:>10.0f}{weighted if weighted is not None else float('nan'):>10.2f}"
+                  f"{len(mode_summary['failed_metrics']):>8}")
+        agreement = comparison['agreement']
+        if agreement['mean_absolute_difference'] is not None:
+            print(f"Mean absolute score difference: {agreement['mean_absolute_difference']:.2f} "
+                  f"over {agreement['compared_metrics']} metrics ({agreement['failures']} failed)")
+        else:
+            print(f"No metric was scored by both modes ({agreement['failures']} failed)")
+    
+    os.makedirs("evaluation_results", exist_ok=True)
+    report_filename = f"evaluation_results/judge_mode_comparison_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(report_filename, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nJudge mode comparison saved to {report_filename}")
+    
+    return report
+
+async def evaluate_dataset(dataset_type: str = "judgement", judge_mode: str = "per_metric"):
     """Main evaluation function for a single query."""
     print(f"\n===== STARTING RAG EVALUATION FOR {dataset_type.upper()} =====\n")
     start_time = datetime.now()
@@ -470,7 +531,7 @@ async def evaluate_dataset(dataset_type: str = "judgement"):
         
         # Run comprehensive evaluation with ground truth
         print("Running comprehensive evaluation...")
-        eval_results = await comprehensive_evaluate(query, result_context, answer, ground_truth)
+        eval_results = await comprehensive_evaluate(query, result_context, answer, ground_truth, judge_mode)
         
         # Format results as pandas DataFrame for display
         metrics_df = pd.DataFrame({
@@ -481,7 +542,14 @@ async def evaluate_dataset(dataset_type: str = "judgement"):
         # Display results
         print(f"\n===== {dataset_type.upper()} EVALUATION RESULTS =====")
         print(metrics_df)
-        print(f"\nWeighted Average Score: {eval_results['weighted_average']:.2f}/10")
+        if eval_results["weighted_average"] is not None:
+            print(f"\nWeighted Average Score: {eval_results['weighted_average']:.2f}/10")
+        if eval_results["failed_metrics"]:
+            print(f"Metrics the judge failed to score: {', '.join(eval_results['failed_metrics'])}")
+        timings = eval_results.get("timings_ms", {})
+        if timings:
+            print(f"Evaluation wall time: {timings['wall_time']:.0f} ms "
+                  f"(slowest metric: {max(timings['per_metric'].values()):.0f} ms)")
         
         # Create results
         result = {
@@ -494,7 +562,11 @@ async def evaluate_dataset(dataset_type: str = "judgement"):
             "ground_truth_answer": eval_results.get("ground_truth_answer", ""),
             "context_length": len(result_context),
             "metrics": {k: v for k, v in eval_results.items() if isinstance(v, (int, float))},
+            "failed_metrics": eval_results["failed_metrics"],
             "similarity_score": float(search_results[0].score),
+            "evaluation_timings_ms": eval_results.get("timings_ms", {}),
+            "judge_mode": judge_mode,
+            "judge_usage": eval_results.get("judge_usage", {}),
             "execution_time_seconds": (datetime.now() - start_time).total_seconds()
         }
         
@@ -516,20 +588,20 @@ async def evaluate_dataset(dataset_type: str = "judgement"):
         traceback.print_exc()
         return {"error": str(e)}
 
-async def evaluate_judgements_dataset():
+async def evaluate_judgements_dataset(judge_mode: str = "per_metric"):
     """Evaluate judgement dataset."""
-    return await evaluate_dataset("judgement")
+    return await evaluate_dataset("judgement", judge_mode)
 
-async def evaluate_laws_dataset():
+async def evaluate_laws_dataset(judge_mode: str = "per_metric"):
     """Evaluate laws dataset."""
-    return await evaluate_dataset("indian_laws")
+    return await evaluate_dataset("indian_laws", judge_mode)
 
-async def evaluate_all_datasets():
+async def evaluate_all_datasets(judge_mode: str = "per_metric"):
     """Evaluate both judgement and laws datasets."""
     print("\n===== STARTING COMPREHENSIVE EVALUATION OF ALL DATASETS =====\n")
     
-    judgement_results = await evaluate_judgements_dataset()
-    laws_results = await evaluate_laws_dataset()
+    judgement_results = await evaluate_judgements_dataset(judge_mode)
+    laws_results = await evaluate_laws_dataset(judge_mode)
     
     # Combine results
     combined_results = {
@@ -546,7 +618,10 @@ async def evaluate_all_datasets():
     print(f"\nCombined evaluation report saved to {combined_filename}")
     
     # Print summary
-    if "error" not in judgement_results and "error" not in laws_results:
+    if (
+        "error" not in judgement_results and "error" not in laws_results
+        and "weighted_average" in judgement_results["metrics"] and "weighted_average" in laws_results["metrics"]
+    ):
         print("\n===== EVALUATION SUMMARY =====")
         print(f"Judgement Dataset Weighted Score: {judgement_results['metrics']['weighted_average']:.2f}/10")
         print(f"Laws Dataset Weighted Score: {laws_results['metrics']['weighted_average']:.2f}/10")
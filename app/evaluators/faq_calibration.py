@@ -0,0 +1,162 @@
+"""
+Offline calibration of the FAQ fast path threshold.
+A threshold is safe when queries scoring above it against their nearest stored question would get
+a correct stored answer. Two sources of (score, correct) samples are supported:
+  - leave-one-out over the index: each sampled stored question is matched against the *other* stored
+    questions, and the match is correct only if it carries the same answer (needs no labels);
+  - a labeled JSONL file of real user queries with the expected FAQ point id (`faq_id`, null when no
+    stored question answers the query).
+"""
+import json
+import os
+import random
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from app.core.config import settings
+from app.services.faq_index import FAQIndex
+
+DEFAULT_THRESHOLDS = [round(value, 3) for value in np.arange(0.80, 1.0001, 0.01)]
+
+
+def normalize_answer(answer: str) -> str:
+    return re.sub(r"\s+", " ", answer.strip().lower())
+
+
+def threshold_sweep(
+    scores: Sequence[float],
+    correct: Sequence[bool],
+    thresholds: Sequence[float] = DEFAULT_THRESHOLDS
+) -> List[Dict[str, Any]]:
+    """Coverage (fraction of queries answered from the FAQ) and precision of the answers at each threshold."""
+    scores_array = np.asarray(scores, dtype=np.float32)
+    correct_array = np.asarray(correct, dtype=bool)
+    sweep = []
+    for threshold in thresholds:
+        answered = scores_array >= threshold
+        count = int(answered.sum())
+        sweep.append({
+            "threshold": float(threshold),
+            "answered": count,
+            "coverage": count / len(scores_array) if len(scores_array) else 0.0,
+            "precision": float(correct_array[answered].mean()) if count else None
+        })
+    return sweep
+
+
+def recommend_threshold(
+    sweep: List[Dict[str, Any]],
+    target_precision: float = 0.99,
+    min_answered: int = 20
+) -> Optional[float]:
+    """
+    Lowest threshold whose answers reach `target_precision` (on at least `min_answered` queries)
+    and stay at or above it for every higher threshold with enough samples.
+    """
+    recommended = None
+    for row in sorted(sweep, key=lambda row: row["threshold"], reverse=True):
+        if row["answered"] < min_answered:
+            continue
+        if row["precision"] < target_precision:
+            break
+        recommended = row["threshold"]
+    return recommended
+
+
+async def leave_one_out_samples(
+    client: QdrantClient,
+    sample_size: int = 1000,
+    seed: int = 42
+) -> Tuple[List[float], List[bool]]:
+    """Score each sampled stored question against its nearest other stored question."""
+    ids = []
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=settings.FAQ_COLLECTION_NAME,
+            limit=1000,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False
+        )
+        ids.extend(point.id for point in points)
+        if offset is None:
+            break
+    sampled = random.Random(seed).sample(ids, min(sample_size, len(ids)))
+
+    scores, correct = [], []
+    for point in client.retrieve(settings.FAQ_COLLECTION_NAME, ids=sampled, with_payload=True, with_vectors=True):
+        results = client.search(
+            collection_name=settings.FAQ_COLLECTION_NAME,
+            query_vector=point.vector,
+            limit=2
+        )
+        neighbour = next((result for result in results if result.id != point.id), None)
+        if neighbour is None:
+            continue
+        scores.append(float(neighbour.score))
+        correct.append(
+            normalize_answer(neighbour.payload.get("answer", "")) == normalize_answer(point.payload.get("answer", ""))
+        )
+    return scores, correct
+
+
+async def labeled_samples(faq_index: FAQIndex, embedder, records: List[Dict[str, Any]]) -> Tuple[List[float], List[bool]]:
+    """Score labeled queries ({"query", "faq_id"}) against the index."""
+    scores, correct = [], []
+    for record in records:
+        match = await faq_index.nearest(await embedder.get_query_embedding(record["query"]))
+        if match is None:
+            continue
+        scores.append(match.score)
+        correct.append(record.get("faq_id") is not None and match.id == record["faq_id"])
+    return scores, correct
+
+
+async def run_faq_calibration(
+    sample_size: int = 1000,
+    labeled_path: Optional[str] = None,
+    target_precision: float = 0.99,
+    min_answered: int = 20,
+    seed: int = 42
+) -> Dict[str, Any]:
+    from app.dependencies.qdrant import get_qdrant_client
+    from app.services.embedder_service import EmbedderService
+    from app.services.qdrant_service import QdrantService
+
+    client = await get_qdrant_client()
+    if labeled_path:
+        with open(labeled_path) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        faq_index = FAQIndex(QdrantService(client, "faq"))
+        scores, correct = await labeled_samples(faq_index, EmbedderService(), records)
+        source = labeled_path
+    else:
+        scores, correct = await leave_one_out_samples(client, sample_size, seed)
+        source = "leave_one_out"
+    print(f"Scored {len(scores)} queries ({source})")
+
+    sweep = threshold_sweep(scores, correct)
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "collection": settings.FAQ_COLLECTION_NAME,
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "samples": source,
+        "queries": len(scores),
+        "target_precision": target_precision,
+        "recommended_threshold": recommend_threshold(sweep, target_precision, min_answered),
+        "current_threshold": settings.FAQ_THRESHOLD,
+        "sweep": sweep
+    }
+
+
+def save_report(report: Dict[str, Any], output_dir: str = "evaluation_results") -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    filename = os.path.join(output_dir, f"faq_calibration_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(filename, "w") as f:
+        json.dump(report, f, indent=2)
+    return filename
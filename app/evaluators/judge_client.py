@@ -0,0 +1,205 @@
+import asyncio
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+from app.core.logging import logger
+from app.services.llm_cache import LLMResponseCache
+
+# Errors worth retrying: rate limiting, timeouts and transient server failures
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    google_exceptions.TooManyRequests,
+    asyncio.TimeoutError,
+)
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter.
+    Tokens refill continuously at `rate_per_second` up to `capacity`; `acquire` waits until enough are available.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Wait for `tokens` to become available and return the time spent waiting in seconds."""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate_per_second
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+@dataclass
+class JudgeResponse:
+    """Text returned by the judge model along with usage and timing information."""
+    text: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_ms: float = 0.0
+    attempts: int = 1
+    cached: bool = False
+
+
+@dataclass
+class JudgeUsage:
+    """Token and call counters for all judge requests made within a `track_usage` block."""
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cache_hits: int = 0
+
+    def add(self, response: JudgeResponse):
+        self.calls += 1
+        self.prompt_tokens += response.prompt_tokens
+        self.completion_tokens += response.completion_tokens
+        if response.cached:
+            self.cache_hits += 1
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "cache_hits": self.cache_hits
+        }
+
+
+_current_usage: contextvars.ContextVar[Optional[JudgeUsage]] = contextvars.ContextVar("judge_usage", default=None)
+
+
+@contextmanager
+def track_usage():
+    """
+    Collect usage of every judge request made in this block, including requests made by tasks it spawns
+    (tasks copy the context, so they share the same accumulator).
+    """
+    usage = JudgeUsage()
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+
+class JudgeClient:
+    """
+    Async Gemini client shared by all LLM-judge calls.
+    Every request goes through a shared token bucket and is retried with exponential backoff on transient errors.
+    Replies can be cached in an LLMResponseCache, so re-running an evaluation only pays for prompts that changed.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "gemini-2.0-flash",
+        requests_per_minute: float = 60,
+        burst: int = 10,
+        max_retries: int = 4,
+        base_backoff_seconds: float = 1.0,
+        timeout_seconds: float = 60.0,
+        cache: Optional[LLMResponseCache] = None,
+        api_key: Optional[str] = None
+    ):
+        self.model_name = model_name
+        self.api_key = api_key
+        self.cache = cache
+        self.rate_limiter = TokenBucket(requests_per_minute / 60.0, burst)
+        self.max_retries = max_retries
+        self.base_backoff_seconds = base_backoff_seconds
+        self.timeout_seconds = timeout_seconds
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            if self.api_key is not None:
+                if not self.api_key:
+                    raise ValueError("GOOGLE_API_KEY is required for LLM-judge evaluation")
+                genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    async def generate(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> JudgeResponse:
+        """Generate content for `prompt`, respecting the rate limit and retrying transient failures."""
+        cache_key = None
+        if self.cache is not None:
+            cache_key = LLMResponseCache.make_key(self.model_name, prompt, generation_config)
+            cached_value = await self.cache.get(cache_key)
+            if cached_value is not None:
+                cached_response = JudgeResponse(
+                    text=cached_value["text"],
+                    prompt_tokens=cached_value.get("prompt_tokens", 0),
+                    completion_tokens=cached_value.get("completion_tokens", 0),
+                    cached=True
+                )
+                self._track(cached_response)
+                return cached_response
+
+        attempt = 0
+        while True:
+            attempt += 1
+            await self.rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt, generation_config=generation_config),
+                    timeout=self.timeout_seconds
+                )
+                usage = getattr(response, "usage_metadata", None)
+                judge_response = JudgeResponse(
+                    text=response.text,
+                    prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+                    completion_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+                    latency_ms=(time.perf_counter() - start) * 1000,
+                    attempts=attempt
+                )
+                if cache_key is not None:
+                    await self.cache.set(cache_key, {
+                        "text": judge_response.text,
+                        "prompt_tokens": judge_response.prompt_tokens,
+                        "completion_tokens": judge_response.completion_tokens
+                    })
+                self._track(judge_response)
+                return judge_response
+            except RETRYABLE_ERRORS as e:
+                if attempt > self.max_retries:
+                    raise
+                delay = self.base_backoff_seconds * (2 ** (attempt - 1))
+                delay += random.uniform(0, delay)
+                logger.warning(
+                    f"Judge request failed ({type(e).__name__}), retrying in {delay:.1f}s "
+                    f"(attempt {attempt}/{self.max_retries})"
+                )
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _track(response: JudgeResponse):
+        tracked_usage = _current_usage.get()
+        if tracked_usage is not None:
+            tracked_usage.add(response)
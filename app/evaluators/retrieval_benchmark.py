@@ -0,0 +1,214 @@
+"""
+LLM-free retrieval benchmark.
+Every question stored in the laws Q&A collection is a labeled query whose relevant document is
+its own point, so recall@k, MRR and nDCG can be measured without calling Gemini.
+"""
+import json
+import os
+import random
+import re
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from app.core.config import settings
+from app.services.adaptive_retrieval import RetrievalPolicy
+from app.services.embedder_service import EmbedderService
+from app.services.qdrant_service import QdrantService
+from app.services.pipeline_trace_store import summarize
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", question.strip().lower())
+
+
+def sample_labeled_pairs(
+    client: QdrantClient,
+    collection_name: str,
+    sample_size: int = 1000,
+    seed: int = 42
+) -> List[Tuple[str, Set]]:
+    """
+    Scroll the question field of every point and sample (question, relevant point ids) pairs.
+    Points sharing the same normalized question are all counted as relevant for it.
+    """
+    ids_by_question: Dict[str, Set] = {}
+    text_by_question: Dict[str, str] = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=1000,
+            offset=offset,
+            with_payload=["metadata.question"],
+            with_vectors=False
+        )
+        for point in points:
+            question = (point.payload or {}).get("metadata", {}).get("question")
+            if not question:
+                continue
+            key = normalize_question(question)
+            ids_by_question.setdefault(key, set()).add(point.id)
+            text_by_question.setdefault(key, question)
+        if offset is None:
+            break
+
+    keys = sorted(ids_by_question)
+    random.Random(seed).shuffle(keys)
+    return [(text_by_question[key], ids_by_question[key]) for key in keys[:sample_size]]
+
+
+def compute_retrieval_metrics(
+    retrieved_ids: Sequence[Sequence],
+    relevant_ids: Sequence[Set],
+    ks: Sequence[int] = (1, 3, 5, 10)
+) -> Dict[str, float]:
+    """
+    Compute recall@k, MRR and nDCG@k with binary relevance.
+    Hits are laid out as an (queries x max_k) matrix so every metric is a vectorized reduction.
+    """
+    max_k = max(ks)
+    hits = np.zeros((len(retrieved_ids), max_k), dtype=np.float32)
+    for row, (retrieved, relevant) in enumerate(zip(retrieved_ids, relevant_ids)):
+        for rank, point_id in enumerate(list(retrieved)[:max_k]):
+            if point_id in relevant:
+                hits[row, rank] = 1.0
+    relevant_counts = np.array([len(relevant) for relevant in relevant_ids], dtype=np.float32)
+
+    ranks = np.arange(1, max_k + 1, dtype=np.float32)
+    discounts = 1.0 / np.log2(ranks + 1)
+
+    metrics = {}
+    for k in ks:
+        found = hits[:, :k].sum(axis=1)
+        metrics[f"recall@{k}"] = float(np.mean(found / np.minimum(relevant_counts, k)))
+        dcg = (hits[:, :k] * discounts[:k]).sum(axis=1)
+        ideal_hits = np.minimum(relevant_counts, k).astype(int)
+        idcg = np.array([discounts[:count].sum() for count in ideal_hits], dtype=np.float32)
+        metrics[f"ndcg@{k}"] = float(np.mean(np.divide(dcg, idcg, out=np.zeros_like(dcg), where=idcg > 0)))
+
+    first_hit = np.argmax(hits > 0, axis=1)
+    has_hit = hits.max(axis=1) > 0
+    metrics["mrr"] = float(np.mean(np.where(has_hit, 1.0 / (first_hit + 1), 0.0)))
+    return metrics
+
+
+def evaluate_policy(
+    retrieved_ids: Sequence[Sequence],
+    retrieved_scores: Sequence[Sequence[float]],
+    relevant_ids: Sequence[Set],
+    policy: RetrievalPolicy
+) -> Dict[str, Any]:
+    """
+    Apply a retrieval policy to each query's ranked hits and report how many hits it keeps
+    and how often a relevant hit survives the cut (recall at the chosen k).
+    """
+    chosen_k = []
+    kept_relevant = 0
+    for ids, scores, relevant in zip(retrieved_ids, retrieved_scores, relevant_ids):
+        k = policy.select_k(list(scores))
+        chosen_k.append(k)
+        if any(point_id in relevant for point_id in list(ids)[:k]):
+            kept_relevant += 1
+    return {
+        "policy": policy.describe(),
+        "k": summarize(chosen_k),
+        "recall_at_chosen_k": kept_relevant / len(chosen_k) if chosen_k else 0.0
+    }
+
+
+async def run_retrieval_benchmark(
+    sample_size: int = 1000,
+    batch_size: int = 64,
+    top_k: int = 10,
+    ks: Sequence[int] = (1, 3, 5, 10),
+    latency_sample_size: int = 100,
+    seed: int = 42,
+    policies: Optional[Sequence[RetrievalPolicy]] = None
+) -> Dict[str, Any]:
+    """
+    Embed sampled questions and search them in batches, then score the rankings.
+    Single-query search latency is also measured on a subset, since that is what the query route pays.
+    Each of `policies` is evaluated on the same hits (fetched deep enough for all of them), to calibrate
+    the adaptive retrieval cut per collection.
+    """
+    from app.dependencies.qdrant import get_qdrant_client
+
+    client = await get_qdrant_client()
+    embedder = EmbedderService()
+    qdrant_service = QdrantService(client, "laws")
+
+    pairs = sample_labeled_pairs(client, settings.COLLECTION_NAME2, sample_size, seed)
+    if not pairs:
+        raise ValueError(f"No labeled questions found in {settings.COLLECTION_NAME2}")
+    questions = [question for question, _ in pairs]
+    relevant = [ids for _, ids in pairs]
+    print(f"Sampled {len(pairs)} labeled questions from {settings.COLLECTION_NAME2}")
+
+    embedding_ms = 0.0
+    search_ms = 0.0
+    vectors: List[np.ndarray] = []
+    retrieved: List[List] = []
+    fetched_ids: List[List] = []
+    retrieved_scores: List[List[float]] = []
+    policies = list(policies or [])
+    fetch_k = max([top_k] + [policy.fetch_limit for policy in policies])
+    for start in range(0, len(questions), batch_size):
+        batch = questions[start:start + batch_size]
+
+        stage_start = time.perf_counter()
+        batch_vectors = await embedder.get_document_embeddings([{"content": question} for question in batch])
+        embedding_ms += (time.perf_counter() - stage_start) * 1000
+
+        stage_start = time.perf_counter()
+        batch_results = await qdrant_service.search_batch(batch_vectors, fetch_k)
+        search_ms += (time.perf_counter() - stage_start) * 1000
+
+        vectors.extend(batch_vectors)
+        retrieved.extend([[point.id for point in results[:top_k]] for results in batch_results])
+        fetched_ids.extend([[point.id for point in results] for results in batch_results])
+        retrieved_scores.extend([[point.score for point in results] for results in batch_results])
+
+    single_search_ms = []
+    for vector in vectors[:latency_sample_size]:
+        stage_start = time.perf_counter()
+        await qdrant_service.search_similar(vector, top_k)
+        single_search_ms.append((time.perf_counter() - stage_start) * 1000)
+
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "collection": settings.COLLECTION_NAME2,
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "queries": len(pairs),
+        "top_k": top_k,
+        "metrics": compute_retrieval_metrics(retrieved, relevant, ks),
+        "policies": [
+            evaluate_policy(fetched_ids, retrieved_scores, relevant, policy) for policy in policies
+        ],
+        "latency": {
+            "embedding_ms_per_query": embedding_ms / len(pairs),
+            "batch_search_ms_per_query": search_ms / len(pairs),
+            "single_search_ms": summarize(single_search_ms),
+        }
+    }
+
+
+def check_regression(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.01) -> List[str]:
+    """Return the metrics that dropped by more than `tolerance` (absolute) against the baseline."""
+    failures = []
+    for metric, baseline_value in baseline.get("metrics", {}).items():
+        value = report["metrics"].get(metric)
+        if value is not None and value < baseline_value - tolerance:
+            failures.append(f"{metric}: {value:.4f} < baseline {baseline_value:.4f}")
+    return failures
+
+
+def save_report(report: Dict[str, Any], output_dir: str = "evaluation_results") -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    filename = os.path.join(output_dir, f"retrieval_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(filename, "w") as f:
+        json.dump(report, f, indent=2)
+    return filename
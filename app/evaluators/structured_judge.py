@@ -0,0 +1,92 @@
+import json
+import re
+from typing import Dict, Any
+
+from pydantic import BaseModel, Field, ValidationError
+
+from app.core.logging import logger
+from app.evaluators.judge_client import JudgeClient
+
+# Metrics scored in a single call, with the instruction given to the judge for each
+JUDGE_METRICS = {
+    "faithfulness": "Is all information in the answer supported by the context, without contradictions or hallucinated facts?",
+    "answer_relevancy": "Does the answer directly address the specific question and its main intent?",
+    "context_relevancy": "Does the retrieved context contain the information needed to answer the question?",
+    "context_precision": "What share of the retrieved context was actually relevant to answering the question?",
+    "answer_completeness": "Does the answer include all information from the context that pertains to the question?",
+    "citation_quality": "Does the answer cite legal cases, statutes or other authorities specifically and relevantly?",
+    "legal_reasoning": "Does the answer apply legal principles and doctrines logically?",
+}
+
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {metric: {"type": "number"} for metric in JUDGE_METRICS},
+    "required": list(JUDGE_METRICS),
+}
+
+
+class JudgeScores(BaseModel):
+    """Validated scores returned by the structured judge."""
+    faithfulness: float = Field(ge=0, le=10)
+    answer_relevancy: float = Field(ge=0, le=10)
+    context_relevancy: float = Field(ge=0, le=10)
+    context_precision: float = Field(ge=0, le=10)
+    answer_completeness: float = Field(ge=0, le=10)
+    citation_quality: float = Field(ge=0, le=10)
+    legal_reasoning: float = Field(ge=0, le=10)
+
+
+class JudgeParseError(Exception):
+    """Raised when the judge reply is not valid JSON matching JudgeScores."""
+
+
+def build_structured_prompt(question: str, context: str, answer: str) -> str:
+    """Build a prompt that asks for every metric at once, sending the context only once."""
+    criteria = "\n".join(f"- {metric}: {instruction}" for metric, instruction in JUDGE_METRICS.items())
+    return f"""
+    Task: Evaluate a legal RAG system's answer on several criteria.
+
+    Question:
+    {question}
+
+    Retrieved context:
+    {context}
+
+    Answer:
+    {answer}
+
+    Criteria:
+    {criteria}
+
+    Instructions:
+    1. Rate each criterion independently on a scale from 0 to 10.
+    2. Return ONLY a JSON object with one numerical score per criterion.
+    """
+
+
+def parse_judge_scores(text: str) -> Dict[str, float]:
+    """Parse and validate the judge reply, tolerating a surrounding markdown code fence."""
+    cleaned = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip())
+    try:
+        return JudgeScores.model_validate(json.loads(cleaned)).model_dump()
+    except (json.JSONDecodeError, ValidationError) as e:
+        raise JudgeParseError(f"Invalid judge reply: {str(e)}") from e
+
+
+async def structured_evaluate(client: JudgeClient, question: str, context: str, answer: str) -> Dict[str, Any]:
+    """
+    Score all JUDGE_METRICS in a single call with a JSON schema response.
+    If the call fails or the reply does not validate, every metric is None and `judge_error` says why.
+    """
+    prompt = build_structured_prompt(question, context, answer)
+    generation_config = {
+        "response_mime_type": "application/json",
+        "response_schema": RESPONSE_SCHEMA,
+        "temperature": 0.0,
+    }
+    try:
+        response = await client.generate(prompt, generation_config=generation_config)
+        return parse_judge_scores(response.text)
+    except Exception as e:
+        logger.error(f"Error evaluating metrics in single call: {e}")
+        return {**{metric: None for metric in JUDGE_METRICS}, "judge_error": str(e)}
@@ -1,14 +1,31 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
 from fastapi.middleware.cors import CORSMiddleware
 from app.dependencies.qdrant import get_qdrant_client
-from app.api.dependencies import initialize_judgement_pipeline_service, initialize_laws_pipeline_service
+from app.api.dependencies import (
+    initialize_judgement_pipeline_service, initialize_laws_pipeline_service, warm_up_services, create_alias_watcher,
+    create_cache_warmer, get_usage_accountant, get_llm_generator
+)
+from app.services.global_pipeline_monitor import GlobalPipelineMonitor
+from app.core.startup_profiler import startup_profiler
+from app.core.logging import logger
+from app.core.compression import CompressionMiddleware
 from app.api.routes import query  # Import the query router
 from app.api.routes import pipeline_visualization  # Import the pipeline visualization router
+from app.api.routes import usage
 import os
 
-app = FastAPI(title=settings.PROJECT_NAME)
+app = FastAPI(title=settings.PROJECT_NAME, default_response_class=ORJSONResponse)
+
+if settings.RESPONSE_COMPRESSION:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.RESPONSE_COMPRESSION_MIN_BYTES,
+        gzip_level=settings.RESPONSE_GZIP_LEVEL,
+        brotli_quality=settings.RESPONSE_BROTLI_QUALITY
+    )
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,22 +35,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files directory
-app.mount("/api/static", StaticFiles(directory="/var/www/nyai-static"), name="static")
+# Mount static files directory (skipped on machines without the deployed assets, e.g. benchmark runs)
+if os.path.isdir(settings.STATIC_DIR):
+    app.mount("/api/static", StaticFiles(directory=settings.STATIC_DIR), name="static")
 
 @app.on_event("startup")
 async def startup_events():
     print(f"GOOGLE_API_KEY configured: {bool(settings.GOOGLE_API_KEY)}")
+    # Fail on a missing LLM API key before anything else starts (LLMConfigurationError)
+    get_llm_generator()
     # First initialize Qdrant client
-    qdrant_client = await get_qdrant_client()
+    with startup_profiler.phase("qdrant_client"):
+        qdrant_client = await get_qdrant_client()
     # Then initialize pipeline service
-    await initialize_judgement_pipeline_service(qdrant_client)
-    await initialize_laws_pipeline_service(qdrant_client)
+    with startup_profiler.phase("pipeline_services"):
+        await initialize_judgement_pipeline_service(qdrant_client)
+        await initialize_laws_pipeline_service(qdrant_client)
+    # Follow reindexes that swap a collection alias while the server runs
+    if settings.COLLECTION_WATCH_SECONDS > 0:
+        app.state.alias_watcher = create_alias_watcher(qdrant_client)
+        app.state.alias_watcher.start()
+    # Load models before the first request instead of during it
+    if settings.STARTUP_WARM_UP:
+        with startup_profiler.phase("warm_up"):
+            warm_up_services(startup_profiler)
+    # Replay the most frequent logged queries in the background; serving starts without waiting for it
+    app.state.cache_warmer = create_cache_warmer()
+    if app.state.cache_warmer is not None:
+        app.state.cache_warmer.start()
+    # Traces, query frequencies and usage are recorded in memory and written to their files in the background
+    GlobalPipelineMonitor().trace_store.start()
+    query_log = GlobalPipelineMonitor().query_log
+    if query_log is not None:
+        query_log.start()
+    usage_accountant = get_usage_accountant()
+    if usage_accountant is not None:
+        usage_accountant.start()
+    for phase in startup_profiler.phases:
+        logger.info(f"Startup {phase['phase']}: {phase['time_ms']:.1f} ms")
     return {"status": "initialized"}
 
+@app.on_event("shutdown")
+async def shutdown_events():
+    watcher = getattr(app.state, "alias_watcher", None)
+    if watcher is not None:
+        await watcher.stop()
+    cache_warmer = getattr(app.state, "cache_warmer", None)
+    if cache_warmer is not None:
+        await cache_warmer.stop()
+    await GlobalPipelineMonitor().trace_store.stop()
+    query_log = GlobalPipelineMonitor().query_log
+    if query_log is not None:
+        await query_log.stop()
+    usage_accountant = get_usage_accountant()
+    if usage_accountant is not None:
+        await usage_accountant.stop()
+
 # Include routers with the correct prefix
 app.include_router(query.router, prefix="/v1")  # This will result in /api/v1/query/laws
 app.include_router(pipeline_visualization.router, prefix="/v1")
+app.include_router(usage.router, prefix="/v1")
 
 @app.get('/health')
 async def health_check():
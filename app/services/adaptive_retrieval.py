@@ -0,0 +1,105 @@
+from typing import Any, Dict, List, Sequence, Tuple
+
+from app.core.config import settings
+
+CUT_RULES = ("fixed", "gap", "relative")
+
+
+class RetrievalPolicy:
+    """
+    Decides how many search hits go into the prompt.
+    "fixed" keeps `top_k` hits. The adaptive rules over-fetch `fetch_k` hits and cut the list by score:
+    "gap" stops at the largest drop between consecutive scores if that drop is at least `cut_value`,
+    "relative" keeps hits scoring at least `cut_value` times the top score.
+    Adaptive cuts always keep between `min_k` and `max_k` hits (fewer only if fewer were found).
+    """
+
+    def __init__(
+        self,
+        rule: str = "fixed",
+        cut_value: float = 0.0,
+        top_k: int = 10,
+        fetch_k: int = 20,
+        min_k: int = 1,
+        max_k: int = 10
+    ):
+        if rule not in CUT_RULES:
+            raise ValueError(f"Unknown retrieval cut rule '{rule}', expected one of {', '.join(CUT_RULES)}")
+        if not 1 <= min_k <= max_k:
+            raise ValueError("Retrieval bounds must satisfy 1 <= min_k <= max_k")
+        self.rule = rule
+        self.cut_value = cut_value
+        self.top_k = top_k
+        self.fetch_k = max(fetch_k, max_k)
+        self.min_k = min_k
+        self.max_k = max_k
+
+    @property
+    def fetch_limit(self) -> int:
+        """Number of hits to request from the vector store."""
+        return self.top_k if self.rule == "fixed" else self.fetch_k
+
+    def select_k(self, scores: Sequence[float]) -> int:
+        """Number of leading hits to keep, given the scores of the fetched hits in ranked order."""
+        if self.rule == "fixed":
+            return min(self.top_k, len(scores))
+        if not scores:
+            return 0
+
+        upper = min(self.max_k, len(scores))
+        lower = min(self.min_k, upper)
+        if self.rule == "relative":
+            threshold = scores[0] * self.cut_value
+            k = sum(1 for score in scores[:upper] if score >= threshold)
+        else:
+            # Largest drop between positions lower..upper (a drop after the last kept hit counts too)
+            k = upper
+            largest_gap = None
+            for position in range(lower, min(upper + 1, len(scores))):
+                gap = scores[position - 1] - scores[position]
+                if gap >= self.cut_value and (largest_gap is None or gap > largest_gap):
+                    largest_gap = gap
+                    k = position
+        return max(lower, min(k, upper))
+
+    def apply(self, results: List[Any]) -> Tuple[List[Any], Dict[str, Any]]:
+        """
+        Cut ranked search results (objects with a `score`) and describe the decision for the monitor.
+        """
+        scores = [float(result.score) for result in results]
+        k = self.select_k(scores)
+        return results[:k], {
+            "rule": self.rule,
+            "fetched": len(results),
+            "k": k,
+            "scores": scores,
+            "cut_score": scores[k - 1] if k else None
+        }
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "rule": self.rule,
+            "cut_value": self.cut_value,
+            "top_k": self.top_k,
+            "fetch_k": self.fetch_k,
+            "min_k": self.min_k,
+            "max_k": self.max_k
+        }
+
+    @classmethod
+    def from_settings(cls, pipeline_type: str) -> "RetrievalPolicy":
+        """Policy for a pipeline type ("judgement" or "law") from the RETRIEVAL_* settings."""
+        if not settings.RETRIEVAL_ADAPTIVE:
+            return cls(top_k=settings.RETRIEVAL_TOP_K)
+        if pipeline_type == "judgement":
+            rule, cut_value = settings.JUDGEMENT_CUT_RULE, settings.JUDGEMENT_CUT_VALUE
+        else:
+            rule, cut_value = settings.LAWS_CUT_RULE, settings.LAWS_CUT_VALUE
+        return cls(
+            rule=rule,
+            cut_value=cut_value,
+            top_k=settings.RETRIEVAL_TOP_K,
+            fetch_k=settings.RETRIEVAL_FETCH_K,
+            min_k=settings.RETRIEVAL_MIN_K,
+            max_k=settings.RETRIEVAL_MAX_K
+        )
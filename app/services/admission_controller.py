@@ -0,0 +1,159 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+from app.core.exceptions import AdmissionRejectedError
+from app.core.logging import logger
+from app.services.pipeline_trace_store import summarize
+
+
+class _Waiter:
+    __slots__ = ("user_id", "future", "enqueued_at")
+
+    def __init__(self, user_id: Optional[str], future: asyncio.Future):
+        self.user_id = user_id
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class AdmissionController:
+    """
+    Bounds the number of in-flight LLM calls, globally and per user_id.
+    Requests that cannot run immediately wait in a bounded FIFO queue; a request is rejected
+    when the queue is full, when its expected wait already exceeds `max_wait_seconds`,
+    or when it is still queued at that deadline. Rejections carry a Retry-After estimate.
+    Anonymous requests (no user_id) are only subject to the global limit.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 8,
+        max_per_user: int = 2,
+        max_queue: int = 64,
+        max_wait_seconds: float = 10.0,
+        sample_size: int = 1000
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.in_flight = 0
+        self.in_flight_by_user: Dict[str, int] = {}
+        self._waiters: Deque[_Waiter] = deque()
+        self._wait_ms: Deque[float] = deque(maxlen=sample_size)
+        self._avg_hold_seconds: Optional[float] = None
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "deadline": 0}
+
+    def _has_capacity(self, user_id: Optional[str]) -> bool:
+        if self.in_flight >= self.max_concurrent:
+            return False
+        return user_id is None or self.in_flight_by_user.get(user_id, 0) < self.max_per_user
+
+    def _start(self, user_id: Optional[str]):
+        self.in_flight += 1
+        if user_id is not None:
+            self.in_flight_by_user[user_id] = self.in_flight_by_user.get(user_id, 0) + 1
+
+    def _finish(self, user_id: Optional[str], held_seconds: Optional[float] = None):
+        self.in_flight -= 1
+        if user_id is not None:
+            remaining = self.in_flight_by_user[user_id] - 1
+            if remaining:
+                self.in_flight_by_user[user_id] = remaining
+            else:
+                del self.in_flight_by_user[user_id]
+        # Exponentially weighted average of how long an admitted call holds its slot
+        if held_seconds is not None:
+            self._avg_hold_seconds = (
+                held_seconds if self._avg_hold_seconds is None
+                else 0.8 * self._avg_hold_seconds + 0.2 * held_seconds
+            )
+        self._dispatch()
+
+    def _dispatch(self):
+        """Admit queued requests in arrival order, skipping users that are at their own limit."""
+        for waiter in list(self._waiters):
+            if self.in_flight >= self.max_concurrent:
+                break
+            if waiter.future.done():
+                self._waiters.remove(waiter)
+                continue
+            if self._has_capacity(waiter.user_id):
+                self._waiters.remove(waiter)
+                self._start(waiter.user_id)
+                waiter.future.set_result(None)
+
+    def _expected_wait_seconds(self, queue_position: int) -> Optional[float]:
+        if self._avg_hold_seconds is None:
+            return None
+        return self._avg_hold_seconds * (queue_position + 1) / self.max_concurrent
+
+    def _retry_after(self) -> int:
+        expected = self._expected_wait_seconds(len(self._waiters))
+        return max(1, math.ceil(expected if expected is not None else self.max_wait_seconds))
+
+    def _reject(self, reason: str, message: str):
+        self.rejected[reason] += 1
+        retry_after = self._retry_after()
+        logger.warning(f"LLM admission rejected ({reason}): {message}, retry after {retry_after}s")
+        raise AdmissionRejectedError(message, retry_after)
+
+    async def _acquire(self, user_id: Optional[str]) -> float:
+        """Wait for a slot and return the time spent queued in milliseconds."""
+        waiter = _Waiter(user_id, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self._dispatch()
+        if waiter.future.done():
+            return 0.0
+
+        position = len(self._waiters) - 1
+        if position >= self.max_queue:
+            self._waiters.remove(waiter)
+            self._reject("queue_full", f"LLM queue is full ({self.max_queue} waiting)")
+        expected = self._expected_wait_seconds(position)
+        if expected is not None and expected > self.max_wait_seconds:
+            self._waiters.remove(waiter)
+            self._reject("deadline", f"expected LLM queue wait {expected:.1f}s exceeds {self.max_wait_seconds:.1f}s")
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                self._waiters.remove(waiter)
+                self._reject("deadline", f"waited {self.max_wait_seconds:.1f}s for an LLM slot")
+            # Admitted just as the deadline expired; keep the slot
+        except asyncio.CancelledError:
+            if waiter.future.done():
+                self._finish(user_id)
+            else:
+                self._waiters.remove(waiter)
+            raise
+        return (time.monotonic() - waiter.enqueued_at) * 1000
+
+    @asynccontextmanager
+    async def admit(self, user_id: Optional[str] = None):
+        """Hold an LLM slot for the duration of the block, waiting in the queue if necessary."""
+        wait_ms = await self._acquire(user_id)
+        self.admitted += 1
+        self._wait_ms.append(wait_ms)
+        started = time.monotonic()
+        try:
+            yield wait_ms
+        finally:
+            self._finish(user_id, time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_per_user": self.max_per_user,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "avg_hold_ms": self._avg_hold_seconds * 1000 if self._avg_hold_seconds is not None else None,
+            "wait_ms": summarize(list(self._wait_ms))
+        }
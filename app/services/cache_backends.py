@@ -0,0 +1,165 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+from app.core.logging import logger
+
+
+class CacheBackend(ABC):
+    """
+    Shared key-value tier behind the per-process caches. Values are JSON-serializable and
+    `ttl_seconds` of None means the entry never expires.
+    """
+
+    name = "backend"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache table in a local SQLite file (WAL mode), shared by every worker process on the host.
+    Each process opens its own connection, so the backend must be created after workers fork.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, table: str = "llm_cache", max_entries: int = 100000):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL
+            )
+            """
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_created_at ON {table} (created_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"Cache read from {self.path} failed: {str(e)}")
+                return None
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds is not None else None
+        with self._lock:
+            try:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, expires_at)
+                )
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= 1000:
+                    self._prune(now)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Cache write to {self.path} failed: {str(e)}")
+
+    def _prune(self, now: float):
+        """Drop expired rows and the oldest rows beyond max_entries. Caller holds the lock."""
+        self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN "
+            f"(SELECT key FROM {self.table} ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self._writes_since_prune = 0
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache in a Redis-compatible server, shared by workers across hosts.
+    `client` can be any object with Redis' get/set(ex=)/scan_iter/delete methods, so a local
+    stand-in can replace the server; otherwise a client is created from `url` (requires `redis`).
+    """
+
+    name = "redis"
+
+    def __init__(self, url: Optional[str] = None, prefix: str = "nyai:llm_cache:", client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("The redis cache backend requires the 'redis' package (pip install redis)") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.error(f"Redis cache read failed: {str(e)}")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        try:
+            self.client.set(
+                self.prefix + key,
+                json.dumps(value),
+                ex=max(1, int(ttl_seconds)) if ttl_seconds is not None else None
+            )
+        except Exception as e:
+            logger.error(f"Redis cache write failed: {str(e)}")
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+def create_cache_backend(location: str, table: str = "llm_cache", max_entries: int = 100000) -> Optional[CacheBackend]:
+    """
+    Build a shared cache backend from a location string:
+    empty for none, `redis://` / `rediss://` URLs for Redis, anything else is a SQLite file path.
+    """
+    if not location:
+        return None
+    if location.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCacheBackend(location, prefix=f"nyai:{table}:")
+    return SQLiteCacheBackend(location, table=table, max_entries=max_entries)
+
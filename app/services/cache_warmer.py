@@ -0,0 +1,127 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from app.core.logging import logger
+from app.services.pipeline_service import RAGPipelineService
+from app.services.query_log import QueryFrequencyLog
+
+WARMER_USER_ID = "cache-warmer"
+WARMUP_LEASE = "cache_warmup"
+
+
+class CacheWarmer:
+    """
+    Replays the most frequent logged queries in the background after startup, so the first users after a
+    deploy or restart find the search result cache (and, with `generate`, the LLM response cache) filled.
+    Each query runs the same steps as a request with default options: embedding, FAQ lookup, retrieval and,
+    optionally, context building and generation. No monitor events are broadcast and nothing is recorded
+    in the query log. At most `concurrency` queries run at once, with a pause after each so requests keep
+    priority; whatever is unfinished after `budget_seconds` is cancelled. LLM calls go through admission
+    control as the user "cache-warmer", so they never take more than the per-user share of LLM slots.
+    The worker processes sharing the query log file take a lease in it, so only one of them replays the
+    queries into the shared caches; the others skip the warm-up until the lease runs out after the budget.
+    """
+
+    def __init__(
+        self,
+        query_log: QueryFrequencyLog,
+        pipelines: Dict[str, RAGPipelineService],
+        limit: int = 100,
+        min_count: int = 3,
+        concurrency: int = 2,
+        budget_seconds: float = 120.0,
+        generate: bool = False,
+        pause_seconds: float = 0.05
+    ):
+        self.query_log = query_log
+        self.pipelines = pipelines
+        self.limit = limit
+        self.min_count = min_count
+        self.concurrency = concurrency
+        self.budget_seconds = budget_seconds
+        self.generate = generate
+        self.pause_seconds = pause_seconds
+        self.holder = uuid.uuid4().hex
+        self.report: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def warm_query(self, pipeline: RAGPipelineService, query: str) -> str:
+        """Run one query through the pipeline's cached stages. Returns what was warmed."""
+        query_embedding = await pipeline.embedder_service.get_query_embedding(query)
+        if pipeline.faq_index is not None:
+            if self.generate:
+                if await pipeline.answer_from_faq(query, query_embedding, WARMER_USER_ID) is not None:
+                    return "faq"
+            elif await pipeline.faq_index.lookup(query_embedding) is not None:
+                return "faq"
+        search_results, _ = await pipeline.retrieve(query_embedding, None, query)
+        if not self.generate:
+            return "search"
+        documents = [{"content": result.payload["content"]} for result in search_results]
+        documents, _ = await pipeline.build_context(query_embedding, documents)
+        _, cached = await pipeline.generate_answer(query, documents, WARMER_USER_ID)
+        return "cached" if cached else "generated"
+
+    async def run(self) -> Dict[str, Any]:
+        """Warm the caches with the top logged queries and return a report of what was done."""
+        start = time.perf_counter()
+        if not await asyncio.to_thread(self.query_log.acquire_lease, WARMUP_LEASE, self.holder, self.budget_seconds):
+            self.report = {
+                "queries": 0, "warmed": 0, "failed": 0, "unfinished": 0, "outcomes": {}, "timed_out": False,
+                "skipped": True, "time_s": time.perf_counter() - start
+            }
+            logger.info("Cache warm-up skipped: another worker is warming the caches")
+            return self.report
+        queries = [
+            item for item in await asyncio.to_thread(self.query_log.top, self.limit, self.min_count)
+            if item["pipeline_type"] in self.pipelines
+        ]
+        outcomes: Dict[str, int] = {}
+        failed = 0
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def warm(item: Dict[str, Any]):
+            nonlocal failed
+            async with semaphore:
+                try:
+                    outcome = await self.warm_query(self.pipelines[item["pipeline_type"]], item["query"])
+                    outcomes[outcome] = outcomes.get(outcome, 0) + 1
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"Cache warm-up query failed: {e}")
+                await asyncio.sleep(self.pause_seconds)
+
+        timed_out = False
+        try:
+            await asyncio.wait_for(asyncio.gather(*(warm(item) for item in queries)), timeout=self.budget_seconds)
+        except asyncio.TimeoutError:
+            timed_out = True
+        warmed = sum(outcomes.values())
+        self.report = {
+            "queries": len(queries),
+            "warmed": warmed,
+            "failed": failed,
+            "unfinished": len(queries) - warmed - failed,
+            "outcomes": outcomes,
+            "timed_out": timed_out,
+            "skipped": False,
+            "time_s": time.perf_counter() - start
+        }
+        logger.info(f"Cache warm-up: {self.report}")
+        return self.report
+
+    def start(self):
+        """Run the warm-up in the background; readiness does not wait for it."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,100 @@
+import time
+from collections import deque
+from typing import Any, Deque, Dict, NamedTuple, Optional
+
+
+class BreakerPermit(NamedTuple):
+    """Handed out by `CircuitBreaker.allow` for one call; its outcome is recorded against it."""
+    generation: int
+    probe: bool
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a dependency that keeps failing or answering too slowly.
+    While closed, the outcomes of the last `window` calls are kept; once at least `min_calls` are recorded and
+    the fraction that failed or took longer than `slow_call_ms` reaches `failure_rate`, the breaker opens.
+    While open, calls are refused. After `open_seconds` a single probe call is let through (half-open): its
+    success closes the breaker, its failure opens it for another `open_seconds`. A probe that never reports
+    back is replaced by a new one after `open_seconds`.
+    Every state change starts a new generation, and outcomes are only counted for permits of the current
+    one: calls let through before a trip, or replaced probes, cannot close the breaker when they finish late.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_ms: Optional[float] = 10000.0,
+        open_seconds: float = 30.0
+    ):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_ms = slow_call_ms
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._generation = 0
+        self.trips = 0
+        self.rejected = 0
+
+    def allow(self) -> Optional[BreakerPermit]:
+        """A permit for a call that may go ahead now, or None while the breaker refuses calls."""
+        if self.state == self.CLOSED:
+            return BreakerPermit(self._generation, False)
+        now = time.monotonic()
+        if now - self._opened_at < self.open_seconds:
+            self.rejected += 1
+            return None
+        if self._probe_started is None or now - self._probe_started >= self.open_seconds:
+            self.state = self.HALF_OPEN
+            self._probe_started = now
+            self._generation += 1
+            return BreakerPermit(self._generation, True)
+        self.rejected += 1
+        return None
+
+    def record(self, permit: BreakerPermit, success: bool, latency_ms: Optional[float] = None):
+        """
+        Report the outcome of a permitted call; a successful call slower than `slow_call_ms` counts as failed.
+        Outcomes of permits from an earlier generation are ignored.
+        """
+        if permit.generation != self._generation:
+            return
+        healthy = success and (self.slow_call_ms is None or latency_ms is None or latency_ms <= self.slow_call_ms)
+        if permit.probe:
+            self._probe_started = None
+            if healthy:
+                self.state = self.CLOSED
+                self._generation += 1
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+        self._outcomes.append(healthy)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+            self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self._generation += 1
+        self._opened_at = time.monotonic()
+        self.trips += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "recent_calls": len(self._outcomes),
+            "recent_failures": self._outcomes.count(False),
+            "trips": self.trips,
+            "rejected": self.rejected
+        }
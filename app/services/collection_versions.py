@@ -0,0 +1,252 @@
+"""
+Versioned Qdrant collections behind stable aliases.
+Each alias (COLLECTION_NAME, COLLECTION_NAME2) points to a physical collection `<alias>__v<n>`. A reindex builds
+the next version in the background and swaps the alias atomically, so queries never see a half-built collection.
+The embedding model and dimension every version was built with are recorded in a small registry collection,
+so a model change without a reindex is detected at startup instead of producing meaningless scores.
+"""
+import asyncio
+import re
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from app.core.config import settings
+from app.core.exceptions import EmbeddingModelMismatchError
+from app.core.logging import logger
+
+_VERSION = re.compile(r"__v(\d+)$")
+
+
+def current_fingerprint() -> Dict[str, Any]:
+    """Embedding model and dimension the running settings produce vectors with."""
+    return {"embedding_model": settings.EMBEDDING_MODEL, "vector_size": settings.VECTOR_SIZE}
+
+
+class CollectionManager:
+    def __init__(self, client: QdrantClient, registry_name: Optional[str] = None):
+        self.client = client
+        self.registry_name = registry_name or settings.COLLECTION_REGISTRY_NAME
+
+    def _ensure_registry(self):
+        if not self.client.collection_exists(self.registry_name):
+            # Records are looked up by id; the one-dimensional vector only satisfies the collection schema
+            self.client.create_collection(
+                collection_name=self.registry_name,
+                vectors_config=models.VectorParams(size=1, distance=models.Distance.DOT)
+            )
+
+    def _record_id(self, collection_name: str) -> str:
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, collection_name))
+
+    def record(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        """Registry record of a physical collection, if any."""
+        if not self.client.collection_exists(self.registry_name):
+            return None
+        points = self.client.retrieve(self.registry_name, ids=[self._record_id(collection_name)], with_payload=True)
+        return points[0].payload if points else None
+
+    def _write_record(self, collection_name: str, alias: str, status: str, **fields):
+        """Update a registry record; the model fingerprint is taken from the settings only when the record is new."""
+        self._ensure_registry()
+        payload = self.record(collection_name) or {"alias": alias, "collection": collection_name, **current_fingerprint()}
+        payload.update(status=status, updated_at=time.time(), **fields)
+        self.client.upsert(
+            collection_name=self.registry_name,
+            points=[models.PointStruct(id=self._record_id(collection_name), vector=[1.0], payload=payload)]
+        )
+
+    def resolve(self, alias: str) -> Optional[str]:
+        """Physical collection behind an alias; the alias itself for a legacy unversioned collection; None if missing."""
+        for item in self.client.get_aliases().aliases:
+            if item.alias_name == alias:
+                return item.collection_name
+        if self.client.collection_exists(alias):
+            return alias
+        return None
+
+    def versions(self, alias: str) -> List[str]:
+        """Physical versions of an alias, oldest first."""
+        names = [collection.name for collection in self.client.get_collections().collections]
+        versions = [name for name in names if name.startswith(f"{alias}__v") and _VERSION.search(name)]
+        return sorted(versions, key=lambda name: int(_VERSION.search(name).group(1)))
+
+    def create_version(self, alias: str) -> str:
+        """Create the next, empty, physical collection of an alias for the current embedding model."""
+        versions = self.versions(alias)
+        number = int(_VERSION.search(versions[-1]).group(1)) + 1 if versions else 1
+        collection_name = f"{alias}__v{number}"
+        self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(size=settings.VECTOR_SIZE, distance=models.Distance.COSINE)
+        )
+        self._write_record(collection_name, alias, "building", created_at=time.time())
+        logger.info(f"Created collection {collection_name} for {settings.EMBEDDING_MODEL}")
+        return collection_name
+
+    def swap(self, alias: str, collection_name: str) -> Optional[str]:
+        """
+        Point the alias at `collection_name` in one atomic operation and return the previous collection.
+        A legacy collection named like the alias has to be deleted first, so that first migration leaves
+        the name unresolvable for the duration of two requests.
+        """
+        previous = self.resolve(alias)
+        if previous == alias:
+            logger.warning(f"Deleting legacy collection {alias} to replace it with alias -> {collection_name}")
+            self.client.delete_collection(alias)
+            operations = []
+        else:
+            operations = [models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias))] if previous else []
+        operations.append(models.CreateAliasOperation(
+            create_alias=models.CreateAlias(collection_name=collection_name, alias_name=alias)
+        ))
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+        points = self.client.count(collection_name, exact=True).count
+        self._write_record(collection_name, alias, "active", activated_at=time.time(), points=points)
+        if previous and previous != alias:
+            self._write_record(previous, alias, "retired")
+        logger.info(f"Alias {alias} now points to {collection_name} ({points} points)")
+        return None if previous == alias else previous
+
+    def drop_retired(self, alias: str, keep: int = 1) -> List[str]:
+        """Delete all but the `keep` newest versions not behind the alias. Returns the deleted collections."""
+        active = self.resolve(alias)
+        retired = [name for name in self.versions(alias) if name != active]
+        dropped = retired[:max(len(retired) - keep, 0)]
+        for collection_name in dropped:
+            self.client.delete_collection(collection_name)
+            if self.client.collection_exists(self.registry_name):
+                self.client.delete(self.registry_name, points_selector=[self._record_id(collection_name)])
+            logger.info(f"Dropped retired collection {collection_name}")
+        return dropped
+
+    def bump_epoch(self, name: str) -> Optional[int]:
+        """
+        Record that points were written to a collection (or the collection behind an alias), so servers drop
+        search results cached from it. Returns the new epoch, or None for a collection without a record.
+        """
+        collection_name = self.resolve(name)
+        record = self.record(collection_name) if collection_name else None
+        if record is None:
+            return None
+        epoch = record.get("epoch", 0) + 1
+        self._write_record(collection_name, record["alias"], record["status"], epoch=epoch)
+        return epoch
+
+    def epoch(self, collection_name: str) -> int:
+        return (self.record(collection_name) or {}).get("epoch", 0)
+
+    def ensure(self, alias: str) -> bool:
+        """Create the first version of a missing alias. Returns True if the collection was created."""
+        if self.resolve(alias) is not None:
+            return False
+        self.swap(alias, self.create_version(alias))
+        return True
+
+    def check(self, alias: str):
+        """
+        Raise EmbeddingModelMismatchError if the collection behind the alias holds vectors of another
+        dimension, or was recorded as built with another embedding model, than the settings produce.
+        """
+        collection_name = self.resolve(alias)
+        if collection_name is None:
+            return
+        vectors = self.client.get_collection(collection_name).config.params.vectors
+        size = vectors.size if hasattr(vectors, "size") else None
+        expected = current_fingerprint()
+        if size is not None and size != expected["vector_size"]:
+            raise EmbeddingModelMismatchError(
+                f"Collection {collection_name} (alias {alias}) stores {size}-dimensional vectors but VECTOR_SIZE is "
+                f"{expected['vector_size']}; reindex it with `python run_reindex.py` or restore the settings"
+            )
+        record = self.record(collection_name)
+        if record is None:
+            logger.warning(
+                f"Collection {collection_name} has no embedding model record; reindex it with "
+                "`python run_reindex.py` to version it"
+            )
+        elif record["embedding_model"] != expected["embedding_model"]:
+            raise EmbeddingModelMismatchError(
+                f"Collection {collection_name} (alias {alias}) was built with {record['embedding_model']} but "
+                f"EMBEDDING_MODEL is {expected['embedding_model']}; reindex it with `python run_reindex.py` "
+                "or restore the settings"
+            )
+
+
+class AliasWatcher:
+    """
+    Polls the aliases and calls the swap hooks when one points to a new collection, and the write hooks
+    when the epoch of the current collection was bumped by an ingestion, so each server process drops
+    state tied to the old contents (point ids, cached results).
+    """
+
+    def __init__(self, manager: CollectionManager, aliases: List[str], interval_seconds: float = 30.0):
+        self.manager = manager
+        self.aliases = aliases
+        self.interval_seconds = interval_seconds
+        self.hooks: List[Callable[[str, Optional[str], str], Any]] = []
+        self.write_hooks: List[Callable[[str, str], Any]] = []
+        self.current = {alias: manager.resolve(alias) for alias in aliases}
+        self.epochs = {alias: manager.epoch(name) if name else 0 for alias, name in self.current.items()}
+        self._task: Optional[asyncio.Task] = None
+
+    def on_swap(self, hook: Callable[[str, Optional[str], str], Any]):
+        """Register hook(alias, old_collection, new_collection); it may be a coroutine function."""
+        self.hooks.append(hook)
+
+    def on_write(self, hook: Callable[[str, str], Any]):
+        """Register hook(alias, collection) for ingestions into the current collection; it may be a coroutine function."""
+        self.write_hooks.append(hook)
+
+    async def _run_hooks(self, hooks: List[Callable[..., Any]], alias: str, *args):
+        for hook in hooks:
+            try:
+                result = hook(alias, *args)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Collection hook for {alias} failed: {e}")
+
+    async def poll(self) -> List[str]:
+        """Check every alias once and run the hooks for the swapped ones. Returns the swapped aliases."""
+        swapped = []
+        for alias in self.aliases:
+            collection_name = await asyncio.to_thread(self.manager.resolve, alias)
+            if collection_name is None:
+                continue
+            epoch = await asyncio.to_thread(self.manager.epoch, collection_name)
+            if collection_name == self.current.get(alias):
+                if epoch != self.epochs.get(alias):
+                    self.epochs[alias] = epoch
+                    logger.info(f"Collection {collection_name} was written to (epoch {epoch})")
+                    await self._run_hooks(self.write_hooks, alias, collection_name)
+                continue
+            previous, self.current[alias], self.epochs[alias] = self.current.get(alias), collection_name, epoch
+            swapped.append(alias)
+            logger.info(f"Alias {alias} swapped from {previous} to {collection_name}")
+            await self._run_hooks(self.hooks, alias, previous, collection_name)
+        return swapped
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.warning(f"Alias poll failed: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
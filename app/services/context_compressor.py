@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+# Sentence boundary: terminal punctuation followed by whitespace and an upper-case letter, digit or opening
+# bracket/quote. Common legal abbreviations ("Sec.", "v.", "No.") are not treated as boundaries.
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;])\s+(?=[A-Z0-9(\"'\[])")
+ABBREVIATIONS = re.compile(r"\b(?:sec|secs|s|v|vs|no|nos|art|arts|cl|r|o|ltd|co|pvt|mr|mrs|ms|dr|hon'?ble|j|jj|viz|etc|i\.e|e\.g)\.$", re.IGNORECASE)
+
+
+def split_sentences(text: str, min_chars: int = 20) -> List[str]:
+    """Split text into sentences, merging fragments shorter than `min_chars` into the previous sentence."""
+    sentences: List[str] = []
+    for part in SENTENCE_BOUNDARY.split(text.strip()):
+        part = part.strip()
+        if not part:
+            continue
+        if sentences and (len(part) < min_chars or ABBREVIATIONS.search(sentences[-1])):
+            sentences[-1] = f"{sentences[-1]} {part}"
+        else:
+            sentences.append(part)
+    return sentences
+
+
+class ContextCompressor:
+    """
+    Extractive compression of retrieved documents before generation.
+    Documents are split into sentences, which are embedded in batches with the shared embedder and
+    scored by cosine similarity to the query. The highest scoring sentences are kept, in their original
+    order, until `max_chars` is reached. Sentence embeddings of recently seen documents are cached,
+    since the same judgements are retrieved for many queries.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        max_chars: int = 6000,
+        min_sentence_chars: int = 20,
+        batch_size: int = 64,
+        cache_size: int = 512
+    ):
+        self.embedder = embedder
+        self.max_chars = max_chars
+        self.min_sentence_chars = min_sentence_chars
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple[List[str], np.ndarray]]" = OrderedDict()
+
+    def _document_key(self, content: str) -> str:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    async def _embed_documents(self, contents: List[str]) -> List[Tuple[List[str], np.ndarray]]:
+        """Sentences and sentence embeddings of each document, encoding uncached documents in one batch."""
+        entries: List[Optional[Tuple[List[str], np.ndarray]]] = []
+        pending: Dict[str, Any] = {}
+        keys = [self._document_key(content) for content in contents]
+        for key, content in zip(keys, contents):
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+            elif key not in pending:
+                pending[key] = split_sentences(content, self.min_sentence_chars)
+            entries.append(entry)
+
+        if pending:
+            texts = [sentence for sentences in pending.values() for sentence in sentences]
+            # Sentence encoding is CPU bound, keep it off the event loop
+            matrix = await asyncio.to_thread(self.embedder.encode_batch, texts, self.batch_size) if texts else None
+            offset = 0
+            for key, sentences in pending.items():
+                vectors = matrix[offset:offset + len(sentences)] if sentences else np.zeros((0, 0), dtype=np.float32)
+                offset += len(sentences)
+                pending[key] = (sentences, np.asarray(vectors, dtype=np.float32))
+                self._cache[key] = pending[key]
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return [entry if entry is not None else pending[key] for entry, key in zip(entries, keys)]
+
+    async def compress(
+        self,
+        query_embedding: List[float],
+        documents: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Keep the sentences most similar to the query within the character budget.
+
+        Returns:
+            The compressed documents (documents without a kept sentence are dropped) and a report with
+            the original and compressed sizes, the compression ratio (original / compressed) and the time taken.
+        """
+        start = time.perf_counter()
+        contents = [document["content"] for document in documents]
+        original_chars = sum(len(content) for content in contents)
+        embedded = await self._embed_documents(contents)
+
+        # (document index, sentence index) of every sentence, scored in one matrix product
+        positions = [
+            (doc_index, sent_index)
+            for doc_index, (sentences, _) in enumerate(embedded)
+            for sent_index in range(len(sentences))
+        ]
+        kept: Dict[int, List[int]] = {}
+        if positions:
+            matrix = np.vstack([vectors for sentences, vectors in embedded if sentences])
+            query = np.asarray(query_embedding, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            scores = matrix @ (query / norm if norm > 0 else query)
+
+            budget = self.max_chars
+            for index in np.argsort(-scores, kind="stable"):
+                doc_index, sent_index = positions[index]
+                length = len(embedded[doc_index][0][sent_index]) + 1
+                if length > budget:
+                    continue
+                budget -= length
+                kept.setdefault(doc_index, []).append(sent_index)
+
+        compressed = []
+        for doc_index, document in enumerate(documents):
+            if doc_index not in kept:
+                continue
+            sentences = embedded[doc_index][0]
+            compressed.append({
+                **document,
+                "content": " ".join(sentences[sent_index] for sent_index in sorted(kept[doc_index]))
+            })
+
+        compressed_chars = sum(len(document["content"]) for document in compressed)
+        return compressed, {
+            "original_chars": original_chars,
+            "compressed_chars": compressed_chars,
+            "compression_ratio": original_chars / compressed_chars if compressed_chars else None,
+            "sentences_total": len(positions),
+            "sentences_kept": sum(len(indexes) for indexes in kept.values()),
+            "documents_kept": len(compressed),
+            "time_ms": (time.perf_counter() - start) * 1000
+        }
+
+    @classmethod
+    def from_settings(cls, pipeline_type: str, embedder) -> Optional["ContextCompressor"]:
+        """Compressor for a pipeline type ("judgement" or "law"), or None when compression is off for it."""
+        enabled = settings.JUDGEMENT_COMPRESSION if pipeline_type == "judgement" else settings.LAWS_COMPRESSION
+        if not enabled:
+            return None
+        return cls(
+            embedder,
+            max_chars=settings.COMPRESSION_MAX_CHARS,
+            min_sentence_chars=settings.COMPRESSION_MIN_SENTENCE_CHARS,
+            batch_size=settings.COMPRESSION_BATCH_SIZE
+        )
@@ -1,18 +1,71 @@
 import itertools
+import json
+import os
+from datetime import datetime
 from datasets import load_dataset
 from haystack import Document
 from app.core.config import settings
 from huggingface_hub import login
 from app.core.logging import logger
 from qdrant_client import QdrantClient
-from qdrant_client.http import models
-from typing import List, Dict
+from typing import List, Dict, Optional
 
+from app.services.collection_versions import CollectionManager
 from app.services.embedder_service import EmbedderService
+from app.services.near_duplicates import NearDuplicateDetector
+from app.services.title_index import TitleIndex
+from app.services.document_builders import build_judgement_document, build_law_document
 
 class DatasetService:
     @staticmethod
-    async def load_judgements_dataset(client: QdrantClient):
+    def create_duplicate_detector() -> Optional[NearDuplicateDetector]:
+        """Near-duplicate detector configured by the DEDUP_* settings, or None when DEDUP_MODE is "off"."""
+        if settings.DEDUP_MODE == "off":
+            return None
+        if settings.DEDUP_MODE not in ("drop", "link"):
+            raise ValueError(f"Unknown DEDUP_MODE '{settings.DEDUP_MODE}', expected off, drop or link")
+        return NearDuplicateDetector(
+            threshold=settings.DEDUP_THRESHOLD,
+            num_perm=settings.DEDUP_NUM_PERM,
+            shingle_size=settings.DEDUP_SHINGLE_SIZE,
+            max_entries=settings.DEDUP_MAX_ENTRIES
+        )
+
+    @staticmethod
+    def save_dedup_report(detector: NearDuplicateDetector, collection_name: str) -> str:
+        report = {
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "collection": collection_name,
+            "mode": settings.DEDUP_MODE,
+            **detector.report()
+        }
+        os.makedirs(settings.DEDUP_REPORT_DIR, exist_ok=True)
+        filename = os.path.join(
+            settings.DEDUP_REPORT_DIR, f"dedup_{collection_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        with open(filename, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(
+            f"Deduplication of {collection_name}: {report['duplicates']} of {report['seen']} documents were near "
+            f"duplicates ({settings.DEDUP_MODE}), report saved to {filename}"
+        )
+        return filename
+
+    @staticmethod
+    async def load_judgements_dataset(
+        client: QdrantClient,
+        collection_name: Optional[str] = None,
+        title_index_path: Optional[str] = None
+    ):
+        """
+        Embed and store the judgements dataset.
+
+        Args:
+            collection_name: Target collection or alias (default COLLECTION_NAME); a reindex passes the new version.
+            title_index_path: Where to write the title index (default TITLE_INDEX_PATH).
+        """
+        collection_name = collection_name or settings.COLLECTION_NAME
+        title_index_path = title_index_path or settings.TITLE_INDEX_PATH
         try:
             logger.info("Starting dataset loading from Hugging Face...")
             # Login to Hugging Face
@@ -28,51 +81,67 @@ class DatasetService:
             
             batch_size = 100
             batch_count = 0
+            next_id = 0
 
             # Initialize embedder service
             embedder = EmbedderService()
+            detector = DatasetService.create_duplicate_detector()
+            title_index = TitleIndex()
 
             for batch in batched(dataset, batch_size):
                 logger.info(f"Processing batch {batch_count + 1}...")
-                docs = [
-                    Document(
-                        content=f"Title: {doc['Titles']} Court name: {doc['Court_Name']} "
-                               f"Judgement Text: {doc['Text']} Case type: {doc['Case_Type']} "
-                               f"Court type: {doc['Court_Type']} Doc_url (reference): {doc['Doc_url']}", 
-                        meta={
-                            "Titles": doc["Titles"],
-                            "Doc_url": doc["Doc_url"], 
-                            "Doc_size": doc["Doc_size"]
-                        }
-                    ) for doc in batch
-                ]
+                docs = []
+                for doc in batch:
+                    content, meta = build_judgement_document(doc)
+                    # Re-published copies differ in title and URL, so only the judgement text is compared
+                    if detector is not None:
+                        duplicate = detector.check(next_id + len(docs), doc["Text"])
+                        if duplicate is not None:
+                            if settings.DEDUP_MODE == "drop":
+                                continue
+                            meta["duplicate_of"], meta["duplicate_similarity"] = duplicate
+                    docs.append(Document(content=content, meta=meta))
+                if not docs:
+                    batch_count += 1
+                    continue
 
                 # Get embeddings
                 
                 embeddings = await embedder.get_document_embeddings([{"content": doc.content} for doc in docs])
 
-                ids = [idx for idx in range(batch_count * batch_size, (batch_count + 1) * batch_size)]
+                # Ids follow the stored documents, so partial batches and dropped duplicates leave no gaps
+                ids = list(range(next_id, next_id + len(docs)))
                 vectors = embeddings
                 payloads = [{"content": doc.content, "metadata": doc.meta} for doc in docs]
 
-                client.upsert(
-                    collection_name=settings.COLLECTION_NAME,
-                    points=models.Batch(
-                        ids=ids,
-                        vectors=vectors,
-                        payloads=payloads,
-                    ),
+                client.upload_collection(
+                    collection_name=collection_name,
+                    vectors=vectors,
+                    payload=payloads,
+                    ids=ids,
+                    batch_size=len(ids),
+                    wait=True
                 )
+                for point_id, doc in zip(ids, docs):
+                    title_index.add(point_id, doc.meta["Titles"])
 
+                next_id += len(docs)
                 batch_count += 1
 
+            if detector is not None:
+                DatasetService.save_dedup_report(detector, collection_name)
+            title_index.save(title_index_path)
+            logger.info(f"Saved title index of {len(title_index)} judgements to {title_index_path}")
+            CollectionManager(client).bump_epoch(collection_name)
             logger.info("Initial dataset upload done")
         except Exception as e:
             logger.error(f"Failed to load dataset: {str(e)}")
             raise
 
     @staticmethod
-    async def load_indian_laws_dataset(client: QdrantClient):
+    async def load_indian_laws_dataset(client: QdrantClient, collection_name: Optional[str] = None):
+        """Embed and store the Indian laws Q&A dataset in `collection_name` (default COLLECTION_NAME2)."""
+        collection_name = collection_name or settings.COLLECTION_NAME2
         try:
             logger.info("Starting Indian Laws dataset loading...")
             login(token=settings.HUGGINGFACE_TOKEN)
@@ -86,39 +155,37 @@ class DatasetService:
             
             batch_size = 100
             batch_count = 0
+            next_id = 0
             embedder = EmbedderService()
 
             for batch in batched(dataset, batch_size):
                 logger.info(f"Processing batch {batch_count + 1}...")
-                docs = [
-                    Document(
-                        content=f"Question: {doc['Instruction']} Answer: {doc['Response']}", 
-                        meta={
-                            "question": doc["Instruction"],
-                            "answer": doc["Response"]
-                        }
-                    ) for doc in batch
-                ]
+                docs = []
+                for doc in batch:
+                    content, meta = build_law_document(doc)
+                    docs.append(Document(content=content, meta=meta))
 
                 embeddings = await embedder.get_document_embeddings(
                     [{"content": doc.content} for doc in docs]
                 )
 
-                ids = [idx for idx in range(batch_count * batch_size, (batch_count + 1) * batch_size)]
+                ids = list(range(next_id, next_id + len(docs)))
                 vectors = embeddings
                 payloads = [{"content": doc.content, "metadata": doc.meta} for doc in docs]
 
-                client.upsert(
-                    collection_name=settings.COLLECTION_NAME2,
-                    points=models.Batch(
-                        ids=ids,
-                        vectors=vectors,
-                        payloads=payloads,
-                    ),
+                client.upload_collection(
+                    collection_name=collection_name,
+                    vectors=vectors,
+                    payload=payloads,
+                    ids=ids,
+                    batch_size=len(ids),
+                    wait=True
                 )
 
+                next_id += len(docs)
                 batch_count += 1
 
+            CollectionManager(client).bump_epoch(collection_name)
             logger.info("Indian Laws dataset upload completed")
         except Exception as e:
             logger.error(f"Failed to load Indian Laws dataset: {str(e)}")
@@ -0,0 +1,39 @@
+"""
+Dataset rows to stored documents, shared by the Hugging Face loaders (DatasetService) and local file ingestion.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+JUDGEMENT_COLUMNS = ["Titles", "Doc_url", "Doc_size", "Court_Name", "Text", "Case_Type", "Court_Type"]
+LAW_COLUMNS = ["Instruction", "Response"]
+
+
+def build_judgement_document(row: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Content and metadata of an InJudgements row."""
+    content = (
+        f"Title: {row['Titles']} Court name: {row['Court_Name']} "
+        f"Judgement Text: {row['Text']} Case type: {row['Case_Type']} "
+        f"Court type: {row['Court_Type']} Doc_url (reference): {row['Doc_url']}"
+    )
+    metadata = {
+        "Titles": row["Titles"],
+        "Doc_url": row["Doc_url"],
+        "Doc_size": row["Doc_size"]
+    }
+    return content, metadata
+
+
+def build_law_document(row: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Content and metadata of an Indian-Law Q&A row."""
+    content = f"Question: {row['Instruction']} Answer: {row['Response']}"
+    metadata = {
+        "question": row["Instruction"],
+        "answer": row["Response"]
+    }
+    return content, metadata
+
+
+def dataset_spec(pipeline_type: str) -> Tuple[List[str], Any, Optional[str]]:
+    """(columns read, document builder, column compared for near duplicates) of a collection type."""
+    if pipeline_type == "judgement":
+        return JUDGEMENT_COLUMNS, build_judgement_document, "Text"
+    return LAW_COLUMNS, build_law_document, None
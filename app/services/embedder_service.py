@@ -1,25 +1,60 @@
+import time
 from typing import List, Dict
-from sentence_transformers import SentenceTransformer
+
+import numpy as np
+
 from app.core.config import settings
 from app.core.logging import logger
 
 class EmbedderService:
+    """
+    Sentence-transformers embedder. The library and model are loaded on first use (or in `warm_up`),
+    so importing this module stays cheap.
+    """
     def __init__(self):
-        self.model = SentenceTransformer(settings.EMBEDDING_MODEL)
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(settings.EMBEDDING_MODEL)
+        return self._model
+
+    def warm_up(self) -> Dict[str, float]:
+        """Load the model and run one encode so the first query does not pay for it. Returns timings in ms."""
+        start = time.perf_counter()
+        model = self.model
+        loaded = time.perf_counter()
+        model.encode("warm up")
+        encoded = time.perf_counter()
+        return {
+            "load_ms": (loaded - start) * 1000,
+            "first_encode_ms": (encoded - loaded) * 1000
+        }
     
-    async def get_document_embeddings(self, documents: List[Dict]) -> List[List[float]]:
+    def encode_batch(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """Encode texts into an (n x dim) float32 matrix of unit vectors. Blocking; call it off the event loop."""
+        embeddings = self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    # Embeddings stay float32 arrays: Qdrant calls, caches and the stand-ins accept them without
+    # conversion to lists of Python floats, which only happens in the client's wire encoding.
+    async def get_document_embeddings(self, documents: List[Dict]) -> np.ndarray:
+        """(n x dim) C-contiguous float32 matrix, one row per document."""
         try:
             texts = [doc["content"] for doc in documents]
-            embeddings = self.model.encode(texts)
-            return embeddings.tolist()
+            embeddings = self.model.encode(texts, convert_to_numpy=True)
+            return np.ascontiguousarray(embeddings, dtype=np.float32)
         except Exception as e:
             logger.error(f"Error generating embeddings: {str(e)}")
             raise
 
-    async def get_query_embedding(self, query: str) -> List[float]:
+    async def get_query_embedding(self, query: str) -> np.ndarray:
+        """float32 vector of the query."""
         try:
-            embedding = self.model.encode(query)
-            return embedding.tolist()
+            embedding = self.model.encode(query, convert_to_numpy=True)
+            return np.ascontiguousarray(embedding, dtype=np.float32)
         except Exception as e:
             logger.error(f"Error generating query embedding: {str(e)}")
-            raise
\ No newline at end of file
+            raise
@@ -0,0 +1,114 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from app.core.config import settings
+from app.core.logging import logger
+
+
+@dataclass
+class FAQMatch:
+    """Stored question closest to the user query, with its canonical answer."""
+    id: Any
+    question: str
+    answer: str
+    score: float
+
+
+class FAQIndex:
+    """
+    Question-only embedding index over the laws Q&A pairs.
+    Each point holds the embedding of a stored `Instruction` (question) and its `Response` (answer);
+    a user query whose nearest stored question scores at least `threshold` can be answered directly.
+    """
+
+    def __init__(self, qdrant_service, threshold: float = 0.92):
+        """
+        Args:
+            qdrant_service: Search service over the question collection (QdrantService with collection "faq",
+                or an in-memory stand-in).
+            threshold: Minimum cosine similarity for a match. Calibrate it with `run_faq_index.py calibrate`.
+        """
+        self.qdrant_service = qdrant_service
+        self.threshold = threshold
+        self.lookups = 0
+        self.hits = 0
+
+    async def nearest(self, query_embedding: List[float]) -> Optional[FAQMatch]:
+        """Closest stored question regardless of the threshold."""
+        results = await self.qdrant_service.search_similar(query_embedding, 1)
+        if not results:
+            return None
+        payload = results[0].payload or {}
+        return FAQMatch(
+            id=results[0].id,
+            question=payload.get("question", ""),
+            answer=payload.get("answer", ""),
+            score=float(results[0].score)
+        )
+
+    async def lookup(self, query_embedding: List[float]) -> Optional[FAQMatch]:
+        """Closest stored question if it passes the threshold, else None."""
+        self.lookups += 1
+        match = await self.nearest(query_embedding)
+        if match is None or match.score < self.threshold or not match.answer:
+            return None
+        self.hits += 1
+        return match
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0
+        }
+
+
+async def build_faq_collection(client: QdrantClient, embedder, batch_size: int = 256) -> int:
+    """
+    Embed the question of every point in the laws collection into the FAQ collection,
+    keeping the point ids, so the two collections stay aligned. Returns the number of indexed questions.
+    """
+    if not client.collection_exists(settings.FAQ_COLLECTION_NAME):
+        client.create_collection(
+            collection_name=settings.FAQ_COLLECTION_NAME,
+            vectors_config=models.VectorParams(size=settings.VECTOR_SIZE, distance=models.Distance.COSINE)
+        )
+        logger.info(f"Created collection {settings.FAQ_COLLECTION_NAME}")
+
+    indexed = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=settings.COLLECTION_NAME2,
+            limit=batch_size,
+            offset=offset,
+            with_payload=["metadata"],
+            with_vectors=False
+        )
+        pairs = [
+            (point.id, point.payload["metadata"])
+            for point in points
+            if (point.payload or {}).get("metadata", {}).get("question")
+        ]
+        if pairs:
+            vectors = embedder.encode_batch([metadata["question"] for _, metadata in pairs], batch_size)
+            client.upload_collection(
+                collection_name=settings.FAQ_COLLECTION_NAME,
+                vectors=vectors,
+                payload=[
+                    {"question": metadata["question"], "answer": metadata.get("answer", "")}
+                    for _, metadata in pairs
+                ],
+                ids=[point_id for point_id, _ in pairs],
+                batch_size=len(pairs),
+                wait=True
+            )
+            indexed += len(pairs)
+            logger.info(f"Indexed {indexed} FAQ questions")
+        if offset is None:
+            break
+    return indexed
@@ -2,7 +2,9 @@ import asyncio
 from typing import Dict, Any, List, Optional, Set
 import time
 import json
-import tiktoken
+from app.core.config import settings
+from app.services.pipeline_trace_store import PipelineTraceStore
+from app.services.query_log import QueryFrequencyLog
 
 class GlobalPipelineMonitor:
     """
@@ -21,8 +23,28 @@ class GlobalPipelineMonitor:
             return
             
         self.active_clients: Set[asyncio.Queue] = set()
-        self.encoding = tiktoken.get_encoding("cl100k_base")
+        self._encoding = None
+        self.trace_store = PipelineTraceStore(
+            max_traces=settings.PIPELINE_HISTORY_SIZE,
+            db_path=settings.PIPELINE_HISTORY_DB or None,
+            db_max_rows=settings.PIPELINE_HISTORY_DB_MAX_ROWS,
+            flush_seconds=settings.PIPELINE_HISTORY_FLUSH_SECONDS
+        )
+        self.query_log = QueryFrequencyLog(
+            settings.QUERY_LOG_DB,
+            max_queries=settings.QUERY_LOG_MAX_QUERIES,
+            flush_seconds=settings.QUERY_LOG_FLUSH_SECONDS,
+            min_count=settings.QUERY_LOG_MIN_COUNT
+        ) if settings.QUERY_LOG_DB else None
         self._initialized = True
+
+    @property
+    def encoding(self):
+        """Tokenizer used for token counts, loaded on first use (or at startup warm-up)."""
+        if self._encoding is None:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding("cl100k_base")
+        return self._encoding
         
     async def register_client(self) -> asyncio.Queue:
         """Register a new client and return a queue for receiving events."""
@@ -44,7 +66,9 @@ class GlobalPipelineMonitor:
             await queue.put((event_name, data))
             
     async def new_query(self, query: str, pipeline_type: str, user_id: Optional[str] = None):
-        """Notify all clients of a new query being processed."""
+        """Notify all clients of a new query being processed and count it in the query log."""
+        if self.query_log is not None:
+            self.query_log.record(pipeline_type, query)
         await self.broadcast_event("new_query", {
             "query": query,
             "pipeline_type": pipeline_type,
@@ -72,30 +96,55 @@ class GlobalPipelineMonitor:
             "timestamp": time.time()
         })
         
-    async def complete_search(self, results_count: int, time_ms: float):
-        """Notify clients that vector search is complete."""
-        await self.broadcast_event("search_complete", {
+    async def complete_search(self, results_count: int, time_ms: float, selection: Optional[Dict[str, Any]] = None):
+        """Notify clients that vector search is complete, with the retrieval policy's cut if given."""
+        event_data = {
             "timestamp": time.time(),
             "results_count": results_count,
             "time_ms": time_ms
-        })
+        }
+        if selection:
+            event_data["retrieval"] = selection
+        await self.broadcast_event("search_complete", event_data)
         
+    async def complete_faq_answer(self, question: str, score: float, answer: str, time_ms: float) -> int:
+        """Notify clients that the query was answered from the FAQ index and return the answer token count."""
+        token_count = len(self.encoding.encode(answer))
+
+        await self.broadcast_event("faq_answer", {
+            "timestamp": time.time(),
+            "question": question,
+            "score": score,
+            "token_count": token_count,
+            "time_ms": time_ms
+        })
+        return token_count
+
     async def start_context_building(self):
         """Notify clients that context building has started."""
         await self.broadcast_event("context_start", {
             "timestamp": time.time()
         })
         
-    async def complete_context_building(self, context_text: str, time_ms: float):
-        """Notify clients that context building is complete."""
+    async def complete_context_building(
+        self,
+        context_text: str,
+        time_ms: float,
+        compression: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Notify clients that context building is complete and return the context token count."""
         token_count = len(self.encoding.encode(context_text))
         
-        await self.broadcast_event("context_complete", {
+        event_data = {
             "timestamp": time.time(),
             "token_count": token_count,
             "character_count": len(context_text),
             "time_ms": time_ms
-        })
+        }
+        if compression:
+            event_data["compression"] = compression
+        await self.broadcast_event("context_complete", event_data)
+        return token_count
         
     async def start_llm_generation(self):
         """Notify clients that LLM generation has started."""
@@ -103,19 +152,21 @@ class GlobalPipelineMonitor:
             "timestamp": time.time()
         })
         
-    async def complete_llm_generation(self, answer: str, time_ms: float):
-        """Notify clients that LLM generation is complete."""
+    async def complete_llm_generation(self, answer: str, time_ms: float, cached: bool = False) -> int:
+        """Notify clients that LLM generation is complete and return the answer token count."""
         token_count = len(self.encoding.encode(answer))
         
         await self.broadcast_event("llm_complete", {
             "timestamp": time.time(),
             "token_count": token_count,
             "character_count": len(answer),
-            "time_ms": time_ms
+            "time_ms": time_ms,
+            "cached": cached
         })
+        return token_count
         
     async def complete_pipeline(self, answer: str, total_time_ms: float, stage_metrics: Dict[str, float] = None, query_info: Dict[str, Any] = None):
-        """Notify clients that the entire pipeline is complete with detailed metrics."""
+        """Notify clients that the entire pipeline is complete with detailed metrics and record its trace."""
         # Create the event data with all metrics
         event_data = {
             "timestamp": time.time(),
@@ -132,6 +183,9 @@ class GlobalPipelineMonitor:
         if query_info:
             event_data.update(query_info)
         
+        # Keep a trace of the run (without the answer text) for the history endpoints
+        self.trace_store.record({key: value for key, value in event_data.items() if key != "answer"})
+        
         await self.broadcast_event("complete", event_data)
         
     async def report_error(self, error_message: str):
@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.services.cache_backends import CacheBackend, SQLiteCacheBackend
+
+
+class LLMResponseCache:
+    """
+    Exact-match cache of LLM replies keyed on a hash of model name, generation parameters and rendered prompt.
+    Entries live in a per-process in-memory LRU tier and, optionally, in a shared backend (a local SQLite file
+    or a Redis-compatible server) that survives restarts and is shared by all worker processes.
+    Both tiers are bounded in size and entries expire after `ttl_seconds` (None disables expiry); the backend
+    stores each value with its creation time, so an entry copied into the memory tier keeps its original age.
+    Backend reads and writes run in a worker thread, so a slow backend (a locked SQLite file, a distant Redis)
+    delays the request that uses it but never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: Optional[float] = 86400,
+        db_path: Optional[str] = None,
+        db_max_entries: int = 100000,
+        backend: Optional[CacheBackend] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        if self.backend is None and db_path:
+            self.backend = SQLiteCacheBackend(db_path, table="llm_cache", max_entries=db_max_entries)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Hash the model, generation parameters and rendered prompt into a cache key."""
+        material = json.dumps({"model": model, "params": params or {}, "prompt": prompt}, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for `key`, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._expired(created_at):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+        if self.backend is not None:
+            stored = await asyncio.to_thread(self.backend.get, key)
+            if isinstance(stored, dict) and "created_at" in stored and not self._expired(stored["created_at"]):
+                with self._lock:
+                    self._remember(key, stored["value"], stored["created_at"])
+                    self.hits += 1
+                    self.shared_hits += 1
+                return stored["value"]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any):
+        """Store a JSON-serializable value in both tiers."""
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, value, created_at)
+        if self.backend is not None:
+            await asyncio.to_thread(
+                self.backend.set, key, {"value": value, "created_at": created_at}, self.ttl_seconds
+            )
+
+    def _remember(self, key: str, value: Any, created_at: float):
+        """Insert into the memory tier, evicting least recently used entries. Caller holds the lock."""
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def clear(self):
+        """Drop every cached entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+        if self.backend is not None:
+            await asyncio.to_thread(self.backend.clear)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "backend": self.backend.name if self.backend is not None else None
+        }
@@ -0,0 +1,285 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Set
+
+import httpx
+
+from app.core.config import settings
+from app.core.exceptions import LLMConfigurationError, QueryProcessingError
+from app.core.logging import logger
+from app.services.pipeline_trace_store import percentile, summarize
+
+
+class LLMProvider(ABC):
+    """A single LLM backend. Subclasses implement `generate` as a coroutine returning the reply text."""
+
+    name = "provider"
+
+    @abstractmethod
+    async def generate(self, prompt: str) -> str:
+        ...
+
+
+class GeminiProvider(LLMProvider):
+    """Gemini through the google.generativeai async API, so timed-out or hedged calls can be cancelled."""
+
+    def __init__(self, model_name: str = "gemini-2.0-flash", api_key: Optional[str] = None):
+        self.model_name = model_name
+        self.api_key = api_key
+        self.name = f"gemini:{model_name}"
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            import google.generativeai as genai
+            if self.api_key:
+                genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+
+class GroqProvider(LLMProvider):
+    """Llama models served by Groq's OpenAI-compatible chat completions API."""
+
+    API_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+    def __init__(self, model_name: str, api_key: str, timeout_seconds: float = 60.0):
+        self.model_name = model_name
+        self.api_key = api_key
+        self.name = f"groq:{model_name}"
+        self._client = httpx.AsyncClient(timeout=timeout_seconds)
+
+    async def generate(self, prompt: str) -> str:
+        response = await self._client.post(
+            self.API_URL,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={"model": self.model_name, "messages": [{"role": "user", "content": prompt}]}
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+
+class HaystackGeneratorProvider(LLMProvider):
+    """
+    Adapter for a Haystack generator component (anything with `run(prompt=...)` returning `replies`).
+    The component call is blocking, so it runs in a worker thread; a cancelled call finishes in the background.
+    """
+
+    def __init__(self, generator, name: Optional[str] = None):
+        self.generator = generator
+        self.name = name or type(generator).__name__
+
+    async def generate(self, prompt: str) -> str:
+        result = await asyncio.to_thread(self.generator.run, prompt=prompt)
+        return result["replies"][0]
+
+
+class ProviderStats:
+    """Recent latencies and outcome counters of one provider."""
+
+    def __init__(self, sample_size: int = 500):
+        self.latencies_ms: Deque[float] = deque(maxlen=sample_size)
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "successes": self.successes,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "latency_ms": summarize(list(self.latencies_ms))
+        }
+
+
+@dataclass
+class LLMResult:
+    """Reply text and which provider produced it."""
+    text: str
+    provider: str
+    latency_ms: float
+    hedged: bool = False
+
+
+class LLMGenerator:
+    """
+    Generates with an ordered list of providers.
+    A provider that fails or exceeds `timeout_seconds` falls back to the next one. With hedging enabled,
+    once the primary has been running for longer than its recent `hedge_percentile` latency, the same prompt
+    is also sent to the next provider and whichever answers first wins; the loser is cancelled.
+    """
+
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        timeout_seconds: float = 30.0,
+        hedge: bool = False,
+        hedge_percentile: float = 95,
+        hedge_min_delay_ms: float = 500.0,
+        hedge_initial_delay_ms: float = 2000.0,
+        min_samples: int = 20
+    ):
+        if not providers:
+            raise ValueError("LLMGenerator needs at least one provider")
+        self.providers = providers
+        self.timeout_seconds = timeout_seconds
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay_ms = hedge_min_delay_ms
+        self.hedge_initial_delay_ms = hedge_initial_delay_ms
+        self.min_samples = min_samples
+        self.provider_stats: Dict[str, ProviderStats] = {provider.name: ProviderStats() for provider in providers}
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+
+    @property
+    def model_name(self) -> str:
+        """Identifies the provider chain, e.g. for cache keys."""
+        return ",".join(provider.name for provider in self.providers)
+
+    def hedge_delay_seconds(self, provider: LLMProvider) -> float:
+        """Delay before hedging: the provider's recent latency percentile, floored at hedge_min_delay_ms."""
+        latencies = list(self.provider_stats[provider.name].latencies_ms)
+        if len(latencies) < self.min_samples:
+            return self.hedge_initial_delay_ms / 1000
+        return max(percentile(latencies, self.hedge_percentile), self.hedge_min_delay_ms) / 1000
+
+    async def _call(self, provider: LLMProvider, prompt: str) -> LLMResult:
+        stats = self.provider_stats[provider.name]
+        start = time.perf_counter()
+        try:
+            text = await provider.generate(prompt)
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        except Exception:
+            stats.failures += 1
+            raise
+        latency_ms = (time.perf_counter() - start) * 1000
+        stats.successes += 1
+        stats.latencies_ms.append(latency_ms)
+        return LLMResult(text=text, provider=provider.name, latency_ms=latency_ms)
+
+    async def _attempt(
+        self,
+        provider: LLMProvider,
+        backup: Optional[LLMProvider],
+        prompt: str,
+        attempted: Set[str]
+    ) -> LLMResult:
+        """Run `provider`, hedged with `backup` if given, within the timeout."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout_seconds
+        attempted.add(provider.name)
+        tasks = {asyncio.ensure_future(self._call(provider, prompt)): provider}
+        last_error: Optional[BaseException] = None
+        try:
+            if backup is not None:
+                delay = min(self.hedge_delay_seconds(provider), self.timeout_seconds)
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    self.hedged_requests += 1
+                    attempted.add(backup.name)
+                    tasks[asyncio.ensure_future(self._call(backup, prompt))] = backup
+
+            pending = set(tasks)
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        result = task.result()
+                        result.hedged = len(tasks) > 1
+                        if tasks[task] is not provider:
+                            self.hedge_wins += 1
+                        return result
+                    last_error = task.exception()
+                    logger.warning(f"LLM provider {tasks[task].name} failed: {str(last_error)}")
+
+            if pending:
+                for task in pending:
+                    self.provider_stats[tasks[task].name].timeouts += 1
+                raise asyncio.TimeoutError(f"{provider.name} timed out after {self.timeout_seconds:.1f}s")
+            raise last_error
+        finally:
+            losers = [task for task in tasks if not task.done()]
+            for task in losers:
+                task.cancel()
+            if losers:
+                await asyncio.gather(*losers, return_exceptions=True)
+
+    async def generate(self, prompt: str) -> LLMResult:
+        """Generate a reply, falling back through the providers in order."""
+        attempted: Set[str] = set()
+        errors = []
+        for index, provider in enumerate(self.providers):
+            if provider.name in attempted:
+                continue
+            if errors:
+                self.fallbacks += 1
+            backup = None
+            if self.hedge:
+                backup = next((p for p in self.providers[index + 1:] if p.name not in attempted), None)
+            try:
+                return await self._attempt(provider, backup, prompt, attempted)
+            except Exception as e:
+                errors.append(f"{provider.name}: {type(e).__name__}: {str(e)}")
+                logger.warning(f"LLM generation with {provider.name} failed, trying next provider")
+        raise QueryProcessingError(f"All LLM providers failed ({'; '.join(errors)})")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "providers": {name: stats.as_dict() for name, stats in self.provider_stats.items()},
+            "hedge": self.hedge,
+            "hedged_requests": self.hedged_requests,
+            "hedge_wins": self.hedge_wins,
+            "fallbacks": self.fallbacks
+        }
+
+    @classmethod
+    def from_settings(cls) -> "LLMGenerator":
+        """
+        Build the provider chain listed in LLM_PROVIDERS, skipping providers without an API key.
+        Raise LLMConfigurationError when LLM_PROVIDERS names an unknown provider or none is left.
+        """
+        providers: List[LLMProvider] = []
+        for name in [name.strip() for name in settings.LLM_PROVIDERS.split(",") if name.strip()]:
+            if name == "gemini":
+                if not settings.GOOGLE_API_KEY:
+                    logger.warning("Skipping gemini LLM provider: GOOGLE_API_KEY is not set")
+                    continue
+                providers.append(GeminiProvider(settings.LLM_MODEL, settings.GOOGLE_API_KEY))
+            elif name == "groq":
+                api_key = settings.GROQ_API_KEY or settings.LLAMA3_API_KEY
+                if not api_key:
+                    logger.warning("Skipping groq LLM provider: GROQ_API_KEY is not set")
+                    continue
+                providers.append(GroqProvider(settings.GROQ_MODEL, api_key, settings.LLM_TIMEOUT_SECONDS))
+            else:
+                raise LLMConfigurationError(f"Unknown LLM provider '{name}' in LLM_PROVIDERS")
+        if not providers:
+            raise LLMConfigurationError(
+                f"No usable LLM provider in LLM_PROVIDERS={settings.LLM_PROVIDERS!r}: "
+                "set GOOGLE_API_KEY for gemini or GROQ_API_KEY for groq"
+            )
+        return cls(
+            providers,
+            timeout_seconds=settings.LLM_TIMEOUT_SECONDS,
+            hedge=settings.LLM_HEDGE_ENABLED,
+            hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+            hedge_min_delay_ms=settings.LLM_HEDGE_MIN_DELAY_MS,
+            hedge_initial_delay_ms=settings.LLM_HEDGE_INITIAL_DELAY_MS
+        )
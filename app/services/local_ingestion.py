@@ -0,0 +1,374 @@
+"""
+Offline ingestion of local Parquet, Arrow (IPC) and JSONL exports of the datasets.
+Files are memory-mapped where the format allows it and only the needed columns are read. `shard=(i, n)` selects
+the i-th (1-based) of n contiguous row ranges over all files, so several processes or nodes given the same files in
+the same order embed disjoint slices; the point id of a row is its global row index, so the slices never collide.
+Embeddings (and MinHash signatures for deduplication) are computed by a pool of worker processes, each with its
+own model instance; the parent reads rows, checks duplicates and uploads, in row order.
+"""
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from qdrant_client import QdrantClient
+
+from app.core.logging import logger
+from app.services.document_builders import dataset_spec
+from app.services.near_duplicates import MinHasher, NearDuplicateDetector
+from app.services.title_index import TitleIndex
+
+FORMATS = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow", ".jsonl": "jsonl"}
+
+
+def file_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported file {path}: expected one of {', '.join(sorted(FORMATS))}")
+    return FORMATS[extension]
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse "i/n" (1 <= i <= n)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{value}', expected i/n such as 2/4")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{value}', expected 1 <= i <= n")
+    return index, count
+
+
+def shard_range(total_rows: int, shard: Tuple[int, int]) -> Tuple[int, int]:
+    """[start, end) global rows of shard i of n; the ranges of all shards are contiguous and cover every row once."""
+    index, count = shard
+    return (index - 1) * total_rows // count, index * total_rows // count
+
+
+def _open_arrow(path: str):
+    source = pa.memory_map(path)
+    try:
+        return ipc.open_file(source)
+    except pa.ArrowInvalid:
+        # Streaming format (no footer); `datasets` caches are written this way
+        return ipc.open_stream(pa.memory_map(path))
+
+
+def count_rows(path: str) -> int:
+    """Row count of a file, from the Parquet footer or Arrow batch headers; JSONL files are scanned for newlines."""
+    kind = file_format(path)
+    if kind == "parquet":
+        return pq.ParquetFile(path, memory_map=True).metadata.num_rows
+    if kind == "arrow":
+        reader = _open_arrow(path)
+        if isinstance(reader, ipc.RecordBatchFileReader):
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        return sum(batch.num_rows for batch in reader)
+    rows = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                rows += 1
+    return rows
+
+
+def _table_rows(table: pa.Table, start: int, stop: int, columns: List[str]) -> List[Dict[str, Any]]:
+    return table.slice(start, stop - start).select(columns).to_pylist()
+
+
+def read_rows(path: str, start: int, stop: int, columns: List[str]) -> Iterator[List[Dict[str, Any]]]:
+    """Yield the rows [start, stop) of a file, as lists of dicts with `columns`, a row group or record batch at a time."""
+    if stop <= start:
+        return
+    kind = file_format(path)
+    if kind == "parquet":
+        parquet = pq.ParquetFile(path, memory_map=True)
+        offset = 0
+        for group in range(parquet.metadata.num_row_groups):
+            group_rows = parquet.metadata.row_group(group).num_rows
+            first, last = max(start, offset), min(stop, offset + group_rows)
+            if first < last:
+                table = parquet.read_row_group(group, columns=columns)
+                yield _table_rows(table, first - offset, last - offset, columns)
+            offset += group_rows
+            if offset >= stop:
+                return
+    elif kind == "arrow":
+        reader = _open_arrow(path)
+        if isinstance(reader, ipc.RecordBatchFileReader):
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        else:
+            batches = iter(reader)
+        offset = 0
+        for batch in batches:
+            first, last = max(start, offset), min(stop, offset + batch.num_rows)
+            if first < last:
+                yield _table_rows(pa.Table.from_batches([batch]), first - offset, last - offset, columns)
+            offset += batch.num_rows
+            if offset >= stop:
+                return
+    else:
+        rows, index = [], 0
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                if index >= stop:
+                    break
+                if index >= start:
+                    record = orjson.loads(line)
+                    rows.append({column: record.get(column) for column in columns})
+                    if len(rows) == 1000:
+                        yield rows
+                        rows = []
+                index += 1
+        if rows:
+            yield rows
+
+
+def iter_shard(paths: List[str], shard: Tuple[int, int], columns: List[str]) -> Tuple[int, int, Iterator[Tuple[int, Dict[str, Any]]]]:
+    """
+    Rows of one shard over all files, in order.
+
+    Returns:
+        (first global row, end global row, iterator of (global row index, row))
+    """
+    counts = [count_rows(path) for path in paths]
+    start, stop = shard_range(sum(counts), shard)
+
+    def rows() -> Iterator[Tuple[int, Dict[str, Any]]]:
+        offset = 0
+        for path, count in zip(paths, counts):
+            first, last = max(start, offset), min(stop, offset + count)
+            index = first
+            for chunk in read_rows(path, first - offset, last - offset, columns):
+                for row in chunk:
+                    yield index, row
+                    index += 1
+            offset += count
+
+    return start, stop, rows()
+
+
+# Worker process state, set once by the pool initializer
+_worker_embedder = None
+_worker_hasher: Optional[MinHasher] = None
+
+
+def _init_worker(embedder_factory: Callable[[], Any], torch_threads: int, num_perm: Optional[int], shingle_size: int):
+    global _worker_embedder, _worker_hasher
+    _worker_embedder = embedder_factory()
+    if hasattr(_worker_embedder, "warm_up"):
+        # Load the model (and torch) before the first batch
+        _worker_embedder.warm_up()
+    if "torch" in sys.modules and torch_threads > 0:
+        # Workers share the cores instead of each starting one intra-op thread per core
+        sys.modules["torch"].set_num_threads(torch_threads)
+    _worker_hasher = MinHasher(num_perm, shingle_size) if num_perm else None
+
+
+def _embed_batch(texts: List[str], dedup_texts: Optional[List[str]], batch_size: int):
+    """Embeddings and signatures of one batch, with the seconds spent on each."""
+    start = time.perf_counter()
+    embeddings = _worker_embedder.encode_batch(texts, batch_size=batch_size)
+    embed_seconds = time.perf_counter() - start
+    signatures, signature_seconds = None, 0.0
+    if dedup_texts is not None and _worker_hasher is not None:
+        start = time.perf_counter()
+        signatures = [_worker_hasher.signature(text or "") for text in dedup_texts]
+        signature_seconds = time.perf_counter() - start
+    return embeddings, signatures, embed_seconds, signature_seconds
+
+
+@dataclass
+class _Batch:
+    ids: List[int]
+    contents: List[str]
+    metadata: List[Dict[str, Any]]
+    result: Any = None
+
+
+@dataclass
+class IngestionStats:
+    rows: int = 0
+    stored: int = 0
+    duplicates: int = 0
+    dropped: int = 0
+    stages: Dict[str, float] = field(default_factory=lambda: {
+        "read": 0.0, "embed": 0.0, "signature": 0.0, "wait": 0.0, "dedup": 0.0, "upload": 0.0
+    })
+
+
+class LocalIngestion:
+    """
+    Embed and upload one shard of local dataset files into a collection.
+
+    Args:
+        pipeline_type: "judgement" or "laws", selects the columns and document builder.
+        workers: Embedding processes; 0 embeds in this process.
+        embedder_factory: Picklable callable creating the embedder in each worker (default EmbedderService).
+        detector: Near-duplicate detector, judgements only; its settings are mirrored in the workers.
+        dedup_mode: "drop" skips duplicates, "link" stores them with metadata.duplicate_of.
+    """
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        collection_name: str,
+        pipeline_type: str,
+        workers: int = 0,
+        batch_size: int = 256,
+        encode_batch_size: int = 64,
+        embedder_factory: Optional[Callable[[], Any]] = None,
+        detector: Optional[NearDuplicateDetector] = None,
+        dedup_mode: str = "link",
+        title_index: Optional[TitleIndex] = None
+    ):
+        if embedder_factory is None:
+            from app.services.embedder_service import EmbedderService
+            embedder_factory = EmbedderService
+        self.client = client
+        self.collection_name = collection_name
+        self.columns, self.builder, self.dedup_column = dataset_spec(pipeline_type)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.encode_batch_size = encode_batch_size
+        self.embedder_factory = embedder_factory
+        self.detector = detector if self.dedup_column else None
+        self.dedup_mode = dedup_mode
+        self.title_index = title_index if pipeline_type == "judgement" else None
+        self.stats = IngestionStats()
+
+    def _batches(self, rows: Iterator[Tuple[int, Dict[str, Any]]]) -> Iterator[Tuple[_Batch, Optional[List[str]]]]:
+        while True:
+            start = time.perf_counter()
+            batch, dedup_texts = _Batch([], [], []), [] if self.detector is not None else None
+            for index, row in rows:
+                content, meta = self.builder(row)
+                batch.ids.append(index)
+                batch.contents.append(content)
+                batch.metadata.append(meta)
+                if dedup_texts is not None:
+                    dedup_texts.append(row[self.dedup_column])
+                if len(batch.ids) == self.batch_size:
+                    break
+            self.stats.stages["read"] += time.perf_counter() - start
+            if not batch.ids:
+                return
+            self.stats.rows += len(batch.ids)
+            yield batch, dedup_texts
+
+    def _store(self, batch: _Batch):
+        embeddings, signatures, embed_seconds, signature_seconds = batch.result
+        self.stats.stages["embed"] += embed_seconds
+        self.stats.stages["signature"] += signature_seconds
+        keep = list(range(len(batch.ids)))
+        if signatures is not None:
+            start = time.perf_counter()
+            keep = []
+            for position, (point_id, signature) in enumerate(zip(batch.ids, signatures)):
+                duplicate = self.detector.check_signature(point_id, signature)
+                if duplicate is not None:
+                    self.stats.duplicates += 1
+                    if self.dedup_mode == "drop":
+                        self.stats.dropped += 1
+                        continue
+                    batch.metadata[position]["duplicate_of"], batch.metadata[position]["duplicate_similarity"] = duplicate
+                keep.append(position)
+            self.stats.stages["dedup"] += time.perf_counter() - start
+        if not keep:
+            return
+        start = time.perf_counter()
+        ids = [batch.ids[position] for position in keep]
+        self.client.upload_collection(
+            collection_name=self.collection_name,
+            vectors=embeddings[keep] if len(keep) < len(batch.ids) else embeddings,
+            payload=[{"content": batch.contents[position], "metadata": batch.metadata[position]} for position in keep],
+            ids=ids,
+            batch_size=len(ids),
+            wait=True
+        )
+        self.stats.stages["upload"] += time.perf_counter() - start
+        if self.title_index is not None:
+            for position in keep:
+                self.title_index.add(batch.ids[position], batch.metadata[position]["Titles"])
+        self.stats.stored += len(ids)
+
+    def run(self, paths: List[str], shard: Tuple[int, int] = (1, 1)) -> Dict[str, Any]:
+        """Ingest the shard and return the throughput report."""
+        started = time.perf_counter()
+        first_row, end_row, rows = iter_shard(paths, shard, self.columns)
+        logger.info(f"Shard {shard[0]}/{shard[1]}: rows {first_row}-{end_row - 1} of {len(paths)} file(s) -> {self.collection_name}")
+        num_perm = self.detector.hasher.num_perm if self.detector is not None else None
+        shingle_size = self.detector.hasher.shingle_size if self.detector is not None else 5
+        torch_threads = max(1, (os.cpu_count() or 1) // max(self.workers, 1))
+
+        if self.workers == 0:
+            _init_worker(self.embedder_factory, 0, num_perm, shingle_size)
+            for batch, dedup_texts in self._batches(rows):
+                batch.result = _embed_batch(batch.contents, dedup_texts, self.encode_batch_size)
+                self._store(batch)
+        else:
+            # Spawned, not forked: the model and its thread pools are created fresh in every worker
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.embedder_factory, torch_threads, num_perm, shingle_size)
+            ) as pool:
+                # Bounded read-ahead; results are consumed in submission order so ids and dedup are deterministic
+                pending: Deque[Tuple[_Batch, Future]] = deque()
+                for batch, dedup_texts in self._batches(rows):
+                    pending.append((batch, pool.submit(_embed_batch, batch.contents, dedup_texts, self.encode_batch_size)))
+                    if len(pending) >= 2 * self.workers:
+                        self._collect(pending.popleft())
+                while pending:
+                    self._collect(pending.popleft())
+
+        elapsed = time.perf_counter() - started
+        return {
+            "collection": self.collection_name,
+            "shard": f"{shard[0]}/{shard[1]}",
+            "first_row": first_row,
+            "end_row": end_row,
+            "files": paths,
+            "workers": self.workers,
+            "batch_size": self.batch_size,
+            "rows": self.stats.rows,
+            "stored": self.stats.stored,
+            "duplicates": self.stats.duplicates,
+            "dropped": self.stats.dropped,
+            "seconds": elapsed,
+            "docs_per_second": self.stats.rows / elapsed if elapsed > 0 else 0.0,
+            "stage_seconds": dict(self.stats.stages)
+        }
+
+    def _collect(self, item: Tuple[_Batch, Future]):
+        batch, future = item
+        start = time.perf_counter()
+        batch.result = future.result()
+        self.stats.stages["wait"] += time.perf_counter() - start
+        self._store(batch)
+
+
+def print_report(report: Dict[str, Any]):
+    print("\n===== LOCAL INGESTION =====")
+    print(f"Shard {report['shard']} (rows {report['first_row']}-{report['end_row'] - 1}) -> {report['collection']}, "
+          f"{report['workers']} worker(s), batches of {report['batch_size']}")
+    print(f"Rows read: {report['rows']}, stored: {report['stored']}, duplicates: {report['duplicates']} "
+          f"(dropped {report['dropped']})")
+    print(f"Total: {report['seconds']:.1f} s, {report['docs_per_second']:.1f} docs/sec")
+    print(f"{'stage':<12}{'seconds':>10}{'ms/doc':>10}")
+    rows = max(report["rows"], 1)
+    for stage, seconds in report["stage_seconds"].items():
+        print(f"{stage:<12}{seconds:>10.2f}{seconds * 1000 / rows:>10.2f}")
+    if report["workers"]:
+        print("embed and signature are summed over the workers; wait is the time the uploader waited for them")
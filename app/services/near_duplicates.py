@@ -0,0 +1,179 @@
+import re
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Mersenne prime 2^61 - 1 for the universal hash family (a * x + b) mod p
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_TOKEN = re.compile(r"\w+")
+
+
+def shingle_hashes(text: str, shingle_size: int = 5) -> np.ndarray:
+    """32-bit hashes of the distinct word `shingle_size`-grams of the lower-cased text."""
+    tokens = _TOKEN.findall(text.lower())
+    if len(tokens) < shingle_size:
+        shingles = {" ".join(tokens)} if tokens else set()
+    else:
+        shingles = {" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+    return np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def choose_bands(num_perm: int, threshold: float) -> int:
+    """
+    Number of LSH bands for `threshold`. Pairs with Jaccard similarity s become candidates with probability
+    1 - (1 - s^r)^b for b bands of r rows, which crosses 1/2 near (1/b)^(1/r). The fewest bands whose
+    crossing point is at or below the threshold are chosen: pairs above the threshold are then almost always
+    candidates, and the dissimilar candidates this lets through are filtered by the similarity check.
+    """
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands == 0 and (1 / bands) ** (bands / num_perm) <= threshold:
+            return bands
+    return num_perm
+
+
+class MinHasher:
+    """MinHash signatures of word shingles, computed for all permutations at once with NumPy."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._a = rng.randint(1, (1 << 31) - 1, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, (1 << 31) - 1, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = shingle_hashes(text, self.shingle_size)
+        if len(hashes) == 0:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        # (num_perm x shingles); a, b < 2^31 and x < 2^32 so a * x + b fits in 64 bits
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _PRIME & _MAX_HASH
+        return permuted.min(axis=1)
+
+
+def estimated_similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Jaccard similarity estimated as the fraction of equal MinHash values."""
+    return float(np.mean(first == second))
+
+
+class NearDuplicateDetector:
+    """
+    Streaming near-duplicate detection with MinHash and locality-sensitive hashing.
+    Each document is compared only with the earlier documents that share an LSH band, and counts as a
+    duplicate of the first candidate whose estimated Jaccard similarity reaches `threshold`.
+    Memory is bounded: only the `max_entries` most recent canonical documents are remembered, so a
+    duplicate of a document seen longer ago than that is not detected.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        num_perm: int = 128,
+        shingle_size: int = 5,
+        bands: Optional[int] = None,
+        max_entries: int = 200000,
+        max_examples: int = 100
+    ):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.bands = bands or choose_bands(num_perm, threshold)
+        if num_perm % self.bands:
+            raise ValueError("num_perm must be divisible by the number of bands")
+        self.rows = num_perm // self.bands
+        self.max_entries = max_entries
+        self.max_examples = max_examples
+        self._signatures: "OrderedDict[Any, np.ndarray]" = OrderedDict()
+        self._buckets: List[Dict[bytes, List[Any]]] = [{} for _ in range(self.bands)]
+        self.seen = 0
+        self.duplicates = 0
+        self.evicted = 0
+        self.examples: List[Dict[str, Any]] = []
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def _insert(self, doc_id: Any, signature: np.ndarray):
+        self._signatures[doc_id] = signature
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(key, []).append(doc_id)
+        if len(self._signatures) > self.max_entries:
+            old_id, old_signature = self._signatures.popitem(last=False)
+            for bucket, key in zip(self._buckets, self._band_keys(old_signature)):
+                members = bucket.get(key)
+                if members is not None:
+                    members.remove(old_id)
+                    if not members:
+                        del bucket[key]
+            self.evicted += 1
+
+    def check(self, doc_id: Any, text: str) -> Optional[Tuple[Any, float]]:
+        """
+        Compare a document with the remembered ones and remember it if it is new.
+
+        Returns:
+            (canonical id, estimated similarity) if the document is a near duplicate, else None.
+        """
+        return self.check_signature(doc_id, self.hasher.signature(text))
+
+    def check_signature(self, doc_id: Any, signature: np.ndarray) -> Optional[Tuple[Any, float]]:
+        """`check` with a signature computed elsewhere (e.g. in a worker process) by an identical MinHasher."""
+        self.seen += 1
+        checked = set()
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            for candidate in bucket.get(key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                similarity = estimated_similarity(signature, self._signatures[candidate])
+                if similarity >= self.threshold:
+                    self.duplicates += 1
+                    if len(self.examples) < self.max_examples:
+                        self.examples.append({"id": doc_id, "duplicate_of": candidate, "similarity": similarity})
+                    return candidate, similarity
+        self._insert(doc_id, signature)
+        return None
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "threshold": self.threshold,
+            "num_perm": self.hasher.num_perm,
+            "bands": self.bands,
+            "shingle_size": self.hasher.shingle_size,
+            "max_entries": self.max_entries,
+            "seen": self.seen,
+            "unique": self.seen - self.duplicates,
+            "duplicates": self.duplicates,
+            "duplicate_rate": self.duplicates / self.seen if self.seen else 0.0,
+            "evicted": self.evicted,
+            "examples": list(self.examples)
+        }
+
+
+def collapse_duplicates(
+    results: List[Any],
+    hasher: Optional[MinHasher] = None,
+    threshold: float = 0.85,
+    prefix_chars: int = 4000
+) -> Tuple[List[Any], int]:
+    """
+    Drop ranked search hits that duplicate a higher ranked hit: hits linked to the same canonical document
+    at ingestion (`metadata.duplicate_of`), and, with a `hasher`, hits whose leading `prefix_chars`
+    characters are near duplicates of a kept hit. Returns the kept hits and the number dropped.
+    """
+    kept, kept_signatures, canonical_ids = [], [], set()
+    for result in results:
+        payload = result.payload or {}
+        canonical_id = payload.get("metadata", {}).get("duplicate_of", result.id)
+        if canonical_id in canonical_ids:
+            continue
+        signature = None
+        if hasher is not None:
+            signature = hasher.signature(payload.get("content", "")[:prefix_chars])
+            if any(estimated_similarity(signature, other) >= threshold for other in kept_signatures):
+                continue
+            kept_signatures.append(signature)
+        canonical_ids.add(canonical_id)
+        kept.append(result)
+    return kept, len(results) - len(kept)
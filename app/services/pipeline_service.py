@@ -1,24 +1,109 @@
-from haystack import Pipeline
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
 from haystack.components.builders import PromptBuilder
-from haystack_integrations.components.generators.google_ai import GoogleAIGeminiGenerator
-from haystack.utils import Secret
-from app.core.config import settings
-from app.core.exceptions import QueryProcessingError
+from qdrant_client.http import models
+from app.core.exceptions import AdmissionRejectedError, QueryProcessingError
+from app.core.logging import logger
 from app.services.embedder_service import EmbedderService
 from app.services.qdrant_service import QdrantService
+from app.services.llm_cache import LLMResponseCache
+from app.services.admission_controller import AdmissionController
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.llm_generator import LLMGenerator, HaystackGeneratorProvider
+from app.services.adaptive_retrieval import RetrievalPolicy
+from app.services.context_compressor import ContextCompressor
+from app.services.faq_index import FAQIndex, FAQMatch
+from app.services.near_duplicates import MinHasher, collapse_duplicates
+from app.services.title_index import TitleIndex
+from app.core.config import settings
+
+def faq_document(match: FAQMatch) -> Dict[str, Any]:
+    """Response document describing the stored Q&A pair an FAQ answer came from."""
+    return {
+        "content": f"Question: {match.question} Answer: {match.answer}",
+        "metadata": {"question": match.question, "answer": match.answer, "faq_score": match.score}
+    }
+
+def payload_selector(metadata_fields: List[str], content: bool = True) -> List[str]:
+    """Qdrant payload keys for a metadata projection; `duplicate_of` is kept for query-time dedup."""
+    keys = ["content"] if content else []
+    return keys + ["metadata.duplicate_of"] + [f"metadata.{field}" for field in metadata_fields]
 
 class RAGPipelineService:
-    def __init__(self, qdrant_service: QdrantService, embedder_service: EmbedderService, type: str):
+    def __init__(
+        self,
+        qdrant_service: QdrantService,
+        embedder_service: EmbedderService,
+        type: str,
+        generator=None,
+        llm_cache: Optional[LLMResponseCache] = None,
+        admission_controller: Optional[AdmissionController] = None,
+        retrieval_policy: Optional[RetrievalPolicy] = None,
+        context_compressor: Optional[ContextCompressor] = None,
+        faq_index: Optional[FAQIndex] = None,
+        faq_rewrite: bool = False,
+        query_dedup: Optional[bool] = None,
+        title_index: Optional[TitleIndex] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        llm_deadline_seconds: Optional[float] = None,
+        complete_late: Optional[bool] = None,
+        degraded_summary_chars: Optional[int] = None
+    ):
+        """
+        Args:
+            generator: Optional LLMGenerator, or a Haystack generator component wrapped as a single provider.
+                Defaults to the provider chain in settings; benchmarks and tests pass stand-ins.
+            llm_cache: Optional cache of LLM replies keyed on the rendered prompt.
+            admission_controller: Optional limiter on concurrent LLM calls, applied to cache misses only.
+            retrieval_policy: How many search hits go into the prompt. Defaults to the RETRIEVAL_* settings.
+            context_compressor: Optional sentence-level compression of the hits before generation.
+                Defaults to the COMPRESSION settings of the pipeline type.
+            faq_index: Optional index of stored questions; confident matches are answered without retrieval.
+            faq_rewrite: Have the LLM rephrase a matched stored answer for the user's question.
+            query_dedup: Collapse duplicate search hits before the retrieval cut. Defaults to QUERY_DEDUP.
+            title_index: Optional index of document titles; documents a query names are retrieved directly.
+            circuit_breaker: Optional breaker around LLM calls, usually shared by all pipelines.
+            llm_deadline_seconds: How long a request waits for the LLM before answering without it.
+                Defaults to LLM_DEADLINE_SECONDS; 0 waits as long as the provider chain takes.
+            complete_late: Let generations past the deadline finish into the LLM cache. Defaults to LLM_COMPLETE_LATE.
+            degraded_summary_chars: Length of the extractive summary returned instead of a generated answer.
+                Defaults to DEGRADED_SUMMARY_CHARS; 0 returns no summary.
+        """
         self.qdrant_service = qdrant_service
         self.embedder_service = embedder_service
-        self.pipeline = self._create_pipeline()
         self.type = type
+        self.llm_cache = llm_cache
+        self.admission_controller = admission_controller
+        self.retrieval_policy = retrieval_policy or RetrievalPolicy.from_settings(type)
+        self.context_compressor = context_compressor or ContextCompressor.from_settings(type, embedder_service)
+        self.faq_index = faq_index
+        self.faq_rewrite = faq_rewrite
+        self.query_dedup = settings.QUERY_DEDUP if query_dedup is None else query_dedup
+        self.title_index = title_index
+        self.circuit_breaker = circuit_breaker
+        self.llm_deadline_seconds = settings.LLM_DEADLINE_SECONDS if llm_deadline_seconds is None else llm_deadline_seconds
+        self.complete_late = settings.LLM_COMPLETE_LATE if complete_late is None else complete_late
+        summary_chars = settings.DEGRADED_SUMMARY_CHARS if degraded_summary_chars is None else degraded_summary_chars
+        self.summarizer = ContextCompressor(embedder_service, max_chars=summary_chars) if summary_chars > 0 else None
+        self._late_generations: set = set()
+        self._dedup_hasher = MinHasher(settings.DEDUP_NUM_PERM, settings.DEDUP_SHINGLE_SIZE) if self.query_dedup else None
+        self.prompt_builder = self._create_prompt_builder()
+        self.llm = self._create_llm(generator)
+
+    def _create_llm(self, generator=None) -> LLMGenerator:
+        if generator is None:
+            return LLMGenerator.from_settings()
+        if isinstance(generator, LLMGenerator):
+            return generator
+        return LLMGenerator([HaystackGeneratorProvider(generator)])
     
-    def _create_pipeline(self):
+    def _create_prompt_builder(self) -> PromptBuilder:
 
         prompt_template = ""
 
-        if type == "judgement":
+        if self.type == "judgement":
             prompt_template = """
             You're a legal research assistant and given the following context of judgement,
             answer the user query and also provide references / document links for the verification of same.
@@ -30,7 +115,7 @@ class RAGPipelineService:
             Question: {{question}}
             Answer:
             """ 
-        elif type == "law":
+        elif self.type == "law":
             prompt_template = """
             You're a legal professional which explains indian laws and legal text in simlpe english to users 
             and given the following context of indian laws, answer the user query 
@@ -57,37 +142,286 @@ class RAGPipelineService:
             Answer:
             """
 
+        return PromptBuilder(template=prompt_template)
+
+    async def retrieve(
+        self,
+        query_embedding: List[float],
+        metadata_fields: Optional[List[str]] = None,
+        query_text: Optional[str] = None
+    ) -> Tuple[List[Any], Dict[str, Any]]:
+        """
+        Search the collection, collapse duplicate hits and cut the rest with the retrieval policy.
+        Documents whose title the query names (with a title index and `query_text`) are put first.
+
+        Args:
+            metadata_fields: Metadata keys to load with each hit; None loads the whole payload.
+                The content is always loaded because generation needs it. When the policy over-fetches,
+                the candidates are searched without content and only the kept hits' content is loaded.
+
+        Returns:
+            The kept hits and the policy's decision (rule, fetched count, chosen k, scores, the
+            number of collapsed duplicates and of title matches).
+        """
+        kept, selection = await self._search(query_embedding, metadata_fields)
+        title_hits = await self._title_hits(query_text, metadata_fields) if self.title_index and query_text else []
+        if title_hits:
+            title_ids = {hit.id for hit in title_hits}
+            kept = title_hits + [
+                hit for hit in kept
+                if hit.id not in title_ids and (hit.payload or {}).get("metadata", {}).get("duplicate_of") not in title_ids
+            ]
+            kept = kept[:max(selection["k"], len(title_hits))]
+            selection["k"] = len(kept)
+        selection["title_matches"] = len(title_hits)
+        return kept, selection
 
-        prompt_builder = PromptBuilder(template=prompt_template)
-        
-        pipeline = Pipeline()
-        pipeline.add_component("prompt_builder", prompt_builder)
-        pipeline.add_component("llm", GoogleAIGeminiGenerator(
-            model="gemini-2.0-flash",
-            api_key=Secret.from_token(settings.GOOGLE_API_KEY)
+    async def _title_hits(self, query_text: str, metadata_fields: Optional[List[str]] = None) -> List[Any]:
+        """Points whose title the query names, scored by the title match."""
+        matches = self.title_index.lookup(query_text, settings.TITLE_MATCH_LIMIT)
+        if not matches:
+            return []
+        with_payload = True if metadata_fields is None else payload_selector(metadata_fields)
+        payloads = await self.qdrant_service.retrieve_payloads([match.id for match in matches], with_payload)
+        return [
+            models.ScoredPoint(id=match.id, version=0, score=match.score, payload=payloads[match.id])
+            for match in matches
+            if match.id in payloads
+        ]
+
+    async def _search(self, query_embedding: List[float], metadata_fields: Optional[List[str]] = None) -> Tuple[List[Any], Dict[str, Any]]:
+        policy = self.retrieval_policy
+        if metadata_fields is None or policy.fetch_limit <= policy.max_k:
+            with_payload = True if metadata_fields is None else payload_selector(metadata_fields, content=True)
+            search_results = list(await self.qdrant_service.search_similar(query_embedding, policy.fetch_limit, with_payload))
+            collapsed = 0
+            if self.query_dedup:
+                search_results, collapsed = collapse_duplicates(search_results, self._dedup_hasher, settings.DEDUP_THRESHOLD)
+            kept, selection = policy.apply(search_results)
+            selection["duplicates_collapsed"] = collapsed
+            return kept, selection
+
+        search_results = list(await self.qdrant_service.search_similar(
+            query_embedding, policy.fetch_limit, payload_selector(metadata_fields, content=False)
         ))
-        
-        pipeline.connect("prompt_builder", "llm")
-        return pipeline
+        collapsed = 0
+        if self.query_dedup:
+            search_results, collapsed = collapse_duplicates(search_results)
+        kept, selection = policy.apply(search_results)
+        contents = await self.qdrant_service.retrieve_payloads([result.id for result in kept], ["content"])
+        for result in kept:
+            result.payload = {**(result.payload or {}), **contents.get(result.id, {})}
+        if self.query_dedup:
+            kept, near_duplicates = collapse_duplicates(kept, self._dedup_hasher, settings.DEDUP_THRESHOLD)
+            collapsed += near_duplicates
+            selection["k"] = len(kept)
+        selection["duplicates_collapsed"] = collapsed
+        return kept, selection
+
+    async def build_context(
+        self,
+        query_embedding: List[float],
+        documents: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Documents for the prompt, compressed to the sentences most similar to the query if compression is on.
+
+        Returns:
+            The documents and the compression report (None without compression).
+        """
+        if self.context_compressor is None:
+            return documents, None
+        return await self.context_compressor.compress(query_embedding, documents)
+
+    def render_prompt(self, query: str, documents: List[Dict[str, Any]]) -> str:
+        """Render the prompt template for the retrieved documents."""
+        return self.prompt_builder.run(question=query, documents=documents)["prompt"]
+
+    async def generate_answer(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        user_id: Optional[str] = None
+    ) -> Tuple[str, bool]:
+        """
+        Render the prompt and generate an answer, serving repeated prompts from the LLM cache.
+        Generation goes through the LLMGenerator provider chain (fallback and optional hedging).
+        Calls that reach the LLM are admitted through the admission controller, which may raise
+        AdmissionRejectedError under overload.
+
+        Returns:
+            The answer and whether it was served from the cache.
+        """
+        prompt = self.render_prompt(query, documents)
+        return await self._generate(prompt, user_id)
+
+    async def generate_answer_within_deadline(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        user_id: Optional[str] = None
+    ) -> Tuple[Optional[str], bool, Optional[str]]:
+        """
+        `generate_answer` for requests that would rather get the retrieved documents than wait or fail.
+        Cache hits are served as usual. Otherwise no LLM call is made while the circuit breaker is open, and
+        the call is abandoned after `llm_deadline_seconds`; with `complete_late` it keeps running in the
+        background and stores its reply in the LLM cache for the next identical prompt.
+        AdmissionRejectedError is still raised under overload.
+
+        Returns:
+            The answer (None when degraded), whether it was served from the cache, and the reason generation
+            was skipped: "circuit_open", "deadline" or "llm_error" (None when an answer was generated).
+        """
+        return await self._generate_within_deadline(self.render_prompt(query, documents), user_id)
+
+    async def _generate_within_deadline(
+        self,
+        prompt: str,
+        user_id: Optional[str] = None
+    ) -> Tuple[Optional[str], bool, Optional[str]]:
+        """`_generate` bounded by the LLM deadline and the circuit breaker, see `generate_answer_within_deadline`."""
+        cache_key = None
+        if self.llm_cache is not None:
+            cache_key = LLMResponseCache.make_key(self.llm.model_name, prompt)
+            cached_answer = await self.llm_cache.get(cache_key)
+            if cached_answer is not None:
+                return cached_answer, True, None
+
+        breaker = self.circuit_breaker
+        permit = breaker.allow() if breaker is not None else None
+        if breaker is not None and permit is None:
+            return None, False, "circuit_open"
+
+        start = time.perf_counter()
+        task = asyncio.ensure_future(self._call_llm(prompt, user_id, cache_key))
+        try:
+            if self.llm_deadline_seconds:
+                answer = await asyncio.wait_for(asyncio.shield(task), timeout=self.llm_deadline_seconds)
+            else:
+                answer = await task
+        except asyncio.TimeoutError:
+            if breaker is not None:
+                breaker.record(permit, False)
+            if self.complete_late and cache_key is not None:
+                self._late_generations.add(task)
+                task.add_done_callback(self._late_generation_done)
+            else:
+                task.cancel()
+            return None, False, "deadline"
+        except AdmissionRejectedError:
+            raise
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        except Exception as e:
+            if breaker is not None:
+                breaker.record(permit, False)
+            logger.warning(f"LLM generation failed, answering without it: {str(e)}")
+            return None, False, "llm_error"
+        if breaker is not None:
+            breaker.record(permit, True, (time.perf_counter() - start) * 1000)
+        return answer, False, None
+
+    def _late_generation_done(self, task: asyncio.Task):
+        self._late_generations.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Late LLM generation failed: {str(task.exception())}")
+
+    async def extractive_summary(self, query_embedding: List[float], documents: List[Dict[str, Any]]) -> str:
+        """The sentences of `documents` most similar to the query, in document order, as a stand-in answer."""
+        if self.summarizer is None or not documents:
+            return ""
+        kept, _ = await self.summarizer.compress(query_embedding, documents[:settings.DEGRADED_SUMMARY_DOCUMENTS])
+        return " ".join(document["content"] for document in kept if document["content"])
+
+    async def _generate(self, prompt: str, user_id: Optional[str] = None) -> Tuple[str, bool]:
+        """Generate a reply to a rendered prompt through the LLM cache and admission control."""
+        cache_key = None
+        if self.llm_cache is not None:
+            cache_key = LLMResponseCache.make_key(self.llm.model_name, prompt)
+            cached_answer = await self.llm_cache.get(cache_key)
+            if cached_answer is not None:
+                return cached_answer, True
+        return await self._call_llm(prompt, user_id, cache_key), False
+
+    async def _call_llm(self, prompt: str, user_id: Optional[str], cache_key: Optional[str]) -> str:
+        """Call the provider chain through admission control and store the reply under `cache_key`."""
+        if self.admission_controller is not None:
+            async with self.admission_controller.admit(user_id):
+                result = await self.llm.generate(prompt)
+        else:
+            result = await self.llm.generate(prompt)
+        answer = result.text
+
+        if cache_key is not None:
+            await self.llm_cache.set(cache_key, answer)
+        return answer
+
+    async def answer_from_faq(
+        self,
+        query: str,
+        query_embedding: List[float],
+        user_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Answer from the FAQ index when the closest stored question passes its threshold.
+
+        Returns:
+            None without a confident match, else the answer, its `source` ("faq", or "faq_rewrite" when
+            the LLM rephrased it), whether the rewrite came from the LLM cache, the FAQMatch, the
+            lookup and rewrite times in milliseconds, and why a rewrite was skipped ("circuit_open",
+            "deadline" or "llm_error" as for generation, in which case the stored answer is returned).
+        """
+        if self.faq_index is None:
+            return None
+        start = time.perf_counter()
+        match = await self.faq_index.lookup(query_embedding)
+        lookup_ms = (time.perf_counter() - start) * 1000
+        if match is None:
+            return None
+        if not self.faq_rewrite:
+            return {
+                "answer": match.answer, "source": "faq", "llm_cached": False, "match": match,
+                "lookup_ms": lookup_ms, "rewrite_ms": 0.0, "rewrite_skipped": None
+            }
+        start = time.perf_counter()
+        answer, cached, skipped = await self._generate_within_deadline(self.render_faq_rewrite_prompt(query, match), user_id)
+        return {
+            "answer": match.answer if skipped else answer,
+            "source": "faq" if skipped else "faq_rewrite",
+            "llm_cached": cached, "match": match,
+            "lookup_ms": lookup_ms, "rewrite_ms": (time.perf_counter() - start) * 1000, "rewrite_skipped": skipped
+        }
+
+    def render_faq_rewrite_prompt(self, query: str, match: FAQMatch) -> str:
+        return (
+            "Rewrite the following answer so that it directly answers the user's question in simple English. "
+            "Do not add any information that is not in the answer.\n"
+            f"Stored question: {match.question}\n"
+            f"Answer: {match.answer}\n"
+            f"User question: {query}\n"
+            "Rewritten answer:"
+        )
     
     async def process_query(self, query: str) -> dict:
         try:
             query_embedding = await self.embedder_service.get_query_embedding(query)
-            search_results = await self.qdrant_service.search_similar(query_embedding)
-
-            pipeline_input = {
-                "prompt_builder": {
-                    "question": query,
-                    "documents": [
-                        {"content": result.payload["content"]} for result in search_results
-                    ]
+            faq_answer = await self.answer_from_faq(query, query_embedding)
+            if faq_answer is not None:
+                return {
+                    "answer": faq_answer["answer"],
+                    "documents": [faq_document(faq_answer["match"])],
+                    "source": faq_answer["source"]
                 }
-            }
+            search_results, _ = await self.retrieve(query_embedding, query_text=query)
 
-            result = self.pipeline.run(pipeline_input)
+            documents = [{"content": result.payload["content"]} for result in search_results]
+            documents, _ = await self.build_context(query_embedding, documents)
+            answer, _ = await self.generate_answer(query, documents)
 
             return {
-                "answer": result["llm"]["replies"][0],
+                "answer": answer,
+                "source": "rag",
                 "documents": [
                     {
                         "content": result.payload["content"],
@@ -0,0 +1,265 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Iterable
+
+from app.core.logging import logger
+from app.services.query_log import query_hash
+
+# Stages recorded for every completed pipeline run
+TRACE_STAGES = ["embedding", "search", "context", "llm"]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Return the linearly interpolated percentile of a list of values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return float(ordered[0])
+    rank = (pct / 100.0) * (len(ordered) - 1)
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    fraction = rank - lower
+    return float(ordered[lower] + (ordered[upper] - ordered[lower]) * fraction)
+
+
+def summarize(values: List[float], percentiles: Iterable[float] = (50, 95, 99)) -> Dict[str, Any]:
+    """Summarize a list of timings as count, mean, max and the requested percentiles."""
+    summary = {"count": len(values)}
+    if not values:
+        return summary
+    summary["mean"] = sum(values) / len(values)
+    summary["max"] = max(values)
+    for pct in percentiles:
+        summary[f"p{int(pct)}"] = percentile(values, pct)
+    return summary
+
+
+class PipelineTraceStore:
+    """
+    Bounded history of completed pipeline traces.
+    Traces are kept in an in-memory ring buffer and optionally mirrored to a local SQLite file
+    so that latency can be inspected after a restart or over windows longer than the buffer.
+    Mirrored traces are buffered in memory and written every `flush_seconds` by a background task (`start`)
+    on a worker thread, so requests never wait on the file. The file holds no query text or user ids:
+    the query is replaced by its `query_hash`, as in the query log, and the user id is dropped.
+    """
+
+    def __init__(
+        self,
+        max_traces: int = 500,
+        db_path: Optional[str] = None,
+        db_max_rows: int = 100000,
+        flush_seconds: float = 5.0
+    ):
+        self.traces: deque = deque(maxlen=max_traces)
+        self.db_path = db_path
+        self.db_max_rows = db_max_rows
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._inserts_since_prune = 0
+
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path: str):
+        """Open (or create) the SQLite mirror and preload the most recent traces."""
+        try:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pipeline_traces (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp REAL NOT NULL,
+                    pipeline_type TEXT,
+                    user_id TEXT,
+                    total_time_ms REAL,
+                    data TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_pipeline_traces_timestamp ON pipeline_traces (timestamp)"
+            )
+            self._conn.commit()
+
+            rows = self._conn.execute(
+                "SELECT data FROM pipeline_traces ORDER BY timestamp DESC LIMIT ?",
+                (self.traces.maxlen,)
+            ).fetchall()
+            for (data,) in reversed(rows):
+                self.traces.append(json.loads(data))
+            logger.info(f"Loaded {len(rows)} pipeline traces from {db_path}")
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open pipeline trace database {db_path}: {str(e)}")
+            self._conn = None
+
+    def record(self, trace: Dict[str, Any]):
+        """Store a completed pipeline trace in memory; it reaches the file with the next flush."""
+        trace = dict(trace)
+        trace.setdefault("timestamp", time.time())
+
+        with self._lock:
+            self.traces.append(trace)
+            if self._conn is not None:
+                self._pending.append(trace)
+
+    @staticmethod
+    def _anonymized(trace: Dict[str, Any]) -> Dict[str, Any]:
+        """The trace as persisted: the query replaced by its hash and the user id dropped."""
+        stored = {key: value for key, value in trace.items() if key not in ("query", "user_id")}
+        if trace.get("query"):
+            stored["query_hash"] = query_hash(trace["query"])
+        return stored
+
+    def flush(self):
+        """Write the buffered traces to the file and drop the oldest rows beyond db_max_rows."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending or self._conn is None:
+            return
+        with self._db_lock:
+            try:
+                self._conn.executemany(
+                    "INSERT INTO pipeline_traces (timestamp, pipeline_type, user_id, total_time_ms, data) "
+                    "VALUES (?, ?, NULL, ?, ?)",
+                    [
+                        (trace["timestamp"], trace.get("pipeline_type"), trace.get("total_time_ms"),
+                         json.dumps(self._anonymized(trace)))
+                        for trace in pending
+                    ]
+                )
+                self._inserts_since_prune += len(pending)
+                if self._inserts_since_prune >= 1000:
+                    self._prune()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                logger.error(f"Failed to persist pipeline traces: {str(e)}")
+
+    def _prune(self):
+        """Drop the oldest persisted rows beyond db_max_rows. Caller holds the database lock."""
+        self._conn.execute(
+            "DELETE FROM pipeline_traces WHERE id <= "
+            "(SELECT id FROM pipeline_traces ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (self.db_max_rows,)
+        )
+        self._inserts_since_prune = 0
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.warning(f"Pipeline trace flush failed: {e}")
+
+    def start(self):
+        """Flush every `flush_seconds` in the background."""
+        if self._task is None and self._conn is not None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background flushes and write what is pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def history(
+        self,
+        limit: int = 50,
+        pipeline_type: Optional[str] = None,
+        since: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Return the most recent traces, newest first."""
+        results = []
+        with self._lock:
+            for trace in reversed(self.traces):
+                if since is not None and trace["timestamp"] < since:
+                    break
+                if pipeline_type and trace.get("pipeline_type") != pipeline_type:
+                    continue
+                results.append(trace)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def _traces_in_window(self, since: float, pipeline_type: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Collect traces newer than `since`, reading from SQLite (after writing this process's pending traces)
+        when the buffer does not cover the window.
+        """
+        with self._lock:
+            buffer_covers_window = (
+                self._conn is None
+                or (len(self.traces) > 0 and self.traces[0]["timestamp"] <= since)
+                or len(self.traces) < self.traces.maxlen
+            )
+            if buffer_covers_window:
+                return [
+                    trace for trace in self.traces
+                    if trace["timestamp"] >= since
+                    and (not pipeline_type or trace.get("pipeline_type") == pipeline_type)
+                ]
+
+        self.flush()
+        query = "SELECT data FROM pipeline_traces WHERE timestamp >= ?"
+        params: List[Any] = [since]
+        if pipeline_type:
+            query += " AND pipeline_type = ?"
+            params.append(pipeline_type)
+        with self._db_lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def aggregate(
+        self,
+        window_seconds: float = 3600,
+        pipeline_type: Optional[str] = None,
+        percentiles: Iterable[float] = (50, 95, 99)
+    ) -> Dict[str, Any]:
+        """Compute per-stage latency percentiles and token statistics over a trailing time window."""
+        now = time.time()
+        traces = self._traces_in_window(now - window_seconds, pipeline_type)
+        percentiles = list(percentiles)
+
+        stages = {}
+        for stage in TRACE_STAGES + ["total"]:
+            values = [
+                trace[f"{stage}_time_ms"] for trace in traces
+                if isinstance(trace.get(f"{stage}_time_ms"), (int, float))
+            ]
+            stages[stage] = summarize(values, percentiles)
+
+        tokens = {}
+        for key in ("context_tokens", "answer_tokens"):
+            values = [trace[key] for trace in traces if isinstance(trace.get(key), (int, float))]
+            tokens[key] = summarize(values, percentiles)
+
+        retrieved_k = [trace["retrieved_k"] for trace in traces if isinstance(trace.get("retrieved_k"), (int, float))]
+
+        return {
+            "window_seconds": window_seconds,
+            "pipeline_type": pipeline_type,
+            "count": len(traces),
+            "coalesced": sum(1 for trace in traces if trace.get("coalesced")),
+            "generated_at": now,
+            "stages": stages,
+            "tokens": tokens,
+            "retrieved_k": summarize(retrieved_k, percentiles)
+        }
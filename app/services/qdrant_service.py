@@ -1,18 +1,76 @@
+import numpy as np
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
-from typing import List, Dict
+from typing import Any, List, Dict, Optional, Sequence, Union
 from app.core.config import settings
 from app.core.logging import logger
+from app.services.search_cache import SearchResultCache
 
 
 class QdrantService:
-    def __init__(self, client: QdrantClient, collection_name: str = "judgement"):
+    def __init__(
+        self,
+        client: QdrantClient,
+        collection_name: str = "judgement",
+        search_cache: Optional[SearchResultCache] = None
+    ):
         self.client = client
         self.collection_name = collection_name
+        self.search_cache = search_cache
 
-    async def search_similar(self, query_vector: List[float], top_k: int = 10):
-        return self.client.search(
-            collection_name= settings.COLLECTION_NAME if self.collection_name == "judgement" else settings.COLLECTION_NAME2,
+    @property
+    def qdrant_collection(self) -> str:
+        if self.collection_name == "faq":
+            return settings.FAQ_COLLECTION_NAME
+        return settings.COLLECTION_NAME if self.collection_name == "judgement" else settings.COLLECTION_NAME2
+
+    async def search_similar(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 10,
+        with_payload: Union[bool, Sequence[str]] = True
+    ):
+        """
+        Nearest points; `with_payload` may list payload keys (e.g. "metadata.Titles") to transfer only those.
+        With a search cache, repeated searches of the same collection epoch are answered from memory.
+        """
+        key = None
+        if self.search_cache is not None:
+            key = self.search_cache.make_key(self.qdrant_collection, query_vector, top_k, with_payload)
+            cached = await self.search_cache.get(key)
+            if cached is not None:
+                return cached
+        results = self.client.search(
+            collection_name=self.qdrant_collection,
             query_vector=query_vector,
-            limit=top_k
-        )
\ No newline at end of file
+            limit=top_k,
+            with_payload=with_payload
+        )
+        if key is not None:
+            await self.search_cache.set(key, results)
+        return results
+
+    async def retrieve_payloads(
+        self,
+        ids: List[Any],
+        with_payload: Union[bool, Sequence[str]] = True
+    ) -> Dict[Any, Dict[str, Any]]:
+        """Payloads (or the selected payload keys) of the given points, by id."""
+        points = self.client.retrieve(
+            collection_name=self.qdrant_collection,
+            ids=ids,
+            with_payload=with_payload,
+            with_vectors=False
+        )
+        return {point.id: point.payload or {} for point in points}
+
+    async def search_batch(self, query_vectors: np.ndarray, top_k: int = 10):
+        """Search several vectors in one request; results contain ids and scores only."""
+        # The request models only take lists, so rows are converted here, at the wire boundary
+        return self.client.search_batch(
+            collection_name=self.qdrant_collection,
+            requests=[
+                models.SearchRequest(vector=vector, limit=top_k, with_payload=False)
+                for vector in np.asarray(query_vectors, dtype=np.float32).tolist()
+            ]
+        )
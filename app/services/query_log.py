@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.logging import logger
+
+# Queries naming an e-mail address or a long number (phone, Aadhaar, case or account numbers) are not logged
+_PERSONAL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+|\d[\d\s-]{6,}\d")
+
+
+def normalize_query(query_text: str) -> str:
+    """Collapse whitespace and case so trivially different spellings of a query coalesce."""
+    return re.sub(r"\s+", " ", query_text.strip()).casefold()
+
+
+def query_hash(query_text: str) -> str:
+    """Hash of the normalized query, under which its count is kept."""
+    return hashlib.blake2b(normalize_query(query_text).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class QueryFrequencyLog:
+    """
+    Anonymized query frequencies, used to warm the caches after a restart.
+    Per pipeline type, the file keeps a hash of each normalized query, its count and the last time it was
+    seen; no user ids or per-request timestamps. The query text (its latest spelling) is only written once
+    the query has been asked `min_count` times, so questions asked once or twice, which may name people or
+    facts of a case, never reach the disk. Queries naming an e-mail address or a long number are not counted
+    at all. Counts are buffered in memory and added to a local SQLite file every `flush_seconds` by a
+    background task (`start`) on a worker thread, so all worker processes of a host share one log without
+    requests waiting on the file. The file keeps the `max_queries` most frequent queries.
+    """
+
+    def __init__(self, db_path: str, max_queries: int = 10000, flush_seconds: float = 30.0, min_count: int = 3):
+        self.db_path = db_path
+        self.max_queries = max_queries
+        self.flush_seconds = flush_seconds
+        self.min_count = min_count
+        self._pending: Dict[Tuple[str, str], List[Any]] = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.skipped = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS query_counts (
+                pipeline_type TEXT NOT NULL,
+                query_hash TEXT NOT NULL,
+                query TEXT,
+                count INTEGER NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (pipeline_type, query_hash)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_query_counts_count ON query_counts (count)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def record(self, pipeline_type: str, query: str):
+        """Count one occurrence of a query, in memory."""
+        if not query.strip() or _PERSONAL.search(query):
+            self.skipped += 1
+            return
+        key = (pipeline_type, query_hash(query))
+        with self._lock:
+            entry = self._pending.setdefault(key, [query, 0, 0.0])
+            entry[0], entry[1], entry[2] = query.strip(), entry[1] + 1, time.time()
+            self.recorded += 1
+
+    def flush(self):
+        """Add the buffered counts to the file and drop all but the most frequent queries."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        with self._db_lock:
+            try:
+                # The text is written only once the total count reaches min_count
+                self._conn.executemany(
+                    """
+                    INSERT INTO query_counts (pipeline_type, query_hash, query, count, last_seen)
+                    VALUES (?, ?, CASE WHEN ? >= ? THEN ? END, ?, ?)
+                    ON CONFLICT (pipeline_type, query_hash) DO UPDATE SET
+                        query = CASE WHEN count + excluded.count >= ? THEN ? ELSE query END,
+                        count = count + excluded.count,
+                        last_seen = excluded.last_seen
+                    """,
+                    [(pipeline_type, key, count, self.min_count, query, count, last_seen, self.min_count, query)
+                     for (pipeline_type, key), (query, count, last_seen) in pending.items()]
+                )
+                self._conn.execute(
+                    "DELETE FROM query_counts WHERE rowid NOT IN "
+                    "(SELECT rowid FROM query_counts ORDER BY count DESC, last_seen DESC LIMIT ?)",
+                    (self.max_queries,)
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                logger.error(f"Failed to write query log {self.db_path}: {str(e)}")
+
+    def top(self, limit: int = 100, min_count: int = 1, pipeline_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most frequent queries in the file whose text is kept, most frequent first."""
+        sql = "SELECT pipeline_type, query, count, last_seen FROM query_counts WHERE query IS NOT NULL AND count >= ?"
+        params: List[Any] = [min_count]
+        if pipeline_type is not None:
+            sql += " AND pipeline_type = ?"
+            params.append(pipeline_type)
+        sql += " ORDER BY count DESC, last_seen DESC LIMIT ?"
+        params.append(limit)
+        with self._db_lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"pipeline_type": row[0], "query": row[1], "count": row[2], "last_seen": row[3]}
+            for row in rows
+        ]
+
+    def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        """
+        Take a named lease in the file for `ttl_seconds`, unless another holder has an unexpired one.
+        Lets one of the worker processes sharing the file do a job, such as the startup warm-up.
+        """
+        now = time.time()
+        with self._db_lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                row = self._conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+                if row is not None and row[0] != holder and row[1] > now:
+                    self._conn.rollback()
+                    return False
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)",
+                    (name, holder, now + ttl_seconds)
+                )
+                self._conn.commit()
+                return True
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                logger.error(f"Failed to take lease {name} in {self.db_path}: {str(e)}")
+                return False
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.warning(f"Query log flush failed: {e}")
+
+    def start(self):
+        """Flush every `flush_seconds` in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background flushes and write what is pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._db_lock:
+            stored, with_text = self._conn.execute("SELECT COUNT(*), COUNT(query) FROM query_counts").fetchone()
+        return {
+            "recorded": self.recorded,
+            "skipped": self.skipped,
+            "pending": len(self._pending),
+            "stored_queries": stored,
+            "stored_texts": with_text
+        }
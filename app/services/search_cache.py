@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+from qdrant_client.http import models
+
+from app.services.cache_backends import CacheBackend
+
+
+class SearchResultCache:
+    """
+    Cache of vector search results, keyed on the collection, its version, a hash of the quantized query
+    vector, the limit and the payload selection.
+    Entries live in a per-process LRU tier and, optionally, in a shared backend (a local SQLite file or a
+    Redis-compatible server) so that every worker process serves results another one cached.
+    Query vectors are rounded to multiples of `quantum` before hashing, so float noise between two encodings
+    of the same text (e.g. from different batch sizes) mostly maps to the same key; a component that straddles
+    a rounding boundary still causes a miss. The version of a collection (`set_version`) names the physical
+    collection behind the alias and its ingestion epoch from the collection registry, so all processes agree
+    on it and results cached before a reindex or re-ingestion are never returned; `bump` additionally
+    invalidates this process's entries. Entries also expire after `ttl_seconds` (None disables expiry),
+    which bounds staleness when writes are not signalled; results copied from the backend keep their age.
+    Backend reads and writes run in a worker thread, off the event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl_seconds: Optional[float] = 3600,
+        quantum: float = 1e-4,
+        backend: Optional[CacheBackend] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.quantum = quantum
+        self.backend = backend
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._epochs: Dict[str, int] = {}
+        self._versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def epoch(self, collection: str) -> int:
+        return self._epochs.get(collection, 0)
+
+    def set_version(self, collection: str, version: str):
+        """Key results of `collection` under `version`, e.g. "<physical collection>:<epoch>"."""
+        with self._lock:
+            if self._versions.get(collection) != version:
+                if collection in self._versions:
+                    self.invalidations += 1
+                self._versions[collection] = version
+
+    def bump(self, collection: str) -> int:
+        """Invalidate every result of `collection` cached by this process. Returns the new epoch."""
+        with self._lock:
+            self._epochs[collection] = self._epochs.get(collection, 0) + 1
+            self.invalidations += 1
+            return self._epochs[collection]
+
+    def vector_hash(self, vector: Any) -> str:
+        quantized = np.rint(np.asarray(vector, dtype=np.float32) / self.quantum).astype(np.int32)
+        return hashlib.blake2b(quantized.tobytes(), digest_size=16).hexdigest()
+
+    def make_key(
+        self,
+        collection: str,
+        vector: Any,
+        top_k: int,
+        with_payload: Union[bool, Sequence[str]] = True
+    ) -> str:
+        selection = with_payload if isinstance(with_payload, bool) else sorted(with_payload)
+        material = json.dumps([collection, self._versions.get(collection), self.epoch(collection), top_k, selection])
+        return f"{material}:{self.vector_hash(vector)}"
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    async def get(self, key: str) -> Optional[List[Any]]:
+        """Cached results for `key`, as copies the caller may modify, or None on a miss."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                results, created_at = entry
+                if not self._expired(created_at):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return [result.model_copy() for result in results]
+                del self._memory[key]
+
+        if self.backend is not None:
+            stored = await asyncio.to_thread(self.backend.get, key)
+            if isinstance(stored, dict) and "created_at" in stored and not self._expired(stored["created_at"]):
+                results = [models.ScoredPoint.model_validate(result) for result in stored["results"]]
+                with self._lock:
+                    self._remember(key, results, stored["created_at"])
+                    self.hits += 1
+                    self.shared_hits += 1
+                return [result.model_copy() for result in results]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def set(self, key: str, results: List[Any]):
+        """Store results (qdrant ScoredPoint objects); copies are kept so later changes by the caller do not leak in."""
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, [result.model_copy() for result in results], created_at)
+        if self.backend is not None:
+            stored = {"results": [result.model_dump(mode="json") for result in results], "created_at": created_at}
+            await asyncio.to_thread(self.backend.set, key, stored, self.ttl_seconds)
+
+    def _remember(self, key: str, results: List[Any], created_at: float):
+        """Insert into the memory tier, evicting least recently used entries. Caller holds the lock."""
+        self._memory[key] = (results, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        """Drop this process's entries; the shared tier is left to its versions and expiry."""
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "epochs": dict(self._epochs),
+            "versions": dict(self._versions),
+            "backend": self.backend.name if self.backend is not None else None
+        }
@@ -0,0 +1,216 @@
+import json
+import math
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from app.core.logging import logger
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_VERSUS = re.compile(r"\b(?:v/s|versus|vs|v)\b\.?")
+
+
+def normalize_title(text: str) -> List[str]:
+    """Lower-cased alphanumeric tokens with "v.", "v/s" and "versus" spelled "vs" and "&" as "and"."""
+    text = _VERSUS.sub(" vs ", text.casefold().replace("&", " and "))
+    return _TOKEN.findall(text)
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class TitleMatch:
+    """Stored document whose title the query names, with the fraction of the title found in the query."""
+    id: Any
+    title: str
+    score: float
+
+
+class TitleIndex:
+    """
+    Inverted index from normalized title tokens (case names and dates of the judgements) to point ids.
+    A query matches a title when it contains most of the title: the score is the IDF-weighted fraction of
+    the title's tokens found in the query, so rare party names count for more than "state", "vs" or the month.
+    Query tokens missing from the vocabulary are matched to close vocabulary tokens (misspelt party names)
+    found through a trigram index and weighted by their similarity.
+    Scores of all titles are accumulated at once over NumPy postings, built by `prepare` (or the first lookup
+    after adds).
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        fuzzy_ratio: float = 0.8,
+        fuzzy_candidates: int = 5,
+        margin: float = 0.05,
+        max_trigram_tokens: int = 5000,
+        close_token_cache_size: int = 4096
+    ):
+        """
+        Args:
+            threshold: Minimum score of a confident match.
+            fuzzy_ratio: Minimum similarity (difflib ratio) of a misspelt query token to a vocabulary token.
+            fuzzy_candidates: Vocabulary tokens a misspelt query token may stand for.
+            margin: Matches scoring more than this below the best match are dropped, so a title that only
+                shares most of its words with the named case (same parties, other date) is not returned with it.
+            max_trigram_tokens: Trigrams shared by more vocabulary tokens are ignored by the fuzzy matching.
+            close_token_cache_size: Unknown query tokens whose close vocabulary tokens are kept (least recently
+                used dropped first).
+        """
+        self.threshold = threshold
+        self.fuzzy_ratio = fuzzy_ratio
+        self.fuzzy_candidates = fuzzy_candidates
+        self.margin = margin
+        self.max_trigram_tokens = max_trigram_tokens
+        self.close_token_cache_size = close_token_cache_size
+        self.ids: List[Any] = []
+        self.titles: List[str] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._close_tokens: "OrderedDict[str, List[Tuple[str, float]]]" = OrderedDict()
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+        self._idf: Dict[str, float] = {}
+        self._title_idf = np.zeros(0)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, doc_id: Any, title: str):
+        tokens = set(normalize_title(title))
+        if not tokens:
+            return
+        position = len(self.ids)
+        self.ids.append(doc_id)
+        self.titles.append(title)
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                self._postings[token] = postings = []
+                for trigram in trigrams(token):
+                    self._trigrams.setdefault(trigram, set()).add(token)
+            postings.append(position)
+        self._arrays = None
+        self._close_tokens.clear()
+
+    def prepare(self):
+        """Freeze the postings into arrays and precompute token IDF and the total IDF of each title."""
+        count = len(self.ids)
+        self._arrays = {token: np.asarray(postings, dtype=np.int64) for token, postings in self._postings.items()}
+        self._idf = {token: math.log((count + 1) / (len(postings) + 1)) + 1 for token, postings in self._postings.items()}
+        self._title_idf = np.zeros(count)
+        for token, positions in self._arrays.items():
+            self._title_idf[positions] += self._idf[token]
+
+    def close_tokens(self, token: str) -> List[Tuple[str, float]]:
+        """Vocabulary tokens close to an unknown query token, with their similarity, closest first."""
+        if token in self._close_tokens:
+            self._close_tokens.move_to_end(token)
+            return self._close_tokens[token]
+        close = []
+        if len(token) >= 4:
+            counts: Dict[str, int] = {}
+            usable = 0
+            for trigram in trigrams(token):
+                tokens = self._trigrams.get(trigram, ())
+                if len(tokens) > self.max_trigram_tokens:
+                    continue
+                usable += 1
+                for candidate in tokens:
+                    counts[candidate] = counts.get(candidate, 0) + 1
+            # A substitution changes up to three trigrams, so close tokens share at least a third of them
+            for candidate, shared in counts.items():
+                if shared < usable / 3:
+                    continue
+                ratio = SequenceMatcher(None, token, candidate).ratio()
+                if ratio >= self.fuzzy_ratio:
+                    close.append((candidate, ratio))
+            close.sort(key=lambda item: item[1], reverse=True)
+            close = close[:self.fuzzy_candidates]
+        self._close_tokens[token] = close
+        while len(self._close_tokens) > self.close_token_cache_size:
+            self._close_tokens.popitem(last=False)
+        return close
+
+    def lookup(self, query: str, limit: int = 3, threshold: Optional[float] = None) -> List[TitleMatch]:
+        """Titles the query names with a score of at least `threshold` (default: the index threshold), best first."""
+        if not self.ids:
+            return []
+        if self._arrays is None:
+            self.prepare()
+        threshold = self.threshold if threshold is None else threshold
+        weights: Dict[str, float] = {}
+        for token in set(normalize_title(query)):
+            if token in self._postings:
+                weights[token] = 1.0
+            else:
+                for candidate, ratio in self.close_tokens(token):
+                    weights[candidate] = max(weights.get(candidate, 0.0), ratio)
+        if not weights:
+            return []
+
+        found = np.zeros(len(self.ids))
+        for token, weight in weights.items():
+            found[self._arrays[token]] += self._idf[token] * weight
+        scores = found / self._title_idf
+        positions = np.flatnonzero(scores >= threshold)
+        if len(positions) == 0:
+            return []
+        positions = positions[np.argsort(-scores[positions], kind="stable")]
+        best = scores[positions[0]]
+        return [
+            TitleMatch(id=self.ids[position], title=self.titles[position], score=float(scores[position]))
+            for position in positions[:limit]
+            if scores[position] >= best - self.margin
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"titles": len(self.ids), "vocabulary": len(self._postings), "threshold": self.threshold}
+
+    def save(self, path: str):
+        """Write the (id, title) pairs; the postings are rebuilt on load."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"ids": self.ids, "titles": self.titles}, f)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "TitleIndex":
+        with open(path) as f:
+            data = json.load(f)
+        index = cls(**kwargs)
+        for doc_id, title in zip(data["ids"], data["titles"]):
+            index.add(doc_id, title)
+        index.prepare()
+        return index
+
+
+def build_title_index(client: QdrantClient, collection_name: str, batch_size: int = 1000) -> TitleIndex:
+    """Title index of the `metadata.Titles` of every point in an existing collection."""
+    index = TitleIndex()
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=["metadata.Titles"],
+            with_vectors=False
+        )
+        for point in points:
+            title = (point.payload or {}).get("metadata", {}).get("Titles")
+            if title:
+                index.add(point.id, title)
+        logger.info(f"Indexed {len(index)} titles")
+        if offset is None:
+            break
+    return index
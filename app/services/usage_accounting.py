@@ -0,0 +1,302 @@
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.exceptions import UsageBudgetExceededError
+from app.core.logging import logger
+
+ANONYMOUS = "anonymous"
+USER = "user"
+PIPELINE = "pipeline"
+
+# Counters kept per bucket: requests, prompt tokens, completion tokens, LLM milliseconds
+Counters = List[float]
+Buckets = Dict[int, Counters]
+
+
+class UsageAccountant:
+    """
+    Requests, prompt and completion tokens and LLM time per user and per pipeline over sliding windows.
+    Usage is counted in buckets of `bucket_seconds`; a window sums the buckets it covers, so it slides one
+    bucket at a time, and buckets older than the longest window are dropped. With `db_path`, counts are added
+    to a local SQLite file every `flush_seconds` and each flush reloads the totals of all worker processes
+    sharing the file, so usage survives restarts and budgets hold across workers with one flush of lag.
+    Recording only touches memory; flushes run in a background task (`start`) on a worker thread.
+
+    Budgets cap each user's requests, tokens and LLM time within `budget_window_seconds` (0 disables a cap).
+    They are checked before a request runs and charged after it, so concurrent requests can overshoot by
+    what is in flight. Requests without a user id are counted as "anonymous" and are not budgeted.
+    """
+
+    def __init__(
+        self,
+        windows: Sequence[float] = (3600, 86400),
+        bucket_seconds: float = 60.0,
+        db_path: str = "",
+        flush_seconds: float = 30.0,
+        budget_window_seconds: float = 86400,
+        max_requests: int = 0,
+        max_tokens: int = 0,
+        max_llm_seconds: float = 0
+    ):
+        self.windows = sorted(windows)
+        self.bucket_seconds = bucket_seconds
+        self.db_path = db_path
+        self.flush_seconds = flush_seconds
+        self.budget_window_seconds = budget_window_seconds
+        self.max_requests = max_requests
+        self.max_tokens = max_tokens
+        self.max_llm_ms = max_llm_seconds * 1000
+        self.retention_seconds = max(self.windows + [budget_window_seconds])
+        self._totals: Dict[Tuple[str, str], Buckets] = {}
+        self._pending: Dict[Tuple[str, str], Buckets] = {}
+        # Counts taken out of _pending by a flush that is still writing them
+        self._flushing: Dict[Tuple[str, str], Buckets] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.rejected = 0
+        self._conn = None
+        self._task: Optional[asyncio.Task] = None
+
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS usage (
+                    scope TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    requests INTEGER NOT NULL,
+                    prompt_tokens INTEGER NOT NULL,
+                    completion_tokens INTEGER NOT NULL,
+                    llm_ms REAL NOT NULL,
+                    PRIMARY KEY (scope, name, bucket)
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_usage_bucket ON usage (bucket)")
+            self._conn.commit()
+            self._totals = self._load(self._oldest_bucket(time.time()))
+
+    def _bucket(self, now: float) -> int:
+        return int(now // self.bucket_seconds)
+
+    def _oldest_bucket(self, now: float, window_seconds: Optional[float] = None) -> int:
+        """First bucket inside the window ending now."""
+        return self._bucket(now) - math.ceil((window_seconds or self.retention_seconds) / self.bucket_seconds) + 1
+
+    def record(
+        self,
+        user_id: Optional[str],
+        pipeline_type: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        llm_ms: float = 0.0
+    ):
+        """Charge one request to its user and pipeline, in memory."""
+        bucket = self._bucket(time.time())
+        counters = (1, prompt_tokens, completion_tokens, llm_ms)
+        with self._lock:
+            for key in ((USER, user_id or ANONYMOUS), (PIPELINE, pipeline_type)):
+                entry = self._pending.setdefault(key, {}).setdefault(bucket, [0, 0, 0, 0.0])
+                for i, value in enumerate(counters):
+                    entry[i] += value
+
+    def _window_buckets(self, key: Tuple[str, str], window_seconds: float, now: float) -> List[Tuple[int, Counters]]:
+        """Buckets of a user or pipeline inside the window, oldest first, with flushed and pending counts added."""
+        oldest = self._oldest_bucket(now, window_seconds)
+        merged: Buckets = {}
+        for source in (self._totals, self._flushing, self._pending):
+            for bucket, counters in source.get(key, {}).items():
+                if bucket >= oldest:
+                    entry = merged.setdefault(bucket, [0, 0, 0, 0.0])
+                    for i, value in enumerate(counters):
+                        entry[i] += value
+        return sorted(merged.items())
+
+    @staticmethod
+    def _summary(buckets: List[Tuple[int, Counters]]) -> Dict[str, Any]:
+        requests = sum(counters[0] for _, counters in buckets)
+        prompt_tokens = sum(counters[1] for _, counters in buckets)
+        completion_tokens = sum(counters[2] for _, counters in buckets)
+        return {
+            "requests": int(requests),
+            "prompt_tokens": int(prompt_tokens),
+            "completion_tokens": int(completion_tokens),
+            "total_tokens": int(prompt_tokens + completion_tokens),
+            "llm_seconds": sum(counters[3] for _, counters in buckets) / 1000
+        }
+
+    def usage(self, scope: str, name: str) -> Dict[str, Dict[str, Any]]:
+        """Usage of a user or pipeline in each window, keyed by the window length ("3600s")."""
+        now = time.time()
+        with self._lock:
+            return {
+                f"{window:g}s": self._summary(self._window_buckets((scope, name), window, now))
+                for window in self.windows
+            }
+
+    def top(self, scope: str, window_seconds: float, limit: int = 10, by: str = "total_tokens") -> List[Dict[str, Any]]:
+        """Users or pipelines with the highest usage within the window."""
+        now = time.time()
+        with self._lock:
+            names = {
+                name for source in (self._totals, self._flushing, self._pending)
+                for key_scope, name in source if key_scope == scope
+            }
+            items = [{"name": name, **self._summary(self._window_buckets((scope, name), window_seconds, now))} for name in names]
+        items = [item for item in items if item["requests"]]
+        return sorted(items, key=lambda item: item[by], reverse=True)[:limit]
+
+    def _over_budget(self, requests: float, tokens: float, llm_ms: float) -> bool:
+        return (
+            (self.max_requests > 0 and requests >= self.max_requests)
+            or (self.max_tokens > 0 and tokens >= self.max_tokens)
+            or (self.max_llm_ms > 0 and llm_ms >= self.max_llm_ms)
+        )
+
+    def budget(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Remaining budget of a user within the budget window, or None without budgets."""
+        if not (self.max_requests or self.max_tokens or self.max_llm_ms):
+            return None
+        with self._lock:
+            used = self._summary(self._window_buckets((USER, user_id), self.budget_window_seconds, time.time()))
+        return {
+            "window_seconds": self.budget_window_seconds,
+            "requests_left": max(self.max_requests - used["requests"], 0) if self.max_requests else None,
+            "tokens_left": max(self.max_tokens - used["total_tokens"], 0) if self.max_tokens else None,
+            "llm_seconds_left": max(self.max_llm_ms / 1000 - used["llm_seconds"], 0) if self.max_llm_ms else None
+        }
+
+    def check(self, user_id: Optional[str]):
+        """Raise UsageBudgetExceededError, with the seconds until enough usage leaves the window, if the user is over budget."""
+        if user_id is None or not (self.max_requests or self.max_tokens or self.max_llm_ms):
+            return
+        now = time.time()
+        with self._lock:
+            buckets = self._window_buckets((USER, user_id), self.budget_window_seconds, now)
+        requests = sum(counters[0] for _, counters in buckets)
+        tokens = sum(counters[1] + counters[2] for _, counters in buckets)
+        llm_ms = sum(counters[3] for _, counters in buckets)
+        if not self._over_budget(requests, tokens, llm_ms):
+            return
+
+        # Drop the oldest buckets until the user is back under budget; the last one dropped decides the wait
+        window_buckets = math.ceil(self.budget_window_seconds / self.bucket_seconds)
+        retry_after = self.budget_window_seconds
+        for bucket, counters in buckets:
+            requests, tokens, llm_ms = requests - counters[0], tokens - counters[1] - counters[2], llm_ms - counters[3]
+            if not self._over_budget(requests, tokens, llm_ms):
+                retry_after = (bucket + window_buckets) * self.bucket_seconds - now
+                break
+        self.rejected += 1
+        raise UsageBudgetExceededError(
+            f"Usage budget of user {user_id} exceeded for the last {self.budget_window_seconds:g} seconds",
+            retry_after=max(math.ceil(retry_after), 1)
+        )
+
+    def _load(self, oldest: int) -> Dict[Tuple[str, str], Buckets]:
+        """Totals of all workers in the file from bucket `oldest` on."""
+        rows = self._conn.execute(
+            "SELECT scope, name, bucket, requests, prompt_tokens, completion_tokens, llm_ms FROM usage WHERE bucket >= ?",
+            (oldest,)
+        ).fetchall()
+        totals: Dict[Tuple[str, str], Buckets] = {}
+        for scope, name, bucket, *counters in rows:
+            totals.setdefault((scope, name), {})[bucket] = list(counters)
+        return totals
+
+    def _write(self, pending: Dict[Tuple[str, str], Buckets], oldest: int) -> Dict[Tuple[str, str], Buckets]:
+        """Add pending counts to the file, drop expired buckets and return the totals of all workers."""
+        self._conn.executemany(
+            """
+            INSERT INTO usage (scope, name, bucket, requests, prompt_tokens, completion_tokens, llm_ms)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (scope, name, bucket) DO UPDATE SET
+                requests = requests + excluded.requests,
+                prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                completion_tokens = completion_tokens + excluded.completion_tokens,
+                llm_ms = llm_ms + excluded.llm_ms
+            """,
+            [(scope, name, bucket, *counters)
+             for (scope, name), buckets in pending.items() for bucket, counters in buckets.items()]
+        )
+        self._conn.execute("DELETE FROM usage WHERE bucket < ?", (oldest,))
+        self._conn.commit()
+        return self._load(oldest)
+
+    def flush(self):
+        """
+        Add the pending counts to the totals (and the file) and drop buckets older than every window.
+        Blocking with a file; the background task runs it on a worker thread. Requests keep being recorded
+        and checked meanwhile: the counts being written still count towards usage until the totals are reloaded.
+        """
+        with self._flush_lock:
+            oldest = self._oldest_bucket(time.time())
+            with self._lock:
+                self._flushing, self._pending = self._pending, {}
+            totals = None
+            if self._conn is not None:
+                try:
+                    totals = self._write(self._flushing, oldest)
+                except sqlite3.Error as e:
+                    self._conn.rollback()
+                    logger.error(f"Failed to write usage to {self.db_path}: {str(e)}")
+            with self._lock:
+                if totals is None:
+                    # Memory only (or the write failed): merge into the totals kept here
+                    totals = self._totals
+                    for key, buckets in self._flushing.items():
+                        for bucket, counters in buckets.items():
+                            entry = totals.setdefault(key, {}).setdefault(bucket, [0, 0, 0, 0.0])
+                            for i, value in enumerate(counters):
+                                entry[i] += value
+                    for key in list(totals):
+                        buckets = {bucket: counters for bucket, counters in totals[key].items() if bucket >= oldest}
+                        if buckets:
+                            totals[key] = buckets
+                        else:
+                            del totals[key]
+                self._totals, self._flushing = totals, {}
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.warning(f"Usage flush failed: {e}")
+
+    def start(self):
+        """Flush every `flush_seconds` in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background flushes and write what is pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            keys = set(self._totals) | set(self._flushing) | set(self._pending)
+        return {
+            "users": sum(1 for scope, _ in keys if scope == USER),
+            "pipelines": sum(1 for scope, _ in keys if scope == PIPELINE),
+            "rejected": self.rejected
+        }
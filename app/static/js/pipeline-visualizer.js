@@ -86,6 +86,10 @@ document.addEventListener('DOMContentLoaded', function() {
     // Add a variable to store the current query information
     let currentQueryInfo = null;
 
+    // Trailing window used for the latency history table
+    const historyWindowSeconds = 3600;
+    const historyMeta = document.getElementById('historyMeta');
+
     function connectToEventStream() {
         if (eventSource) {
             eventSource.close();
@@ -110,6 +114,9 @@ document.addEventListener('DOMContentLoaded', function() {
             
             // Restore UI state when reconnecting
             restoreUIState();
+
+            // Load completed runs that happened before we connected
+            loadPipelineHistory();
         });
         
         eventSource.addEventListener('error', (e) => {
@@ -208,7 +215,8 @@ document.addEventListener('DOMContentLoaded', function() {
         
         eventSource.addEventListener('llm_complete', (e) => {
             const data = JSON.parse(e.data);
-            updateStep('generation', 'completed', `Generated response with ${data.token_count} tokens`);
+            const source = data.cached ? ' (from cache)' : '';
+            updateStep('generation', 'completed', `Generated response with ${data.token_count} tokens${source}`);
             updateMetric('llm', 'completed', data.time_ms);
         });
         
@@ -255,6 +263,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 
                 // Reset pipeline active flag
                 pipelineActive = false;
+                
+                // Refresh the latency percentiles with this run included
+                loadLatencyAggregate();
             } catch (error) {
                 console.error('Error processing complete event:', error);
             }
@@ -1001,6 +1012,73 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    // Load the most recent completed run so the page is not empty after a reconnect
+    async function loadPipelineHistory() {
+        try {
+            const response = await fetch('/api/v1/pipeline/history?limit=1');
+            if (!response.ok) {
+                throw new Error(`History request failed with status ${response.status}`);
+            }
+            const data = await response.json();
+            
+            if (!pipelineActive && !currentQueryInfo && data.traces.length > 0) {
+                const trace = data.traces[0];
+                currentQueryInfo = {
+                    query: trace.query,
+                    pipelineType: trace.pipeline_type,
+                    timestamp: new Date(trace.timestamp * 1000)
+                };
+                displayActiveQuery(trace.query, trace.pipeline_type);
+                
+                updateMetric('embedding', 'completed', trace.embedding_time_ms);
+                updateMetric('search', 'completed', trace.search_time_ms);
+                updateMetric('context', 'completed', trace.context_time_ms);
+                updateMetric('llm', 'completed', trace.llm_time_ms);
+                totalTimeDisplay.textContent = `${(trace.total_time_ms / 1000).toFixed(2)}s`;
+                
+                updateGanttChart({
+                    total_time_ms: trace.total_time_ms,
+                    embedding_time_ms: trace.embedding_time_ms || 0,
+                    search_time_ms: trace.search_time_ms || 0,
+                    context_time_ms: trace.context_time_ms || 0,
+                    llm_time_ms: trace.llm_time_ms || 0
+                });
+            }
+        } catch (error) {
+            console.error('Error loading pipeline history:', error);
+        }
+        
+        loadLatencyAggregate();
+    }
+
+    // Load per-stage latency percentiles for the trailing window
+    async function loadLatencyAggregate() {
+        try {
+            const response = await fetch(`/api/v1/pipeline/aggregate?window_seconds=${historyWindowSeconds}`);
+            if (!response.ok) {
+                throw new Error(`Aggregate request failed with status ${response.status}`);
+            }
+            const data = await response.json();
+            
+            ['embedding', 'search', 'context', 'llm', 'total'].forEach(stage => {
+                const stats = data.stages[stage] || {};
+                const prefix = `history${capitalizeFirstLetter(stage)}`;
+                ['p50', 'p95', 'p99'].forEach(pct => {
+                    const cell = document.getElementById(`${prefix}${pct.toUpperCase()}`);
+                    if (cell) {
+                        cell.textContent = stats[pct] !== undefined ? Math.round(stats[pct]) : '-';
+                    }
+                });
+            });
+            
+            historyMeta.textContent = data.count > 0
+                ? `Based on ${data.count} queries in the last hour`
+                : 'No completed queries in the last hour';
+        } catch (error) {
+            console.error('Error loading latency aggregate:', error);
+        }
+    }
+
     // Add this function to help debug event issues
     function logEventDetails(eventName, data) {
         console.log(`Event ${eventName} received:`, data);
@@ -0,0 +1,58 @@
+import pytest
+from types import SimpleNamespace
+from app.benchmarks.stubs import FakeLLMProvider, HashingEmbedder, InMemoryVectorStore
+from app.services.adaptive_retrieval import RetrievalPolicy
+from app.services.llm_generator import LLMGenerator
+from app.services.pipeline_service import RAGPipelineService
+
+def test_fixed_rule_keeps_top_k():
+    policy = RetrievalPolicy(top_k=3)
+    assert policy.fetch_limit == 3
+    assert policy.select_k([0.9, 0.8, 0.7, 0.6]) == 3
+    assert policy.select_k([0.9]) == 1
+
+def test_gap_rule_cuts_at_the_largest_drop():
+    policy = RetrievalPolicy(rule="gap", cut_value=0.1, fetch_k=20, min_k=1, max_k=10)
+    assert policy.fetch_limit == 20
+    assert policy.select_k([0.9, 0.5, 0.48, 0.47]) == 1
+    assert policy.select_k([0.8, 0.79, 0.78, 0.6, 0.59]) == 3
+
+def test_gap_rule_keeps_max_k_when_scores_are_tied():
+    policy = RetrievalPolicy(rule="gap", cut_value=0.1, min_k=2, max_k=5)
+    assert policy.select_k([0.61, 0.6, 0.6, 0.59, 0.59, 0.58, 0.58]) == 5
+
+def test_relative_rule_respects_bounds():
+    policy = RetrievalPolicy(rule="relative", cut_value=0.9, min_k=2, max_k=4)
+    assert policy.select_k([0.8, 0.75, 0.5, 0.4]) == 2
+    assert policy.select_k([0.8, 0.79, 0.78, 0.77, 0.76, 0.75]) == 4
+    assert policy.select_k([0.8]) == 1
+    assert policy.select_k([]) == 0
+
+def test_apply_reports_the_decision():
+    policy = RetrievalPolicy(rule="gap", cut_value=0.2, min_k=1, max_k=5)
+    hits = [SimpleNamespace(score=score) for score in (0.9, 0.4, 0.35)]
+    kept, selection = policy.apply(hits)
+    assert kept == hits[:1]
+    assert selection == {"rule": "gap", "fetched": 3, "k": 1, "scores": [0.9, 0.4, 0.35], "cut_score": 0.9}
+
+def test_unknown_rule_is_rejected():
+    with pytest.raises(ValueError):
+        RetrievalPolicy(rule="largest")
+
+@pytest.mark.asyncio
+async def test_pipeline_retrieves_with_its_policy():
+    embedder = HashingEmbedder()
+    store = InMemoryVectorStore("laws")
+    documents = [{"content": f"section {i} of the penal code"} for i in range(30)]
+    store.add(await embedder.get_document_embeddings(documents), documents)
+    service = RAGPipelineService(
+        qdrant_service=store,
+        embedder_service=embedder,
+        type="law",
+        generator=LLMGenerator([FakeLLMProvider(latency_ms=0)]),
+        retrieval_policy=RetrievalPolicy(rule="relative", cut_value=0.99, fetch_k=20, min_k=2, max_k=8)
+    )
+    hits, selection = await service.retrieve(await embedder.get_query_embedding("section 4 of the penal code"))
+    assert selection["fetched"] == 20
+    assert 2 <= selection["k"] <= 8
+    assert len(hits) == selection["k"]
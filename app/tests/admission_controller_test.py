@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from app.core.exceptions import AdmissionRejectedError
+from app.services.admission_controller import AdmissionController
+
+async def hold(controller, user_id, seconds, active, peak):
+    async with controller.admit(user_id):
+        active[user_id] = active.get(user_id, 0) + 1
+        peak["global"] = max(peak["global"], sum(active.values()))
+        peak[user_id] = max(peak.get(user_id, 0), active[user_id])
+        await asyncio.sleep(seconds)
+        active[user_id] -= 1
+
+@pytest.mark.asyncio
+async def test_global_and_per_user_limits_are_enforced():
+    controller = AdmissionController(max_concurrent=3, max_per_user=1, max_queue=20, max_wait_seconds=5)
+    active, peak = {}, {"global": 0}
+    users = ["alice", "alice", "alice", "bob", "carol", "dave"]
+    await asyncio.gather(*(hold(controller, user, 0.02, active, peak) for user in users))
+    assert peak["global"] <= 3
+    assert peak["alice"] == 1
+    assert controller.stats()["admitted"] == len(users)
+    assert controller.stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_blocked_user_does_not_hold_up_others():
+    controller = AdmissionController(max_concurrent=2, max_per_user=1, max_queue=10, max_wait_seconds=5)
+    release = asyncio.Event()
+
+    async def blocker():
+        async with controller.admit("alice"):
+            await release.wait()
+
+    first = asyncio.ensure_future(blocker())
+    await asyncio.sleep(0)
+    queued = asyncio.ensure_future(blocker())
+    await asyncio.sleep(0)
+    async with controller.admit("bob") as wait_ms:
+        assert wait_ms == 0.0
+    release.set()
+    await asyncio.gather(first, queued)
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected_with_retry_after():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, max_wait_seconds=5)
+    release = asyncio.Event()
+
+    async def blocker():
+        async with controller.admit():
+            await release.wait()
+
+    tasks = [asyncio.ensure_future(blocker()) for _ in range(2)]
+    await asyncio.sleep(0)
+    with pytest.raises(AdmissionRejectedError) as error:
+        async with controller.admit():
+            pass
+    assert error.value.retry_after >= 1
+    assert controller.stats()["rejected"]["queue_full"] == 1
+    release.set()
+    await asyncio.gather(*tasks)
+
+@pytest.mark.asyncio
+async def test_request_is_rejected_at_the_deadline():
+    controller = AdmissionController(max_concurrent=1, max_queue=10, max_wait_seconds=0.05)
+    release = asyncio.Event()
+
+    async def blocker():
+        async with controller.admit():
+            await release.wait()
+
+    task = asyncio.ensure_future(blocker())
+    await asyncio.sleep(0)
+    with pytest.raises(AdmissionRejectedError):
+        async with controller.admit():
+            pass
+    assert controller.stats()["rejected"]["deadline"] == 1
+    assert controller.stats()["queue_depth"] == 0
+    release.set()
+    await task
@@ -0,0 +1,124 @@
+import asyncio
+import sqlite3
+
+import pytest
+from qdrant_client import QdrantClient
+from app.benchmarks.stubs import FakeLLMProvider, HashingEmbedder
+from app.core.config import settings
+from app.services.adaptive_retrieval import RetrievalPolicy
+from app.services.cache_warmer import CacheWarmer
+from app.services.collection_versions import CollectionManager
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_generator import LLMGenerator
+from app.services.pipeline_service import RAGPipelineService
+from app.services.qdrant_service import QdrantService
+from app.services.query_log import QueryFrequencyLog
+from app.services.search_cache import SearchResultCache
+
+QUERIES = ["bail for cheating under section 420", "anticipatory bail", "divorce on grounds of cruelty"]
+
+async def build_pipeline(latency_ms: float = 0):
+    client = QdrantClient(":memory:")
+    CollectionManager(client).ensure(settings.COLLECTION_NAME2)
+    embedder = HashingEmbedder()
+    contents = [f"Question: {query} {i}? Answer: see section {i}" for i, query in enumerate(QUERIES * 4)]
+    client.upload_collection(
+        settings.COLLECTION_NAME2,
+        vectors=await embedder.get_document_embeddings([{"content": content} for content in contents]),
+        payload=[{"content": content, "metadata": {}} for content in contents],
+        ids=list(range(len(contents))),
+        wait=True
+    )
+    search_cache = SearchResultCache()
+    pipeline = RAGPipelineService(
+        qdrant_service=QdrantService(client, "laws", search_cache=search_cache),
+        embedder_service=embedder,
+        type="law",
+        generator=LLMGenerator([FakeLLMProvider(latency_ms=latency_ms)]),
+        llm_cache=LLMResponseCache(),
+        retrieval_policy=RetrievalPolicy(top_k=3)
+    )
+    return pipeline, search_cache
+
+def fill_log(path: str) -> QueryFrequencyLog:
+    query_log = QueryFrequencyLog(path, flush_seconds=3600)
+    for query, count in zip(QUERIES, (5, 3, 1)):
+        for _ in range(count):
+            query_log.record("laws", query)
+    query_log.flush()
+    return query_log
+
+def test_log_counts_hashed_queries_and_keeps_only_frequent_texts(tmp_path):
+    path = str(tmp_path / "queries.db")
+    query_log = QueryFrequencyLog(path, max_queries=3, flush_seconds=3600, min_count=2)
+    for query in ["Anticipatory  bail", "anticipatory bail", "maintenance", "maintenance", "Ravi Kumar divorce"]:
+        query_log.record("laws", query)
+    query_log.record("laws", "my number is 98765 43210, can I get bail")
+    query_log.record("laws", "write to me at someone@example.com")
+    assert query_log.top() == []
+    query_log.flush()
+    # Ties go to the most recently seen query
+    assert [(item["query"], item["count"]) for item in query_log.top()] == [("maintenance", 2), ("anticipatory bail", 2)]
+    assert query_log.stats()["skipped"] == 2
+    assert query_log.stats()["stored_queries"] == 3 and query_log.stats()["stored_texts"] == 2
+    # A query asked once is kept as a hash only
+    with sqlite3.connect(path) as conn:
+        assert not any("Ravi" in (query or "") for query, in conn.execute("SELECT query FROM query_counts"))
+
+    # Another worker process adds to the same file
+    other = QueryFrequencyLog(path, min_count=2)
+    other.record("laws", "maintenance")
+    other.record("laws", "ravi kumar divorce")
+    other.flush()
+    assert [(item["query"], item["count"]) for item in query_log.top(min_count=2)] == [
+        ("maintenance", 3), ("ravi kumar divorce", 2), ("anticipatory bail", 2)
+    ]
+
+@pytest.mark.asyncio
+async def test_warm_up_fills_search_cache_for_frequent_queries(tmp_path):
+    pipeline, search_cache = await build_pipeline()
+    warmer = CacheWarmer(fill_log(str(tmp_path / "queries.db")), {"laws": pipeline}, min_count=2, pause_seconds=0)
+    report = await warmer.run()
+    assert report["queries"] == report["warmed"] == 2
+    assert report["outcomes"] == {"search": 2}
+    assert pipeline.llm.providers[0].calls == 0
+
+    hits_before = search_cache.hits
+    await pipeline.retrieve(await pipeline.embedder_service.get_query_embedding(QUERIES[0]), None, QUERIES[0])
+    assert search_cache.hits == hits_before + 1
+
+@pytest.mark.asyncio
+async def test_warm_up_with_generation_fills_llm_cache(tmp_path):
+    pipeline, _ = await build_pipeline()
+    warmer = CacheWarmer(fill_log(str(tmp_path / "queries.db")), {"laws": pipeline}, min_count=1, generate=True, pause_seconds=0)
+    report = await warmer.run()
+    # The query asked once has no stored text to replay
+    assert report["outcomes"] == {"generated": 2}
+
+    query_embedding = await pipeline.embedder_service.get_query_embedding(QUERIES[1])
+    hits, _ = await pipeline.retrieve(query_embedding, None, QUERIES[1])
+    _, cached = await pipeline.generate_answer(QUERIES[1], [{"content": hit.payload["content"]} for hit in hits])
+    assert cached
+
+@pytest.mark.asyncio
+async def test_warm_up_stops_at_time_budget(tmp_path):
+    pipeline, _ = await build_pipeline(latency_ms=2000)
+    warmer = CacheWarmer(
+        fill_log(str(tmp_path / "queries.db")), {"laws": pipeline}, min_count=1, concurrency=1,
+        budget_seconds=0.2, generate=True, pause_seconds=0
+    )
+    report = await warmer.run()
+    assert report["timed_out"]
+    assert report["warmed"] == 0 and report["unfinished"] == 2
+
+@pytest.mark.asyncio
+async def test_only_one_worker_warms_up(tmp_path):
+    path = str(tmp_path / "queries.db")
+    fill_log(path)
+    pipeline, _ = await build_pipeline()
+    reports = await asyncio.gather(*(
+        CacheWarmer(QueryFrequencyLog(path), {"laws": pipeline}, min_count=1, generate=True, pause_seconds=0).run()
+        for _ in range(3)
+    ))
+    assert sorted(report["skipped"] for report in reports) == [False, True, True]
+    assert pipeline.llm.providers[0].calls == 2
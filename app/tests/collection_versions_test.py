@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from app.core.config import settings
+from app.core.exceptions import EmbeddingModelMismatchError
+from app.dependencies import qdrant
+from app.services.collection_versions import AliasWatcher, CollectionManager
+
+ALIAS = "documents"
+
+def add_points(client: QdrantClient, collection_name: str, count: int):
+    vectors = np.random.default_rng(0).standard_normal((count, settings.VECTOR_SIZE)).astype(np.float32)
+    client.upload_collection(collection_name, vectors=vectors, ids=list(range(count)), wait=True)
+
+def test_ensure_creates_first_version_behind_alias():
+    manager = CollectionManager(QdrantClient(":memory:"))
+    assert manager.ensure(ALIAS) is True
+    assert manager.resolve(ALIAS) == f"{ALIAS}__v1"
+    assert manager.ensure(ALIAS) is False
+    record = manager.record(f"{ALIAS}__v1")
+    assert record["status"] == "active"
+    assert record["embedding_model"] == settings.EMBEDDING_MODEL
+    manager.check(ALIAS)
+
+def test_swap_moves_alias_and_drops_retired_versions():
+    client = QdrantClient(":memory:")
+    manager = CollectionManager(client)
+    manager.ensure(ALIAS)
+    second = manager.create_version(ALIAS)
+    add_points(client, second, 5)
+    assert manager.resolve(ALIAS) == f"{ALIAS}__v1"
+    assert manager.swap(ALIAS, second) == f"{ALIAS}__v1"
+    assert client.count(ALIAS).count == 5
+    assert manager.record(f"{ALIAS}__v1")["status"] == "retired"
+    assert manager.record(second)["points"] == 5
+
+    manager.swap(ALIAS, manager.create_version(ALIAS))
+    assert manager.drop_retired(ALIAS, keep=1) == [f"{ALIAS}__v1"]
+    assert manager.versions(ALIAS) == [second, f"{ALIAS}__v3"]
+
+def test_legacy_collection_is_replaced_by_alias():
+    client = QdrantClient(":memory:")
+    client.create_collection(ALIAS, vectors_config=models.VectorParams(size=settings.VECTOR_SIZE, distance=models.Distance.COSINE))
+    manager = CollectionManager(client)
+    assert manager.resolve(ALIAS) == ALIAS
+    manager.check(ALIAS)
+    version = manager.create_version(ALIAS)
+    assert manager.swap(ALIAS, version) is None
+    assert manager.resolve(ALIAS) == version
+
+def test_model_or_dimension_mismatch_is_detected(monkeypatch):
+    client = QdrantClient(":memory:")
+    manager = CollectionManager(client)
+    manager.ensure(ALIAS)
+    monkeypatch.setattr(settings, "EMBEDDING_MODEL", "another-model")
+    with pytest.raises(EmbeddingModelMismatchError):
+        manager.check(ALIAS)
+    monkeypatch.undo()
+
+    client.create_collection("legacy", vectors_config=models.VectorParams(size=768, distance=models.Distance.COSINE))
+    with pytest.raises(EmbeddingModelMismatchError):
+        manager.check("legacy")
+
+@pytest.mark.asyncio
+async def test_watcher_runs_hooks_once_per_swap():
+    manager = CollectionManager(QdrantClient(":memory:"))
+    manager.ensure(ALIAS)
+    watcher = AliasWatcher(manager, [ALIAS])
+    swaps = []
+
+    async def hook(alias, previous, collection_name):
+        swaps.append((alias, previous, collection_name))
+
+    watcher.on_swap(hook)
+    assert await watcher.poll() == []
+    manager.swap(ALIAS, manager.create_version(ALIAS))
+    assert await watcher.poll() == [ALIAS]
+    assert await watcher.poll() == []
+    assert swaps == [(ALIAS, f"{ALIAS}__v1", f"{ALIAS}__v2")]
+
+def test_workers_starting_together_create_and_ingest_once(tmp_path, monkeypatch):
+    client = QdrantClient(":memory:")
+    ingestions, errors = [], []
+
+    async def slow_ingestion(ingested_client):
+        ingestions.append(ingested_client)
+        time.sleep(0.2)
+
+    create_collection = client.create_collection
+    client.create_collection = lambda **kwargs: time.sleep(0.05) or create_collection(**kwargs)
+    monkeypatch.setattr(settings, "COLLECTION_LOCK_FILE", str(tmp_path / "collections.lock"))
+    monkeypatch.setattr(qdrant, "create_qdrant_client", lambda: client)
+    monkeypatch.setattr(qdrant, "initialize_collection_with_data", slow_ingestion)
+    def start_worker():
+        try:
+            asyncio.run(qdrant.get_qdrant_client())
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=start_worker) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    manager = CollectionManager(client)
+    assert errors == [] and len(ingestions) == 1
+    for alias in (settings.COLLECTION_NAME, settings.COLLECTION_NAME2):
+        assert manager.versions(alias) == [f"{alias}__v1"]
@@ -0,0 +1,47 @@
+import pytest
+from app.benchmarks.stubs import HashingEmbedder
+from app.services.context_compressor import ContextCompressor, split_sentences
+
+def test_split_sentences_keeps_legal_abbreviations_together():
+    text = "The appeal under Sec. 378 was dismissed. Costs were awarded to the respondent. Ok. The bail was refused."
+    assert split_sentences(text) == [
+        "The appeal under Sec. 378 was dismissed.",
+        "Costs were awarded to the respondent. Ok.",
+        "The bail was refused."
+    ]
+
+@pytest.mark.asyncio
+async def test_compression_keeps_relevant_sentences_in_original_order():
+    embedder = HashingEmbedder()
+    compressor = ContextCompressor(embedder, max_chars=140)
+    documents = [
+        {"content": "The registry listed the matter for hearing on Monday. Anticipatory bail was granted to the accused person. Counsel for both parties appeared before the bench."},
+        {"content": "The accused person applied for anticipatory bail before the sessions court. The next date of hearing was fixed by the registry."}
+    ]
+    query = await embedder.get_query_embedding("anticipatory bail for the accused person")
+    compressed, report = await compressor.compress(query, documents)
+
+    assert [document["content"] for document in compressed] == [
+        "Anticipatory bail was granted to the accused person.",
+        "The accused person applied for anticipatory bail before the sessions court."
+    ]
+    assert report["sentences_total"] == 5
+    assert report["sentences_kept"] == 2
+    assert report["compression_ratio"] == pytest.approx(report["original_chars"] / report["compressed_chars"])
+
+@pytest.mark.asyncio
+async def test_sentence_embeddings_are_cached_per_document():
+    class CountingEmbedder(HashingEmbedder):
+        encoded = 0
+
+        def encode_batch(self, texts, batch_size=64):
+            self.encoded += len(texts)
+            return super().encode_batch(texts, batch_size)
+
+    embedder = CountingEmbedder()
+    compressor = ContextCompressor(embedder, max_chars=1000)
+    documents = [{"content": "First sentence of the judgement text. Second sentence of the judgement text."}]
+    query = await embedder.get_query_embedding("judgement")
+    await compressor.compress(query, documents)
+    await compressor.compress(query, documents)
+    assert embedder.encoded == 2
@@ -0,0 +1,64 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from app.benchmarks.stubs import FakeLLMProvider, HashingEmbedder, InMemoryVectorStore
+from app.evaluators import evaluation
+from app.evaluators.dataset_runner import run_dataset_evaluation
+from app.evaluators.structured_judge import JUDGE_METRICS
+
+class StubJudgeModel:
+    """Answers generation prompts through a FakeLLMProvider and scoring prompts with fixed JSON scores."""
+
+    def __init__(self):
+        self.provider = FakeLLMProvider(latency_ms=50)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        if generation_config and "response_schema" in generation_config:
+            return SimpleNamespace(text=json.dumps({metric: 8 for metric in JUDGE_METRICS}), usage_metadata=None)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return SimpleNamespace(text=await self.provider.generate(prompt), usage_metadata=None)
+        finally:
+            self.in_flight -= 1
+
+@pytest.mark.asyncio
+async def test_query_set_is_evaluated_into_parquet(tmp_path, monkeypatch):
+    query_set = tmp_path / "queries.jsonl"
+    query_set.write_text("\n".join(json.dumps(record) for record in [
+        {"id": "q1", "query": "bail for cheating under section 420", "dataset_type": "indian_laws"},
+        {"id": "q2", "query": "punishment for murder under section 302", "dataset_type": "indian_laws"},
+    ]))
+    embedder = HashingEmbedder()
+    store = InMemoryVectorStore("laws")
+    documents = [{"content": "Section 420 covers cheating."}, {"content": "Section 302 covers murder."}]
+    store.add(await embedder.get_document_embeddings(documents), documents)
+    model = StubJudgeModel()
+    monkeypatch.setattr(evaluation.judge_client, "_model", model)
+    previous_cache = evaluation.judge_client.cache
+
+    summary = await run_dataset_evaluation(
+        str(query_set),
+        output_dir=str(tmp_path / "results"),
+        concurrency=1,
+        top_k=2,
+        judge_mode="single_call",
+        cache_path=str(tmp_path / "judge_cache.sqlite"),
+        embedder=embedder,
+        qdrant_services={"laws": store, "judgement": InMemoryVectorStore("judgement")}
+    )
+
+    rows = pd.read_parquet(summary["per_query_path"])
+    assert sorted(rows["id"]) == ["q1", "q2"]
+    assert rows["error"].isna().all()
+    assert (rows["faithfulness"] == 8.0).all() and (rows["judge_failures"] == 0).all()
+    assert (rows["results_count"] == 2).all()
+    aggregate = pd.read_parquet(summary["aggregate_path"])
+    assert aggregate.loc[0, "queries"] == 2 and aggregate.loc[0, "errors"] == 0
+    assert model.max_in_flight == 1
+    assert evaluation.judge_client.cache is previous_cache
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pytest
+from app.benchmarks.stubs import FakeLLMProvider, HashingEmbedder, InMemoryVectorStore
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_generator import LLMGenerator
+from app.services.pipeline_service import RAGPipelineService
+
+QUERY = "Can bail be granted for cheating under section 420?"
+DOCUMENTS = [
+    {"content": "Bail under section 420 is granted at the discretion of the court. The weather was pleasant that day."},
+    {"content": "Cheating is punishable under section 420 of the Indian Penal Code. The court adjourned for lunch."}
+]
+
+def build_pipeline(provider: FakeLLMProvider, breaker=None, deadline: float = 0.1) -> RAGPipelineService:
+    embedder = HashingEmbedder()
+    return RAGPipelineService(
+        qdrant_service=InMemoryVectorStore("laws"),
+        embedder_service=embedder,
+        type="law",
+        generator=LLMGenerator([provider], timeout_seconds=5),
+        llm_cache=LLMResponseCache(),
+        circuit_breaker=breaker,
+        llm_deadline_seconds=deadline,
+        complete_late=True,
+        degraded_summary_chars=120
+    )
+
+def test_breaker_opens_on_failures_and_closes_after_probe():
+    breaker = CircuitBreaker(window=4, min_calls=4, failure_rate=0.5, slow_call_ms=100, open_seconds=0.05)
+    for success, latency_ms in [(True, 10), (True, 10), (False, None)]:
+        breaker.record(breaker.allow(), success, latency_ms)
+    permit = breaker.allow()
+    assert permit is not None
+    breaker.record(permit, True, 500)  # slow counts as failed: 2 of 4
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow() is None
+
+    time.sleep(0.06)
+    probe = breaker.allow()
+    assert probe is not None and probe.probe
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() is None  # one probe at a time
+    breaker.record(probe, True, 10)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["trips"] == 1
+
+def test_calls_admitted_before_a_trip_do_not_close_the_breaker():
+    breaker = CircuitBreaker(window=4, min_calls=2, failure_rate=0.5, open_seconds=0.05)
+    permits = [breaker.allow() for _ in range(3)]
+    breaker.record(permits[0], False)
+    breaker.record(permits[1], False)
+    assert breaker.state == CircuitBreaker.OPEN
+    breaker.record(permits[2], True, 10)  # finished late, after the trip
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    stale_probe = breaker.allow()
+    time.sleep(0.06)
+    probe = breaker.allow()  # the first probe never reported back and is replaced
+    breaker.record(stale_probe, True, 10)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record(probe, False)
+    assert breaker.state == CircuitBreaker.OPEN
+
+@pytest.mark.asyncio
+async def test_deadline_returns_summary_and_late_answer_fills_cache():
+    provider = FakeLLMProvider(latency_ms=300)
+    pipeline = build_pipeline(provider, deadline=0.05)
+    answer, cached, degraded = await pipeline.generate_answer_within_deadline(QUERY, DOCUMENTS)
+    assert answer is None and not cached and degraded == "deadline"
+
+    query_embedding = await pipeline.embedder_service.get_query_embedding(QUERY)
+    summary = await pipeline.extractive_summary(query_embedding, DOCUMENTS)
+    assert 0 < len(summary) <= 120 + len(DOCUMENTS)
+
+    await asyncio.sleep(0.4)
+    answer, cached, degraded = await pipeline.generate_answer_within_deadline(QUERY, DOCUMENTS)
+    assert answer and cached and degraded is None
+    assert provider.calls == 1
+
+@pytest.mark.asyncio
+async def test_open_breaker_skips_the_llm():
+    provider = FakeLLMProvider(latency_ms=0, failure_rate=1.0)
+    breaker = CircuitBreaker(window=4, min_calls=2, failure_rate=0.5, open_seconds=60)
+    pipeline = build_pipeline(provider, breaker)
+    reasons = []
+    for i in range(4):
+        _, _, degraded = await pipeline.generate_answer_within_deadline(f"{QUERY} {i}", DOCUMENTS)
+        reasons.append(degraded)
+    assert reasons == ["llm_error", "llm_error", "circuit_open", "circuit_open"]
+    assert provider.calls == 2
+    assert breaker.stats()["rejected"] == 2
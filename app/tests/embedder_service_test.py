@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 from app.services.embedder_service import EmbedderService
 from app.core.config import settings
@@ -7,4 +8,13 @@ async def test_embeddings():
     embedder = EmbedderService()
     query = "test query"
     embedding = await embedder.get_query_embedding(query)
-    assert len(embedding) == settings.VECTOR_SIZE
\ No newline at end of file
+    assert len(embedding) == settings.VECTOR_SIZE
+    assert embedding.dtype == np.float32
+
+@pytest.mark.asyncio
+async def test_document_embeddings_are_a_float32_matrix():
+    embedder = EmbedderService()
+    embeddings = await embedder.get_document_embeddings([{"content": "first"}, {"content": "second"}])
+    assert embeddings.shape == (2, settings.VECTOR_SIZE)
+    assert embeddings.dtype == np.float32
+    assert embeddings.flags["C_CONTIGUOUS"]
\ No newline at end of file
@@ -0,0 +1,82 @@
+import pytest
+from app.benchmarks.stubs import FakeLLMProvider, HashingEmbedder, InMemoryVectorStore
+from app.evaluators.faq_calibration import recommend_threshold, threshold_sweep
+from app.services.adaptive_retrieval import RetrievalPolicy
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.faq_index import FAQIndex
+from app.services.llm_generator import LLMGenerator
+from app.services.pipeline_service import RAGPipelineService
+
+QUESTIONS = [
+    ("What is the punishment for cheating under section 420?", "Imprisonment of up to seven years and a fine."),
+    ("How do I file an RTI application?", "Submit a written request with the fee to the public information officer."),
+]
+
+async def build_service(rewrite: bool = False, threshold: float = 0.95, failure_rate: float = 0.0, breaker=None):
+    embedder = HashingEmbedder()
+    faq_store = InMemoryVectorStore("faq")
+    faq_store.add(
+        await embedder.get_document_embeddings([{"content": question} for question, _ in QUESTIONS]),
+        [{"question": question, "answer": answer} for question, answer in QUESTIONS]
+    )
+    laws_store = InMemoryVectorStore("laws")
+    laws_store.add(
+        await embedder.get_document_embeddings([{"content": "Section 420 deals with cheating."}]),
+        [{"content": "Section 420 deals with cheating."}]
+    )
+    provider = FakeLLMProvider(latency_ms=0, failure_rate=failure_rate)
+    service = RAGPipelineService(
+        qdrant_service=laws_store,
+        embedder_service=embedder,
+        type="law",
+        generator=LLMGenerator([provider]),
+        retrieval_policy=RetrievalPolicy(top_k=10),
+        faq_index=FAQIndex(faq_store, threshold=threshold),
+        faq_rewrite=rewrite,
+        circuit_breaker=breaker
+    )
+    return service, provider
+
+@pytest.mark.asyncio
+async def test_confident_match_returns_stored_answer_without_llm():
+    service, provider = await build_service()
+    result = await service.process_query("what is the punishment for cheating under section 420")
+    assert result["source"] == "faq"
+    assert result["answer"] == QUESTIONS[0][1]
+    assert result["documents"][0]["metadata"]["question"] == QUESTIONS[0][0]
+    assert provider.calls == 0
+
+@pytest.mark.asyncio
+async def test_unmatched_query_goes_through_rag():
+    service, provider = await build_service()
+    result = await service.process_query("Is a verbal agreement for the sale of land valid?")
+    assert result["source"] == "rag"
+    assert provider.calls == 1
+    assert service.faq_index.stats()["hits"] == 0
+
+@pytest.mark.asyncio
+async def test_rewrite_sends_stored_answer_to_llm():
+    service, provider = await build_service(rewrite=True)
+    result = await service.process_query("How do I file an RTI application?")
+    assert result["source"] == "faq_rewrite"
+    assert provider.calls == 1
+
+@pytest.mark.asyncio
+async def test_rewrite_falls_back_to_stored_answer_without_llm():
+    breaker = CircuitBreaker(window=2, min_calls=1, failure_rate=1.0, open_seconds=60)
+    service, provider = await build_service(rewrite=True, failure_rate=1.0, breaker=breaker)
+    for _ in range(2):
+        result = await service.process_query("How do I file an RTI application?")
+        assert result["source"] == "faq"
+        assert result["answer"] == QUESTIONS[1][1]
+    # The first rewrite failed and opened the breaker; the second was not attempted
+    assert provider.calls == 1
+
+def test_recommended_threshold_reaches_target_precision():
+    scores = [0.99, 0.97, 0.95, 0.93, 0.91, 0.89, 0.87, 0.85]
+    correct = [True, True, True, True, False, True, False, False]
+    sweep = threshold_sweep(scores, correct, thresholds=[0.85, 0.9, 0.92, 0.95])
+    assert [row["answered"] for row in sweep] == [8, 5, 4, 3]
+    assert sweep[1]["precision"] == pytest.approx(0.8)
+    assert recommend_threshold(sweep, target_precision=1.0, min_answered=3) == 0.92
+    assert recommend_threshold(sweep, target_precision=1.0, min_answered=10) is None
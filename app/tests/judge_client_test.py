@@ -0,0 +1,58 @@
+import asyncio
+import time
+import pytest
+from google.api_core import exceptions as google_exceptions
+from app.evaluators.judge_client import TokenBucket, JudgeClient, track_usage
+from app.services.llm_cache import LLMResponseCache
+
+class FakeResponse:
+    text = "8"
+    usage_metadata = None
+
+class FlakyModel:
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise google_exceptions.ResourceExhausted("quota")
+        return FakeResponse()
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate_per_second=20, capacity=2)
+    start = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+    # Two tokens are available immediately, the other two refill at 20/s
+    assert time.monotonic() - start >= 0.09
+
+@pytest.mark.asyncio
+async def test_judge_client_retries_transient_errors():
+    client = JudgeClient(requests_per_minute=6000, max_retries=2, base_backoff_seconds=0.01)
+    client._model = FlakyModel(failures=2)
+    response = await client.generate("prompt")
+    assert response.text == "8"
+    assert response.attempts == 3
+
+@pytest.mark.asyncio
+async def test_judge_client_gives_up_after_max_retries():
+    client = JudgeClient(requests_per_minute=6000, max_retries=1, base_backoff_seconds=0.01)
+    client._model = FlakyModel(failures=5)
+    with pytest.raises(google_exceptions.ResourceExhausted):
+        await client.generate("prompt")
+
+@pytest.mark.asyncio
+async def test_judge_cache_skips_repeated_prompts(tmp_path):
+    cache = LLMResponseCache(ttl_seconds=None, db_path=str(tmp_path / "judge_cache.sqlite"))
+    client = JudgeClient(requests_per_minute=6000, cache=cache)
+    model = FlakyModel(failures=0)
+    client._model = model
+    with track_usage() as usage:
+        first = await client.generate("prompt")
+        second = await client.generate("prompt")
+    assert model.calls == 1
+    assert not first.cached and second.cached
+    assert usage.cache_hits == 1
@@ -0,0 +1,113 @@
+import asyncio
+import time
+import pytest
+from app.benchmarks.stubs import FakeLLMProvider, HashingEmbedder, InMemoryVectorStore, LocalRedisStandIn
+from app.services.cache_backends import CacheBackend, RedisCacheBackend, create_cache_backend, SQLiteCacheBackend
+from app.services.llm_generator import LLMGenerator
+from app.services.llm_cache import LLMResponseCache
+from app.services.pipeline_service import RAGPipelineService
+
+def test_key_depends_on_model_params_and_prompt():
+    key = LLMResponseCache.make_key("gemini-2.0-flash", "prompt", {"temperature": 0.0})
+    assert key == LLMResponseCache.make_key("gemini-2.0-flash", "prompt", {"temperature": 0.0})
+    assert key != LLMResponseCache.make_key("gemini-2.0-flash", "prompt", {"temperature": 0.5})
+    assert key != LLMResponseCache.make_key("gemini-1.5-pro", "prompt", {"temperature": 0.0})
+    assert key != LLMResponseCache.make_key("gemini-2.0-flash", "other prompt", {"temperature": 0.0})
+
+@pytest.mark.asyncio
+async def test_memory_tier_evicts_least_recently_used():
+    cache = LLMResponseCache(max_entries=2)
+    await cache.set("a", "1")
+    await cache.set("b", "2")
+    assert await cache.get("a") == "1"
+    await cache.set("c", "3")
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "1"
+    assert await cache.get("c") == "3"
+
+@pytest.mark.asyncio
+async def test_entries_expire_after_ttl():
+    cache = LLMResponseCache(ttl_seconds=0.05)
+    await cache.set("a", "1")
+    assert await cache.get("a") == "1"
+    time.sleep(0.1)
+    assert await cache.get("a") is None
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite")
+    await LLMResponseCache(db_path=path).set("a", {"text": "answer", "prompt_tokens": 3})
+    cache = LLMResponseCache(db_path=path)
+    assert await cache.get("a") == {"text": "answer", "prompt_tokens": 3}
+    assert cache.stats()["shared_hits"] == 1
+
+@pytest.mark.asyncio
+async def test_entries_from_the_backend_keep_their_age():
+    backend = RedisCacheBackend(client=LocalRedisStandIn())
+    await LLMResponseCache(ttl_seconds=0.2, backend=backend).set("a", "1")
+    time.sleep(0.15)
+    worker = LLMResponseCache(ttl_seconds=0.2, backend=backend)
+    assert await worker.get("a") == "1"
+    time.sleep(0.1)
+    assert await worker.get("a") is None
+
+@pytest.mark.asyncio
+async def test_workers_share_entries_through_redis_backend():
+    backend_client = LocalRedisStandIn()
+    worker_a = LLMResponseCache(backend=RedisCacheBackend(client=backend_client))
+    worker_b = LLMResponseCache(backend=RedisCacheBackend(client=backend_client))
+    await worker_a.set("a", {"text": "answer"})
+    assert await worker_b.get("a") == {"text": "answer"}
+    assert worker_b.stats()["shared_hits"] == 1
+    await worker_b.clear()
+    assert backend_client.data == {}
+
+@pytest.mark.asyncio
+async def test_slow_backend_does_not_block_the_event_loop():
+    class SlowBackend(CacheBackend):
+        def get(self, key):
+            time.sleep(0.2)
+            return None
+
+        def set(self, key, value, ttl_seconds=None):
+            pass
+
+        def clear(self):
+            pass
+
+    cache = LLMResponseCache(backend=SlowBackend())
+    lookup = asyncio.ensure_future(cache.get("a"))
+    start = time.perf_counter()
+    await asyncio.sleep(0.01)
+    assert time.perf_counter() - start < 0.1
+    assert await lookup is None
+
+def test_backend_is_chosen_from_location(tmp_path):
+    assert create_cache_backend("") is None
+    assert isinstance(create_cache_backend(str(tmp_path / "cache.sqlite")), SQLiteCacheBackend)
+
+def test_backend_without_every_method_cannot_be_created():
+    class GetOnlyBackend(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyBackend()
+
+@pytest.mark.asyncio
+async def test_pipeline_serves_repeated_prompts_from_cache():
+    provider = FakeLLMProvider(latency_ms=0)
+    service = RAGPipelineService(
+        qdrant_service=InMemoryVectorStore("laws"),
+        embedder_service=HashingEmbedder(),
+        type="law",
+        generator=LLMGenerator([provider]),
+        llm_cache=LLMResponseCache()
+    )
+    documents = [{"content": "Section 420 deals with cheating."}]
+    first, first_cached = await service.generate_answer("What is section 420?", documents)
+    second, second_cached = await service.generate_answer("What is section 420?", documents)
+    _, other_cached = await service.generate_answer("What is section 302?", documents)
+    assert first == second
+    assert (first_cached, second_cached, other_cached) == (False, True, False)
+    assert provider.calls == 2
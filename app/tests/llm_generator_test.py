@@ -0,0 +1,74 @@
+import pytest
+from app.benchmarks.stubs import FakeLLMProvider
+from app.core.config import settings
+from app.core.exceptions import LLMConfigurationError, QueryProcessingError
+from app.services.llm_generator import LLMGenerator, LLMProvider
+
+@pytest.mark.asyncio
+async def test_falls_back_when_primary_fails():
+    primary = FakeLLMProvider(name="primary", latency_ms=0, failure_rate=1.0)
+    backup = FakeLLMProvider(name="backup", latency_ms=0)
+    generator = LLMGenerator([primary, backup])
+    result = await generator.generate("prompt")
+    assert result.provider == "backup"
+    assert generator.stats()["fallbacks"] == 1
+    assert generator.stats()["providers"]["primary"]["failures"] == 1
+
+@pytest.mark.asyncio
+async def test_falls_back_when_primary_times_out():
+    primary = FakeLLMProvider(name="primary", latency_ms=500)
+    backup = FakeLLMProvider(name="backup", latency_ms=0)
+    generator = LLMGenerator([primary, backup], timeout_seconds=0.05)
+    result = await generator.generate("prompt")
+    assert result.provider == "backup"
+    assert generator.stats()["providers"]["primary"]["timeouts"] == 1
+
+@pytest.mark.asyncio
+async def test_raises_when_every_provider_fails():
+    generator = LLMGenerator([FakeLLMProvider(name="only", latency_ms=0, failure_rate=1.0)])
+    with pytest.raises(QueryProcessingError):
+        await generator.generate("prompt")
+
+@pytest.mark.asyncio
+async def test_hedge_takes_the_faster_provider():
+    primary = FakeLLMProvider(name="primary", latency_ms=500)
+    backup = FakeLLMProvider(name="backup", latency_ms=10)
+    generator = LLMGenerator([primary, backup], hedge=True, hedge_initial_delay_ms=20)
+    result = await generator.generate("prompt")
+    assert result.provider == "backup"
+    assert result.hedged
+    stats = generator.stats()
+    assert stats["hedged_requests"] == 1 and stats["hedge_wins"] == 1
+    assert stats["providers"]["primary"]["cancelled"] == 1
+
+@pytest.mark.asyncio
+async def test_no_hedge_when_primary_is_fast():
+    primary = FakeLLMProvider(name="primary", latency_ms=0)
+    backup = FakeLLMProvider(name="backup", latency_ms=0)
+    generator = LLMGenerator([primary, backup], hedge=True, hedge_initial_delay_ms=200)
+    result = await generator.generate("prompt")
+    assert result.provider == "primary" and not result.hedged
+    assert backup.calls == 0
+
+def test_hedge_delay_follows_recent_percentile():
+    primary = FakeLLMProvider(name="primary")
+    generator = LLMGenerator([primary], hedge_min_delay_ms=10, hedge_initial_delay_ms=1000, min_samples=5)
+    assert generator.hedge_delay_seconds(primary) == 1.0
+    generator.provider_stats["primary"].latencies_ms.extend([100.0] * 19 + [1000.0])
+    assert generator.hedge_delay_seconds(primary) == pytest.approx(0.145)
+
+def test_missing_api_keys_fail_with_a_configuration_error(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PROVIDERS", "gemini,groq")
+    monkeypatch.setattr(settings, "GOOGLE_API_KEY", "")
+    monkeypatch.setattr(settings, "GROQ_API_KEY", "")
+    monkeypatch.setattr(settings, "LLAMA3_API_KEY", "")
+    with pytest.raises(LLMConfigurationError) as error:
+        LLMGenerator.from_settings()
+    assert all(name in error.value.message for name in ["LLM_PROVIDERS", "GOOGLE_API_KEY", "GROQ_API_KEY"])
+
+def test_provider_without_generate_cannot_be_created():
+    class NamedOnlyProvider(LLMProvider):
+        name = "named-only"
+
+    with pytest.raises(TypeError):
+        NamedOnlyProvider()
@@ -0,0 +1,103 @@
+import orjson
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from app.benchmarks.stubs import HashingEmbedder
+from app.core.config import settings
+from app.services.local_ingestion import LocalIngestion, count_rows, iter_shard, parse_shard, shard_range
+from app.services.near_duplicates import NearDuplicateDetector
+from app.services.title_index import TitleIndex
+
+def judgement_rows(count: int):
+    rows = []
+    for i in range(count):
+        text = f"judgement {i} " + " ".join(f"word{i}_{j}" for j in range(40))
+        rows.append({
+            "Titles": f"Petitioner {i} vs State on {i % 28 + 1} January, 2010",
+            "Doc_url": f"https://example.org/doc/{i}",
+            "Doc_size": 100 + i,
+            "Court_Name": "High Court",
+            "Text": text,
+            "Case_Type": "Criminal",
+            "Court_Type": "High Court",
+        })
+    # A re-published copy of row 3
+    rows[7]["Text"] = rows[3]["Text"]
+    return rows
+
+def write_files(tmp_path, rows):
+    """Split the rows over a Parquet file (two row groups), an Arrow file and a JSONL file."""
+    parquet_path, arrow_path, jsonl_path = str(tmp_path / "a.parquet"), str(tmp_path / "b.arrow"), str(tmp_path / "c.jsonl")
+    pq.write_table(pa.Table.from_pylist(rows[:10]), parquet_path, row_group_size=4)
+    table = pa.Table.from_pylist(rows[10:16])
+    with ipc.new_file(arrow_path, table.schema) as writer:
+        writer.write_table(table, max_chunksize=4)
+    with open(jsonl_path, "wb") as f:
+        f.write(b"\n".join(orjson.dumps(row) for row in rows[16:]) + b"\n")
+    return [parquet_path, arrow_path, jsonl_path]
+
+def create_collection(client: QdrantClient, name: str = "judgements"):
+    client.create_collection(name, vectors_config=models.VectorParams(size=settings.VECTOR_SIZE, distance=models.Distance.COSINE))
+
+def test_shards_cover_every_row_once():
+    assert parse_shard("2/4") == (2, 4)
+    for bad in ("0/4", "5/4", "1-4", "1/0"):
+        with pytest.raises(ValueError):
+            parse_shard(bad)
+    for total in (0, 1, 7, 100):
+        ranges = [shard_range(total, (i, 3)) for i in range(1, 4)]
+        assert ranges[0][0] == 0 and ranges[-1][1] == total
+        assert all(ranges[i][1] == ranges[i + 1][0] for i in range(2))
+
+def test_shards_read_disjoint_rows_across_formats(tmp_path):
+    rows = judgement_rows(20)
+    paths = write_files(tmp_path, rows)
+    assert [count_rows(path) for path in paths] == [10, 6, 4]
+    seen = []
+    for i in range(1, 4):
+        start, stop, shard_rows = iter_shard(paths, (i, 3), ["Titles", "Text"])
+        shard_rows = list(shard_rows)
+        assert [index for index, _ in shard_rows] == list(range(start, stop))
+        seen += shard_rows
+    assert [index for index, _ in seen] == list(range(20))
+    assert all(row == {"Titles": rows[index]["Titles"], "Text": rows[index]["Text"]} for index, row in seen)
+
+def test_ingestion_stores_shard_with_row_ids_and_links_duplicates(tmp_path):
+    paths = write_files(tmp_path, judgement_rows(20))
+    client = QdrantClient(":memory:")
+    create_collection(client)
+    title_index = TitleIndex()
+    ingestion = LocalIngestion(
+        client, "judgements", "judgement", workers=0, batch_size=3, embedder_factory=HashingEmbedder,
+        detector=NearDuplicateDetector(), dedup_mode="link", title_index=title_index
+    )
+    report = ingestion.run(paths)
+    assert report["rows"] == report["stored"] == 20
+    assert report["duplicates"] == 1
+    assert set(report["stage_seconds"]) == {"read", "embed", "signature", "wait", "dedup", "upload"}
+    point = client.retrieve("judgements", ids=[7], with_payload=True)[0]
+    assert point.payload["metadata"]["duplicate_of"] == 3
+    assert point.payload["content"].startswith("Title: Petitioner 7 vs State")
+    assert len(title_index) == 20
+
+def test_worker_processes_match_in_process_ingestion(tmp_path):
+    paths = write_files(tmp_path, judgement_rows(20))
+    client = QdrantClient(":memory:")
+    create_collection(client)
+    reports = [
+        LocalIngestion(
+            client, "judgements", "judgement", workers=2, batch_size=4, embedder_factory=HashingEmbedder,
+            detector=NearDuplicateDetector(), dedup_mode="drop"
+        ).run(paths, (shard, 2))
+        for shard in (1, 2)
+    ]
+    assert [report["stored"] for report in reports] == [9, 10]
+    assert client.count("judgements").count == 19
+    stored = {point.id for point in client.scroll("judgements", limit=100)[0]}
+    assert stored == set(range(20)) - {7}
+    point = client.retrieve("judgements", ids=[12], with_vectors=True)[0]
+    expected = HashingEmbedder().encode_batch([point.payload["content"]])[0]
+    assert point.vector == pytest.approx(expected.tolist(), abs=1e-5)
@@ -0,0 +1,67 @@
+import random
+from types import SimpleNamespace
+from app.services.near_duplicates import (
+    MinHasher, NearDuplicateDetector, choose_bands, collapse_duplicates, estimated_similarity
+)
+
+WORDS = ["appeal", "accused", "bail", "court", "evidence", "petition", "trial", "witness", "order", "section",
+         "property", "tenant", "contract", "police", "investigation", "sentence", "conviction", "high", "state"]
+
+def judgement(seed: int, words: int = 400) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) + str(rng.randint(0, 50)) for _ in range(words))
+
+def republished(text: str) -> str:
+    # Same judgement with a different header and a few edited words
+    words = text.split()
+    words[100] = "amended"
+    words[250] = "corrected"
+    return "Reported in another reporter. " + " ".join(words)
+
+def test_signature_similarity_tracks_jaccard():
+    hasher = MinHasher(num_perm=256)
+    text = judgement(1)
+    assert estimated_similarity(hasher.signature(text), hasher.signature(text)) == 1.0
+    assert estimated_similarity(hasher.signature(text), hasher.signature(republished(text))) > 0.85
+    assert estimated_similarity(hasher.signature(text), hasher.signature(judgement(2))) < 0.1
+
+def test_bands_make_pairs_above_the_threshold_candidates():
+    bands = choose_bands(128, 0.85)
+    rows = 128 // bands
+    assert (1 / bands) ** (1 / rows) <= 0.85
+    assert 1 - (1 - 0.85 ** rows) ** bands > 0.95
+
+def test_detector_links_republished_copies_to_the_canonical_document():
+    detector = NearDuplicateDetector(threshold=0.8)
+    texts = [judgement(seed) for seed in range(20)]
+    assert all(detector.check(index, text) is None for index, text in enumerate(texts))
+    duplicate = detector.check(100, republished(texts[7]))
+    assert duplicate is not None and duplicate[0] == 7
+    report = detector.report()
+    assert (report["seen"], report["unique"], report["duplicates"]) == (21, 20, 1)
+    assert report["examples"][0]["duplicate_of"] == 7
+
+def test_detector_memory_is_bounded():
+    detector = NearDuplicateDetector(threshold=0.8, max_entries=5)
+    texts = [judgement(seed) for seed in range(10)]
+    for index, text in enumerate(texts):
+        detector.check(index, text)
+    assert len(detector._signatures) == 5
+    assert detector.report()["evicted"] == 5
+    # The oldest documents are forgotten, the recent ones are still detected
+    assert detector.check(100, texts[0]) is None
+    assert detector.check(101, texts[9])[0] == 9
+
+def test_collapse_duplicates_keeps_the_highest_ranked_copy():
+    text = judgement(3)
+    hits = [
+        SimpleNamespace(id=1, score=0.9, payload={"content": text, "metadata": {}}),
+        SimpleNamespace(id=2, score=0.8, payload={"content": judgement(4), "metadata": {"duplicate_of": 1}}),
+        SimpleNamespace(id=3, score=0.7, payload={"content": republished(text), "metadata": {}}),
+        SimpleNamespace(id=4, score=0.6, payload={"content": judgement(5), "metadata": {}}),
+    ]
+    kept, dropped = collapse_duplicates(hits)
+    assert [hit.id for hit in kept] == [1, 3, 4]
+    kept, dropped = collapse_duplicates(hits, MinHasher(), threshold=0.8)
+    assert [hit.id for hit in kept] == [1, 4]
+    assert dropped == 2
@@ -0,0 +1,69 @@
+import asyncio
+import time
+import pytest
+from app.services.pipeline_trace_store import PipelineTraceStore, percentile
+from app.services.query_log import query_hash
+
+def make_trace(total_ms: float, pipeline_type: str = "laws", timestamp: float = None):
+    return {
+        "timestamp": timestamp or time.time(),
+        "pipeline_type": pipeline_type,
+        "user_id": "anonymous",
+        "total_time_ms": total_ms,
+        "embedding_time_ms": 10.0,
+        "search_time_ms": 20.0,
+        "context_time_ms": 1.0,
+        "llm_time_ms": total_ms - 31.0,
+        "context_tokens": 100,
+        "answer_tokens": 50
+    }
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([5.0], 99) == 5.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+
+def test_ring_buffer_is_bounded():
+    store = PipelineTraceStore(max_traces=3)
+    for i in range(5):
+        store.record(make_trace(100.0 + i))
+    history = store.history(limit=10)
+    assert len(history) == 3
+    assert history[0]["total_time_ms"] == 104.0
+
+def test_aggregate_filters_window_and_pipeline():
+    store = PipelineTraceStore(max_traces=10)
+    store.record(make_trace(5000.0, timestamp=time.time() - 7200))
+    store.record(make_trace(100.0))
+    store.record(make_trace(300.0))
+    store.record(make_trace(900.0, pipeline_type="judgement"))
+    aggregate = store.aggregate(window_seconds=3600, pipeline_type="laws")
+    assert aggregate["count"] == 2
+    assert aggregate["stages"]["total"]["p50"] == 200.0
+    assert aggregate["stages"]["total"]["max"] == 300.0
+
+def test_sqlite_persistence(tmp_path):
+    db_path = str(tmp_path / "traces.db")
+    store = PipelineTraceStore(max_traces=10, db_path=db_path)
+    store.record(make_trace(250.0))
+    store.flush()
+    reloaded = PipelineTraceStore(max_traces=10, db_path=db_path)
+    assert reloaded.history()[0]["total_time_ms"] == 250.0
+
+@pytest.mark.asyncio
+async def test_file_gets_traces_from_the_background_flush_without_query_text(tmp_path):
+    db_path = str(tmp_path / "traces.db")
+    store = PipelineTraceStore(max_traces=10, db_path=db_path, flush_seconds=0.05)
+    trace = dict(make_trace(250.0), query="Is bail possible for Ramesh Kumar?", user_id="alice")
+    store.record(trace)
+    assert store.history()[0]["query"] == trace["query"]
+    assert PipelineTraceStore(db_path=db_path).history() == []
+
+    store.start()
+    await asyncio.sleep(0.15)
+    store.record(make_trace(300.0))
+    await store.stop()
+    persisted = PipelineTraceStore(db_path=db_path).history()
+    assert [row["total_time_ms"] for row in persisted] == [300.0, 250.0]
+    assert "query" not in persisted[1] and "user_id" not in persisted[1]
+    assert persisted[1]["query_hash"] == query_hash(trace["query"])
@@ -0,0 +1,106 @@
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from app.api.routes.query import project_documents
+from app.benchmarks.stubs import FakeLLMProvider, HashingEmbedder, InMemoryVectorStore, select_payload
+from app.core.compression import CompressionMiddleware, choose_encoding
+from app.services.adaptive_retrieval import RetrievalPolicy
+from app.services.llm_generator import LLMGenerator
+from app.services.pipeline_service import RAGPipelineService, payload_selector
+
+DOCUMENTS = [
+    {"content": "The appeal is dismissed with costs.", "metadata": {"Titles": "A vs B", "Doc_url": "u1", "Doc_size": 35}},
+    {"content": "Bail granted.", "metadata": {"Titles": "C vs D", "Doc_url": "u2", "Doc_size": 13}}
+]
+
+def test_full_projection_keeps_documents():
+    assert project_documents(DOCUMENTS) == [
+        {"metadata": document["metadata"], "content": document["content"]} for document in DOCUMENTS
+    ]
+
+def test_projection_truncates_and_selects_fields():
+    projected = project_documents(DOCUMENTS, snippet_chars=10, fields=["Titles", "missing"])
+    assert projected[0] == {"metadata": {"Titles": "A vs B"}, "content": "The appeal"}
+    assert project_documents(DOCUMENTS, include_content=False, fields=[])[1] == {"metadata": {}}
+
+def test_payload_selector_matches_stub_projection():
+    payload = {"content": "text", "metadata": {"Titles": "A vs B", "Doc_url": "u1", "duplicate_of": 3}}
+    assert select_payload(payload, payload_selector(["Titles"])) == {
+        "content": "text", "metadata": {"Titles": "A vs B", "duplicate_of": 3}
+    }
+    assert select_payload(payload, payload_selector(["Doc_url"], content=False)) == {
+        "metadata": {"Doc_url": "u1", "duplicate_of": 3}
+    }
+
+def test_choose_encoding_honours_refusals():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("") is None
+
+def compressed_client() -> httpx.AsyncClient:
+    async def large(request):
+        return JSONResponse({"text": "judgement " * 500})
+
+    async def small(request):
+        return JSONResponse({"ok": True})
+
+    async def events(request):
+        async def stream():
+            yield b"data: " + b"x" * 2000 + b"\n\n"
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    app = Starlette(routes=[Route("/large", large), Route("/small", small), Route("/events", events)])
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+@pytest.mark.asyncio
+async def test_middleware_compresses_large_json():
+    async with compressed_client() as client:
+        response = await client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < 1024
+    assert response.json() == {"text": "judgement " * 500}
+
+@pytest.mark.asyncio
+async def test_middleware_skips_small_bodies_and_event_streams():
+    async with compressed_client() as client:
+        small = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+        events = await client.get("/events", headers={"Accept-Encoding": "gzip"})
+        identity = await client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in events.headers
+    assert events.text.startswith("data: ")
+    assert "content-encoding" not in identity.headers
+
+@pytest.mark.asyncio
+async def test_two_phase_retrieval_loads_content_of_kept_hits_only():
+    embedder = HashingEmbedder()
+    store = InMemoryVectorStore("judgement")
+    documents = [
+        {"content": f"section {i} of the penal code", "metadata": {"Titles": f"Case {i}", "Doc_url": f"u{i}"}}
+        for i in range(30)
+    ]
+    store.add(await embedder.get_document_embeddings(documents), documents)
+    loaded = []
+    retrieve_payloads = store.retrieve_payloads
+
+    async def recording_retrieve(ids, with_payload=True):
+        loaded.extend(ids)
+        return await retrieve_payloads(ids, with_payload)
+
+    store.retrieve_payloads = recording_retrieve
+    service = RAGPipelineService(
+        qdrant_service=store,
+        embedder_service=embedder,
+        type="judgement",
+        generator=LLMGenerator([FakeLLMProvider(latency_ms=0)]),
+        retrieval_policy=RetrievalPolicy(rule="relative", cut_value=0.99, fetch_k=20, min_k=2, max_k=5)
+    )
+    hits, selection = await service.retrieve(await embedder.get_query_embedding("section 4 of the penal code"), ["Titles"])
+    assert selection["fetched"] == 20
+    assert sorted(loaded) == sorted(hit.id for hit in hits)
+    assert all(set(hit.payload) == {"content", "metadata"} for hit in hits)
+    assert all(set(hit.payload["metadata"]) == {"Titles"} for hit in hits)
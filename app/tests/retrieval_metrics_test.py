@@ -0,0 +1,21 @@
+import math
+import pytest
+from app.evaluators.retrieval_benchmark import compute_retrieval_metrics
+
+def test_perfect_ranking():
+    metrics = compute_retrieval_metrics([[1, 2, 3], [4, 5, 6]], [{1}, {4}], ks=(1, 3))
+    assert metrics["recall@1"] == 1.0
+    assert metrics["mrr"] == 1.0
+    assert metrics["ndcg@3"] == pytest.approx(1.0)
+
+def test_hit_at_second_rank_and_miss():
+    metrics = compute_retrieval_metrics([[9, 1, 3], [7, 8, 9]], [{1}, {4}], ks=(1, 3))
+    assert metrics["recall@1"] == 0.0
+    assert metrics["recall@3"] == 0.5
+    assert metrics["mrr"] == pytest.approx(0.25)
+    assert metrics["ndcg@3"] == pytest.approx(0.5 / math.log2(3))
+
+def test_multiple_relevant_documents():
+    metrics = compute_retrieval_metrics([[1, 2, 3]], [{1, 3}], ks=(1, 3))
+    assert metrics["recall@1"] == 1.0
+    assert metrics["recall@3"] == 1.0
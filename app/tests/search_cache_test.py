@@ -0,0 +1,129 @@
+import time
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from app.api.dependencies import search_cache_location
+from app.core.config import settings
+from app.services.cache_backends import SQLiteCacheBackend
+from app.services.collection_versions import AliasWatcher, CollectionManager
+from app.services.qdrant_service import QdrantService
+from app.services.search_cache import SearchResultCache
+
+def unit_vectors(count: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, settings.VECTOR_SIZE)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def cached_service(cache: SearchResultCache):
+    client = QdrantClient(":memory:")
+    CollectionManager(client).ensure(settings.COLLECTION_NAME)
+    vectors = unit_vectors(50)
+    client.upload_collection(
+        settings.COLLECTION_NAME, vectors=vectors, payload=[{"content": f"doc {i}"} for i in range(50)],
+        ids=list(range(50)), wait=True
+    )
+    service = QdrantService(client, "judgement", search_cache=cache)
+    calls = []
+    search = client.search
+    client.search = lambda **kwargs: calls.append(kwargs) or search(**kwargs)
+    return service, vectors, calls
+
+def test_key_ignores_float_noise_but_not_limit_selection_or_epoch():
+    cache = SearchResultCache(quantum=1e-4)
+    vector = np.round(unit_vectors(1)[0] / 1e-4) * 1e-4
+    key = cache.make_key("docs", vector, 10, ["content"])
+    assert cache.make_key("docs", vector + 2e-5, 10, ["content"]) == key
+    assert cache.make_key("docs", unit_vectors(1, seed=1)[0], 10, ["content"]) != key
+    assert cache.make_key("docs", vector, 5, ["content"]) != key
+    assert cache.make_key("docs", vector, 10, True) != key
+    assert cache.make_key("other", vector, 10, ["content"]) != key
+    cache.bump("docs")
+    assert cache.make_key("docs", vector, 10, ["content"]) != key
+
+@pytest.mark.asyncio
+async def test_repeated_search_is_served_from_cache_until_bumped():
+    cache = SearchResultCache()
+    service, vectors, calls = cached_service(cache)
+    first = await service.search_similar(vectors[3], top_k=5)
+    first[0].payload = {"content": "changed by the caller"}
+    second = await service.search_similar(vectors[3], top_k=5)
+    assert len(calls) == 1
+    assert [point.id for point in second] == [point.id for point in first]
+    assert second[0].id == 3 and second[0].payload == {"content": "doc 3"}
+    assert cache.stats()["hits"] == 1
+
+    cache.bump(settings.COLLECTION_NAME)
+    await service.search_similar(vectors[3], top_k=5)
+    assert len(calls) == 2
+
+@pytest.mark.asyncio
+async def test_lru_eviction_and_expiry(monkeypatch):
+    cache = SearchResultCache(max_entries=2, ttl_seconds=60)
+    vectors = unit_vectors(3)
+    keys = [cache.make_key("docs", vector, 10) for vector in vectors]
+    for key in keys:
+        await cache.set(key, [])
+    assert await cache.get(keys[0]) is None
+    assert await cache.get(keys[2]) == []
+    now = time.time()
+    monkeypatch.setattr("app.services.search_cache.time.time", lambda: now + 120)
+    assert await cache.get(keys[2]) is None
+
+@pytest.mark.asyncio
+async def test_results_from_the_backend_keep_their_age(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.db")
+    key = SearchResultCache().make_key("docs", unit_vectors(1)[0], 10)
+    await SearchResultCache(ttl_seconds=60, backend=SQLiteCacheBackend(path, table="search_cache")).set(key, [])
+    now = time.time()
+    monkeypatch.setattr("app.services.search_cache.time.time", lambda: now + 50)
+    worker = SearchResultCache(ttl_seconds=60, backend=SQLiteCacheBackend(path, table="search_cache"))
+    assert await worker.get(key) == []
+    monkeypatch.setattr("app.services.search_cache.time.time", lambda: now + 70)
+    assert await worker.get(key) is None
+
+@pytest.mark.asyncio
+async def test_ingestion_epoch_reaches_watcher_write_hooks():
+    client = QdrantClient(":memory:")
+    manager = CollectionManager(client)
+    manager.ensure(settings.COLLECTION_NAME)
+    cache = SearchResultCache()
+    watcher = AliasWatcher(manager, [settings.COLLECTION_NAME])
+    watcher.on_write(lambda alias, collection_name: cache.bump(alias))
+    assert await watcher.poll() == []
+    assert cache.epoch(settings.COLLECTION_NAME) == 0
+
+    assert manager.bump_epoch(settings.COLLECTION_NAME) == 1
+    assert await watcher.poll() == []
+    assert cache.epoch(settings.COLLECTION_NAME) == 1
+    await watcher.poll()
+    assert cache.epoch(settings.COLLECTION_NAME) == 1
+    assert manager.bump_epoch("missing") is None
+
+@pytest.mark.asyncio
+async def test_workers_share_results_through_the_backend(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first_cache = SearchResultCache(backend=SQLiteCacheBackend(path, table="search_cache"))
+    second_cache = SearchResultCache(backend=SQLiteCacheBackend(path, table="search_cache"))
+    for cache in (first_cache, second_cache):
+        cache.set_version(settings.COLLECTION_NAME, "judgement_v1:0")
+    first, vectors, first_calls = cached_service(first_cache)
+    second, _, second_calls = cached_service(second_cache)
+
+    expected = await first.search_similar(vectors[3], top_k=5)
+    served = await second.search_similar(vectors[3], top_k=5)
+    assert len(first_calls) == 1 and len(second_calls) == 0
+    assert [(point.id, point.payload) for point in served] == [(point.id, point.payload) for point in expected]
+    assert second_cache.stats()["shared_hits"] == 1
+
+    # An ingestion moves every worker to the new version; older results are not served
+    second_cache.set_version(settings.COLLECTION_NAME, "judgement_v1:1")
+    await second.search_similar(vectors[3], top_k=5)
+    assert len(second_calls) == 1
+
+def test_search_cache_gets_its_own_file_next_to_the_llm_cache(monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_CACHE_DB", "")
+    monkeypatch.setattr(settings, "LLM_CACHE_DB", "cache/llm.sqlite")
+    assert search_cache_location() == "cache/llm.search.sqlite"
+    monkeypatch.setattr(settings, "LLM_CACHE_DB", "redis://cache:6379/0")
+    assert search_cache_location() == "redis://cache:6379/0"
+    monkeypatch.setattr(settings, "SEARCH_CACHE_DB", "search.db")
+    assert search_cache_location() == "search.db"
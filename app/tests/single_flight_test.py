@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from app.services.single_flight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+    assert calls == 1
+    assert [result for result, _ in results] == ["answer"] * 5
+    assert [shared for _, shared in results].count(False) == 1
+    assert flight.stats()["coalesced"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_key_is_released_after_completion():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await flight.do("key", work) == (1, False)
+    assert await flight.do("key", work) == (2, False)
+
+@pytest.mark.asyncio
+async def test_exception_reaches_every_waiter():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*(flight.do("key", work) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_work():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    leader = asyncio.ensure_future(flight.do("key", work))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(flight.do("key", work))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    assert await follower == ("answer", True)
+
+@pytest.mark.asyncio
+async def test_users_at_their_admission_limit_do_not_share_rejections(monkeypatch):
+    from types import SimpleNamespace
+    from app.api.routes.query import monitored_process_query
+    from app.benchmarks.stubs import FakeLLMProvider, HashingEmbedder, InMemoryVectorStore
+    from app.core.exceptions import AdmissionRejectedError
+    from app.services.admission_controller import AdmissionController
+    from app.services.global_pipeline_monitor import GlobalPipelineMonitor
+    from app.services.llm_generator import LLMGenerator
+    from app.services.pipeline_service import RAGPipelineService
+
+    # Token counts without downloading the tiktoken encoding
+    monkeypatch.setattr(GlobalPipelineMonitor(), "_encoding", SimpleNamespace(encode=str.split))
+    embedder = HashingEmbedder()
+    store = InMemoryVectorStore("laws")
+    contents = ["Bail under section 420 is granted at the discretion of the court."]
+    store.add(await embedder.get_document_embeddings([{"content": content} for content in contents]),
+              [{"content": content, "metadata": {}} for content in contents])
+    admission = AdmissionController(max_concurrent=8, max_per_user=1, max_wait_seconds=0.2)
+    pipeline = RAGPipelineService(
+        qdrant_service=store,
+        embedder_service=embedder,
+        type="law",
+        generator=LLMGenerator([FakeLLMProvider(latency_ms=50)]),
+        admission_controller=admission,
+        circuit_breaker=None
+    )
+    query = "Is bail granted for cheating under section 420?"
+
+    async with admission.admit("alice"):
+        # alice is at her limit; bob sends the same query right after her
+        alice = asyncio.ensure_future(monitored_process_query(query, pipeline, "laws", "alice"))
+        await asyncio.sleep(0)
+        bob = asyncio.ensure_future(monitored_process_query(query, pipeline, "laws", "bob"))
+        results = await asyncio.gather(alice, bob, return_exceptions=True)
+    assert isinstance(results[0], AdmissionRejectedError)
+    assert results[1]["answer"]
+    assert pipeline.llm.providers[0].calls == 1
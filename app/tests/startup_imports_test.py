@@ -0,0 +1,27 @@
+import subprocess
+import sys
+from app.core.startup_profiler import StartupProfiler, profile_imports
+
+# Heavy dependencies only needed for ingestion, evaluation or model inference
+DEFERRED_MODULES = ["datasets", "huggingface_hub", "sentence_transformers", "torch", "tiktoken", "google.generativeai"]
+
+def test_serving_path_does_not_import_heavy_dependencies():
+    check = (
+        "import sys, app.main; "
+        f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    )
+    completed = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.strip() == ""
+
+def test_profile_imports_reports_module_timings():
+    profile = profile_imports("app.core.config", top=5)
+    assert profile["total_ms"] > 0
+    assert profile["top_imports"][0]["module"] == "app.core.config"
+
+def test_sub_phases_are_left_out_of_total():
+    profiler = StartupProfiler()
+    profiler.record("warm_up", 100.0)
+    profiler.record("warm_up.embedder_load", 80.0)
+    profiler.record("pipeline_services", 5.0)
+    assert profiler.report()["total_ms"] == 105.0
@@ -0,0 +1,58 @@
+import json
+from types import SimpleNamespace
+import pytest
+from app.evaluators import evaluation
+from app.evaluators.structured_judge import parse_judge_scores, structured_evaluate, JudgeParseError, JUDGE_METRICS
+
+class ReplyingJudge:
+    def __init__(self, text: str):
+        self.text = text
+
+    async def generate(self, prompt, generation_config=None):
+        return SimpleNamespace(text=self.text)
+
+def test_parse_valid_scores_with_code_fence():
+    reply = "```json\n" + json.dumps({metric: 7 for metric in JUDGE_METRICS}) + "\n```"
+    scores = parse_judge_scores(reply)
+    assert set(scores) == set(JUDGE_METRICS)
+    assert scores["faithfulness"] == 7.0
+
+def test_parse_rejects_out_of_range_score():
+    reply = json.dumps({**{metric: 5 for metric in JUDGE_METRICS}, "faithfulness": 12})
+    with pytest.raises(JudgeParseError):
+        parse_judge_scores(reply)
+
+def test_parse_rejects_missing_metric():
+    reply = json.dumps({"faithfulness": 5})
+    with pytest.raises(JudgeParseError):
+        parse_judge_scores(reply)
+
+@pytest.mark.asyncio
+async def test_unparseable_reply_is_reported_not_scored():
+    scores = await structured_evaluate(ReplyingJudge("not json"), "question", "context", "answer")
+    assert all(scores[metric] is None for metric in JUDGE_METRICS)
+    assert "Invalid judge reply" in scores["judge_error"]
+
+@pytest.mark.asyncio
+async def test_failed_metrics_are_left_out_of_the_agreement(monkeypatch):
+    per_metric = {metric: 6.0 for metric in JUDGE_METRICS}
+    per_metric["citation_quality"] = None
+    results = {
+        "per_metric": per_metric,
+        "single_call": {metric: 7.0 for metric in JUDGE_METRICS}
+    }
+
+    async def fake_evaluate(question, context, answer, ground_truth=None, judge_mode="per_metric"):
+        scores = results[judge_mode]
+        failed = [metric for metric, score in scores.items() if score is None]
+        return {**scores, "weighted_average": 6.5, "failed_metrics": failed,
+                "timings_ms": {"wall_time": 10.0}, "judge_usage": {"total_tokens": 100}}
+
+    monkeypatch.setattr(evaluation, "comprehensive_evaluate", fake_evaluate)
+    comparison = await evaluation.compare_judge_modes("question", "context", "answer")
+    agreement = comparison["agreement"]
+    assert agreement["failures"] == 1
+    assert agreement["compared_metrics"] == len(JUDGE_METRICS) - 1
+    assert "citation_quality" not in agreement["absolute_difference"]
+    assert agreement["mean_absolute_difference"] == pytest.approx(1.0)
+    assert comparison["per_metric"]["failed_metrics"] == ["citation_quality"]
@@ -0,0 +1,82 @@
+import pytest
+from app.benchmarks.stubs import FakeLLMProvider, HashingEmbedder, InMemoryVectorStore
+from app.services.adaptive_retrieval import RetrievalPolicy
+from app.services.llm_generator import LLMGenerator
+from app.services.pipeline_service import RAGPipelineService
+from app.services.title_index import TitleIndex, normalize_title
+
+TITLES = [
+    "Central Bureau Of Investigation vs Mohammed Yousuf on 25 January, 2016",
+    "Central Bureau Of Investigation vs Mohammed Yousuf on 3 March, 2014",
+    "State Of Maharashtra vs Ramesh Kumar on 12 June, 2009",
+    "Union Of India vs Lakshmi Devi on 4 April, 2018",
+    "State Of Maharashtra vs Sunita Patel on 12 June, 2009",
+]
+
+def build_index(**kwargs) -> TitleIndex:
+    index = TitleIndex(**kwargs)
+    for doc_id, title in enumerate(TITLES):
+        index.add(doc_id, title)
+    return index
+
+def test_normalize_title_spells_versus_one_way():
+    assert normalize_title("A. Kumar v. State & Ors") == ["a", "kumar", "vs", "state", "and", "ors"]
+    assert normalize_title("A v/s B") == normalize_title("A Versus B") == ["a", "vs", "b"]
+
+def test_exact_title_in_query_is_matched_alone():
+    index = build_index()
+    matches = index.lookup("What was held in Central Bureau Of Investigation vs Mohammed Yousuf on 25 January, 2016?")
+    assert [match.id for match in matches] == [0]
+    assert matches[0].score == pytest.approx(1.0)
+
+def test_misspelt_party_name_still_matches():
+    index = build_index(threshold=0.8)
+    matches = index.lookup("State of Maharashtra v. Ramesh Kumaar, 12 June 2009")
+    assert [match.id for match in matches] == [2]
+
+def test_close_tokens_of_unknown_query_tokens_are_bounded():
+    index = build_index(close_token_cache_size=2)
+    assert index.close_tokens("kumaar")[0][0] == "kumar"
+    index.close_tokens("yousef")
+    index.close_tokens("kumaar")
+    index.close_tokens("lakshmy")
+    assert list(index._close_tokens) == ["kumaar", "lakshmy"]
+
+def test_unrelated_or_partial_queries_do_not_match():
+    index = build_index()
+    assert index.lookup("Mohammed Yousuf case") == []
+    assert index.lookup("bail for cheating under section 420") == []
+    assert TitleIndex().lookup("anything") == []
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "titles.json")
+    build_index().save(path)
+    loaded = TitleIndex.load(path)
+    assert len(loaded) == len(TITLES)
+    assert [match.id for match in loaded.lookup(TITLES[3])] == [3]
+
+@pytest.mark.asyncio
+async def test_pipeline_puts_named_judgement_first():
+    embedder = HashingEmbedder()
+    store = InMemoryVectorStore("judgement")
+    documents = [{"content": f"Title: {title} Judgement Text: ...", "metadata": {"Titles": title}} for title in TITLES]
+    documents += [{"content": f"bail application number {i} under section 439", "metadata": {"Titles": f"Case {i}"}} for i in range(20)]
+    store.add(await embedder.get_document_embeddings(documents), documents)
+    index = TitleIndex()
+    for doc_id, document in enumerate(documents):
+        index.add(doc_id, document["metadata"]["Titles"])
+    service = RAGPipelineService(
+        qdrant_service=store,
+        embedder_service=embedder,
+        type="judgement",
+        generator=LLMGenerator([FakeLLMProvider(latency_ms=0)]),
+        retrieval_policy=RetrievalPolicy(top_k=3),
+        title_index=index
+    )
+    query = "bail application in Union Of India vs Lakshmi Devi on 4 April, 2018"
+    hits, selection = await service.retrieve(await embedder.get_query_embedding(query), query_text=query)
+    assert hits[0].id == 3
+    assert hits[0].payload["metadata"]["Titles"] == TITLES[3]
+    assert selection["title_matches"] == 1
+    assert len(hits) == selection["k"] == 3
+    assert len({hit.id for hit in hits}) == 3
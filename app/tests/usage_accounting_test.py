@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+import pytest
+from app.core.exceptions import AdmissionRejectedError, UsageBudgetExceededError
+from app.services.usage_accounting import PIPELINE, USER, UsageAccountant
+
+def test_usage_is_aggregated_per_user_and_pipeline():
+    accountant = UsageAccountant(windows=[3600, 86400], flush_seconds=3600)
+    accountant.record("alice", "laws", prompt_tokens=100, completion_tokens=20, llm_ms=500)
+    accountant.record("alice", "judgement", prompt_tokens=300, completion_tokens=40, llm_ms=1500)
+    accountant.record(None, "laws")
+
+    alice = accountant.usage(USER, "alice")["3600s"]
+    assert alice == {"requests": 2, "prompt_tokens": 400, "completion_tokens": 60, "total_tokens": 460, "llm_seconds": 2.0}
+    assert accountant.usage(PIPELINE, "laws")["86400s"]["requests"] == 2
+    accountant.flush()
+    assert accountant.usage(USER, "anonymous")["3600s"]["requests"] == 1
+    assert [item["name"] for item in accountant.top(USER, 3600)] == ["alice", "anonymous"]
+
+def test_window_slides_by_bucket():
+    accountant = UsageAccountant(windows=[0.2], bucket_seconds=0.05, budget_window_seconds=0.2)
+    accountant.record("alice", "laws", prompt_tokens=10)
+    assert accountant.usage(USER, "alice")["0.2s"]["prompt_tokens"] == 10
+    time.sleep(0.3)
+    accountant.record("bob", "laws")
+    accountant.flush()
+    assert accountant.usage(USER, "alice")["0.2s"]["prompt_tokens"] == 0
+    assert accountant.stats()["users"] == 1
+
+def test_budget_rejects_until_usage_leaves_window():
+    accountant = UsageAccountant(windows=[3600], budget_window_seconds=3600, max_tokens=1000, flush_seconds=3600)
+    accountant.record("alice", "laws", prompt_tokens=900, completion_tokens=50)
+    accountant.check("alice")
+    assert accountant.budget("alice")["tokens_left"] == 50
+
+    accountant.record("alice", "laws", prompt_tokens=100)
+    with pytest.raises(UsageBudgetExceededError) as error:
+        accountant.check("alice")
+    assert isinstance(error.value, AdmissionRejectedError)
+    assert 3500 < error.value.retry_after <= 3600
+    accountant.check("bob")
+    accountant.check(None)
+
+def test_usage_is_shared_through_the_file(tmp_path):
+    path = str(tmp_path / "usage.db")
+    first = UsageAccountant(db_path=path, flush_seconds=3600, max_requests=3)
+    second = UsageAccountant(db_path=path, flush_seconds=3600, max_requests=3)
+    first.record("alice", "laws")
+    first.record("alice", "laws")
+    first.flush()
+    second.record("alice", "judgement")
+    second.flush()
+    with pytest.raises(UsageBudgetExceededError):
+        second.check("alice")
+
+    restarted = UsageAccountant(db_path=path)
+    assert restarted.usage(USER, "alice")["3600s"]["requests"] == 3
+
+@pytest.mark.asyncio
+async def test_recording_stays_in_memory_until_the_background_flush(tmp_path):
+    path = str(tmp_path / "usage.db")
+    accountant = UsageAccountant(db_path=path, flush_seconds=0.05)
+    accountant.record("alice", "laws")
+    assert UsageAccountant(db_path=path).usage(USER, "alice")["3600s"]["requests"] == 0
+
+    accountant.start()
+    await asyncio.sleep(0.15)
+    accountant.record("alice", "laws")
+    await accountant.stop()
+    assert UsageAccountant(db_path=path).usage(USER, "alice")["3600s"]["requests"] == 2
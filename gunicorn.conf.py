@@ -0,0 +1,20 @@
+"""
+Gunicorn settings for multi-worker serving: start with `WORKERS=4 ./start_server.sh`.
+The app and model weights are loaded once in the master and shared copy-on-write by the forked workers.
+"""
+import gc
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WORKERS", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.environ.get("WORKER_TIMEOUT", "120"))
+
+
+def on_starting(server):
+    from app.api.dependencies import preload_shared_models
+    preload_shared_models()
+    # Move everything loaded so far out of the garbage collector's reach, so collections in the workers
+    # do not touch (and copy) the shared pages
+    gc.freeze()
@@ -0,0 +1,71 @@
+from app.benchmarks.load_test import run_load_test, save_results, compare_results, print_report
+from app.services.adaptive_retrieval import RetrievalPolicy, CUT_RULES
+import argparse
+import asyncio
+import json
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the query endpoints with stubbed LLM and vector store")
+    parser.add_argument("--pipelines", default="judgement,laws", help="Comma separated pipelines to query")
+    parser.add_argument("--requests", type=int, default=200, help="Total number of requests")
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of concurrent clients")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0, help="Latency of the fake Gemini generator")
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0, help="Uniform jitter added to the LLM latency")
+    parser.add_argument("--search-latency-ms", type=float, default=0.0, help="Extra latency of the in-memory vector store")
+    parser.add_argument("--documents", type=int, default=1000, help="Documents per in-memory collection")
+    parser.add_argument("--real-embedder", action="store_true", help="Use the real SentenceTransformer embedder")
+    parser.add_argument("--max-llm-concurrency", type=int, default=0,
+                        help="Admit at most this many concurrent LLM calls (0 disables admission control)")
+    parser.add_argument("--llm-queue-size", type=int, default=64, help="Requests allowed to wait for an LLM slot")
+    parser.add_argument("--llm-max-wait", type=float, default=10.0, help="Seconds a request may wait before a 429")
+    parser.add_argument("--llm-spike-probability", type=float, default=0.0,
+                        help="Probability that a fake LLM call gets an extra latency spike")
+    parser.add_argument("--llm-spike-ms", type=float, default=0.0, help="Size of the injected LLM latency spike")
+    parser.add_argument("--llm-prefill-ms", type=float, default=0.0,
+                        help="Fake LLM latency added per 1000 prompt characters")
+    parser.add_argument("--cut-rule", choices=CUT_RULES, default="fixed", help="Retrieval cut rule")
+    parser.add_argument("--cut-value", type=float, default=0.0, help="Score gap or relative threshold of the cut rule")
+    parser.add_argument("--top-k", type=int, default=10, help="Hits kept by the fixed rule")
+    parser.add_argument("--min-k", type=int, default=2, help="Fewest hits kept by an adaptive rule")
+    parser.add_argument("--max-k", type=int, default=10, help="Most hits kept by an adaptive rule")
+    parser.add_argument("--compress-max-chars", type=int, default=0,
+                        help="Compress the context to this many characters (0 disables compression)")
+    parser.add_argument("--hedge", action="store_true", help="Hedge the fake LLM with a second fake provider")
+    parser.add_argument("--output-dir", default="benchmark_results", help="Directory for the JSON results")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_load_test(
+        pipelines=[p.strip() for p in args.pipelines.split(",") if p.strip()],
+        total_requests=args.requests,
+        concurrency=args.concurrency,
+        llm_latency_ms=args.llm_latency_ms,
+        llm_jitter_ms=args.llm_jitter_ms,
+        search_latency_ms=args.search_latency_ms,
+        document_count=args.documents,
+        use_real_embedder=args.real_embedder,
+        max_llm_concurrency=args.max_llm_concurrency,
+        llm_queue_size=args.llm_queue_size,
+        llm_max_wait_seconds=args.llm_max_wait,
+        llm_spike_probability=args.llm_spike_probability,
+        llm_spike_ms=args.llm_spike_ms,
+        llm_prefill_ms_per_1k_chars=args.llm_prefill_ms,
+        hedge=args.hedge,
+        retrieval_policy=RetrievalPolicy(
+            rule=args.cut_rule,
+            cut_value=args.cut_value,
+            top_k=args.top_k,
+            min_k=args.min_k,
+            max_k=args.max_k
+        ),
+        compress_max_chars=args.compress_max_chars
+    ))
+
+    comparison = None
+    if args.compare:
+        with open(args.compare) as f:
+            comparison = compare_results(results, json.load(f))
+        results["comparison"] = comparison
+
+    print_report(results, comparison)
+    print(f"\nResults saved to {save_results(results, args.output_dir)}")
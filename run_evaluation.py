@@ -1,5 +1,32 @@
-from app.evaluators.evaluation import evaluate_all_datasets
+from app.evaluators.evaluation import evaluate_all_datasets, compare_judge_modes_report, JUDGE_MODES
+import argparse
 import asyncio
 
 if __name__ == "__main__":
-    asyncio.run(evaluate_all_datasets())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Evaluate the RAG pipelines with an LLM judge")
+    parser.add_argument("--judge-mode", choices=JUDGE_MODES, default="per_metric",
+                        help="Score each metric with its own prompt or all metrics in one structured call")
+    parser.add_argument("--compare-judge-modes", action="store_true",
+                        help="Compare token usage, latency and score agreement of both judge modes")
+    parser.add_argument("--queries", help="Query set (JSONL or Parquet) to evaluate at dataset scale")
+    parser.add_argument("--concurrency", type=int, default=4, help="Queries evaluated in parallel with --queries")
+    parser.add_argument("--top-k", type=int, default=5, help="Documents retrieved per query with --queries")
+    parser.add_argument("--output-dir", default="evaluation_results", help="Directory for Parquet results")
+    parser.add_argument("--cache", default="evaluation_results/judge_cache.sqlite",
+                        help="On-disk judge cache used with --queries (empty string disables it)")
+    args = parser.parse_args()
+
+    if args.compare_judge_modes:
+        asyncio.run(compare_judge_modes_report())
+    elif args.queries:
+        from app.evaluators.dataset_runner import run_dataset_evaluation
+        asyncio.run(run_dataset_evaluation(
+            args.queries,
+            output_dir=args.output_dir,
+            concurrency=args.concurrency,
+            top_k=args.top_k,
+            judge_mode=args.judge_mode,
+            cache_path=args.cache or None
+        ))
+    else:
+        asyncio.run(evaluate_all_datasets(args.judge_mode))
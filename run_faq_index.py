@@ -0,0 +1,49 @@
+from app.evaluators.faq_calibration import run_faq_calibration, save_report
+import argparse
+import asyncio
+
+
+async def build(batch_size: int):
+    from app.dependencies.qdrant import get_qdrant_client
+    from app.services.embedder_service import EmbedderService
+    from app.services.faq_index import build_faq_collection
+
+    client = await get_qdrant_client()
+    count = await build_faq_collection(client, EmbedderService(), batch_size)
+    print(f"Indexed {count} questions")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and calibrate the FAQ question index of the laws collection")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Embed the stored laws questions into the FAQ collection")
+    build_parser.add_argument("--batch-size", type=int, default=256, help="Questions embedded per batch")
+
+    calibrate_parser = subparsers.add_parser("calibrate", help="Sweep thresholds and recommend FAQ_THRESHOLD")
+    calibrate_parser.add_argument("--sample-size", type=int, default=1000, help="Stored questions for leave-one-out")
+    calibrate_parser.add_argument("--labeled", help="JSONL of labeled queries: {\"query\": ..., \"faq_id\": id or null}")
+    calibrate_parser.add_argument("--target-precision", type=float, default=0.99, help="Required answer precision")
+    calibrate_parser.add_argument("--min-answered", type=int, default=20, help="Fewest answered queries per threshold")
+    calibrate_parser.add_argument("--seed", type=int, default=42, help="Sampling seed")
+    calibrate_parser.add_argument("--output-dir", default="evaluation_results", help="Directory for the JSON report")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        asyncio.run(build(args.batch_size))
+    else:
+        report = asyncio.run(run_faq_calibration(
+            sample_size=args.sample_size,
+            labeled_path=args.labeled,
+            target_precision=args.target_precision,
+            min_answered=args.min_answered,
+            seed=args.seed
+        ))
+        print("\n===== FAQ THRESHOLD CALIBRATION =====")
+        print(f"{'threshold':<12}{'answered':>10}{'coverage':>10}{'precision':>11}")
+        for row in report["sweep"]:
+            precision = "-" if row["precision"] is None else f"{row['precision']:.4f}"
+            print(f"{row['threshold']:<12.2f}{row['answered']:>10}{row['coverage']:>10.3f}{precision:>11}")
+        print(f"\nRecommended FAQ_THRESHOLD for precision >= {report['target_precision']}: "
+              f"{report['recommended_threshold']} (current {report['current_threshold']})")
+        print(f"Report saved to {save_report(report, args.output_dir)}")
@@ -0,0 +1,123 @@
+from app.core.config import settings
+import argparse
+import json
+import os
+from datetime import datetime
+
+
+def alias_of(collection: str) -> str:
+    return settings.COLLECTION_NAME if collection == "judgement" else settings.COLLECTION_NAME2
+
+
+def staged_title_index(collection_name: str) -> str:
+    return os.path.join(os.path.dirname(settings.TITLE_INDEX_PATH), f"{collection_name}.json")
+
+
+def ingest(collection: str, files, shard: str, target: str, workers: int, batch_size: int):
+    from app.dependencies.qdrant import create_qdrant_client
+    from app.services.collection_versions import CollectionManager
+    from app.services.dataset_service import DatasetService
+    from app.services.local_ingestion import LocalIngestion, parse_shard, print_report
+    from app.services.title_index import TitleIndex
+
+    shard = parse_shard(shard)
+    client = create_qdrant_client()
+    alias = alias_of(collection)
+    target = target or alias
+    if target == alias:
+        CollectionManager(client).ensure(alias)
+    elif not client.collection_exists(target):
+        raise SystemExit(f"Collection {target} does not exist; create it with `python run_ingest.py version {collection}`")
+
+    # The title index needs every judgement, so it is only written by an unsharded run
+    title_index = TitleIndex() if collection == "judgement" and shard[1] == 1 else None
+    detector = DatasetService.create_duplicate_detector() if collection == "judgement" else None
+    ingestion = LocalIngestion(
+        client,
+        target,
+        collection,
+        workers=workers,
+        batch_size=batch_size,
+        detector=detector,
+        dedup_mode=settings.DEDUP_MODE,
+        title_index=title_index
+    )
+    report = ingestion.run(files, shard)
+    # Servers drop search results cached from the target within COLLECTION_WATCH_SECONDS
+    CollectionManager(client).bump_epoch(target)
+    print_report(report)
+
+    if detector is not None:
+        DatasetService.save_dedup_report(detector, target)
+        if shard[1] > 1:
+            print("Duplicates are only detected within a shard")
+    if title_index is not None:
+        path = settings.TITLE_INDEX_PATH if target == alias else staged_title_index(target)
+        title_index.save(path)
+        print(f"Saved title index of {len(title_index)} judgements to {path}")
+    elif collection == "judgement":
+        print("Build the title index once all shards are done: `python run_title_index.py build`")
+
+    os.makedirs(settings.DEDUP_REPORT_DIR, exist_ok=True)
+    filename = os.path.join(
+        settings.DEDUP_REPORT_DIR,
+        f"ingest_{target}_shard{shard[0]}of{shard[1]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(filename, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {filename}")
+
+
+def create_version(collection: str):
+    from app.dependencies.qdrant import create_qdrant_client
+    from app.services.collection_versions import CollectionManager
+
+    print(CollectionManager(create_qdrant_client()).create_version(alias_of(collection)))
+
+
+def swap(collection: str, target: str, keep: int):
+    from app.dependencies.qdrant import create_qdrant_client
+    from app.services.collection_versions import CollectionManager
+
+    client = create_qdrant_client()
+    manager = CollectionManager(client)
+    alias = alias_of(collection)
+    previous = manager.swap(alias, target)
+    staged = staged_title_index(target)
+    if collection == "judgement":
+        if os.path.exists(staged):
+            os.replace(staged, settings.TITLE_INDEX_PATH)
+        else:
+            print("No title index was staged for this version: run `python run_title_index.py build`")
+    print(f"{alias} -> {target} (previously {previous}); servers pick it up within {settings.COLLECTION_WATCH_SECONDS:.0f} s")
+    for dropped in manager.drop_retired(alias, keep):
+        print(f"Dropped {dropped}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest local dataset files, optionally sharded over processes or nodes")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Embed and upload one shard of the files")
+    run_parser.add_argument("collection", choices=["judgement", "laws"], help="Dataset the files hold")
+    run_parser.add_argument("files", nargs="+", help="Parquet, Arrow or JSONL files; every shard must get the same list")
+    run_parser.add_argument("--shard", default="1/1", help="Slice i/n of the rows to ingest (1-based)")
+    run_parser.add_argument("--target", help="Collection to write (default: the alias itself)")
+    run_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Embedding processes (0: in process)")
+    run_parser.add_argument("--batch-size", type=int, default=256, help="Rows per worker task and upload")
+
+    version_parser = subparsers.add_parser("version", help="Create the next empty version of a collection and print its name")
+    version_parser.add_argument("collection", choices=["judgement", "laws"])
+
+    swap_parser = subparsers.add_parser("swap", help="Point the alias at an ingested version")
+    swap_parser.add_argument("collection", choices=["judgement", "laws"])
+    swap_parser.add_argument("target", help="Version to activate")
+    swap_parser.add_argument("--keep", type=int, default=1, help="Retired versions to keep for rollback")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        ingest(args.collection, args.files, args.shard, args.target, args.workers, args.batch_size)
+    elif args.command == "version":
+        create_version(args.collection)
+    else:
+        swap(args.collection, args.target, args.keep)
@@ -0,0 +1,47 @@
+from app.core.config import settings
+import argparse
+import asyncio
+import os
+
+
+async def reindex(collection: str, keep: int):
+    from app.dependencies.qdrant import create_qdrant_client
+    from app.services.collection_versions import CollectionManager
+    from app.services.dataset_service import DatasetService
+
+    client = create_qdrant_client()
+    manager = CollectionManager(client)
+    alias = settings.COLLECTION_NAME if collection == "judgement" else settings.COLLECTION_NAME2
+    print(f"Reindexing {alias} (currently {manager.resolve(alias)}) with {settings.EMBEDDING_MODEL}")
+
+    version = manager.create_version(alias)
+    staged_title_index = os.path.join(os.path.dirname(settings.TITLE_INDEX_PATH), f"{version}.json")
+    try:
+        if collection == "judgement":
+            await DatasetService.load_judgements_dataset(client, version, staged_title_index)
+        else:
+            await DatasetService.load_indian_laws_dataset(client, version)
+    except BaseException:
+        print(f"Ingestion failed, dropping {version}; {alias} is unchanged")
+        client.delete_collection(version)
+        raise
+
+    previous = manager.swap(alias, version)
+    if collection == "judgement":
+        os.replace(staged_title_index, settings.TITLE_INDEX_PATH)
+    print(f"{alias} -> {version} (previously {previous}); servers pick it up within {settings.COLLECTION_WATCH_SECONDS:.0f} s")
+    for dropped in manager.drop_retired(alias, keep):
+        print(f"Dropped {dropped}")
+    if collection == "laws" and client.collection_exists(settings.FAQ_COLLECTION_NAME):
+        print("The FAQ index refers to the laws points: rebuild it with `python run_faq_index.py build`")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build a new version of a collection with the current EMBEDDING_MODEL and swap its alias to it"
+    )
+    parser.add_argument("collection", choices=["judgement", "laws"], help="Collection to rebuild")
+    parser.add_argument("--keep", type=int, default=1, help="Retired versions to keep for rollback")
+    args = parser.parse_args()
+
+    asyncio.run(reindex(args.collection, args.keep))
@@ -0,0 +1,14 @@
+from app.benchmarks.response_size import run_response_benchmark, save_results, print_report
+import argparse
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure query response bytes and serialization / compression time")
+    parser.add_argument("--documents", type=int, default=10, help="Documents in the response")
+    parser.add_argument("--words", type=int, default=3000, help="Words per document")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed runs per measurement (median reported)")
+    parser.add_argument("--output-dir", default="benchmark_results", help="Directory for the JSON report")
+    args = parser.parse_args()
+
+    results = run_response_benchmark(args.documents, args.words, args.iterations)
+    print_report(results)
+    print(f"\nResults saved to {save_results(results, args.output_dir)}")
@@ -0,0 +1,58 @@
+from app.evaluators.retrieval_benchmark import run_retrieval_benchmark, check_regression, save_report
+from app.services.adaptive_retrieval import RetrievalPolicy
+import argparse
+import asyncio
+import json
+import sys
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure retrieval quality (recall@k, MRR, nDCG) without the LLM")
+    parser.add_argument("--sample-size", type=int, default=1000, help="Number of labeled questions to evaluate")
+    parser.add_argument("--batch-size", type=int, default=64, help="Questions embedded and searched per batch")
+    parser.add_argument("--top-k", type=int, default=10, help="Documents retrieved per question")
+    parser.add_argument("--seed", type=int, default=42, help="Sampling seed, keep fixed to compare runs")
+    parser.add_argument("--output-dir", default="evaluation_results", help="Directory for the JSON report")
+    parser.add_argument("--policy", action="append", default=[], metavar="RULE:VALUE",
+                        help="Adaptive cut to evaluate, e.g. gap:0.05 or relative:0.9 (repeatable)")
+    parser.add_argument("--min-k", type=int, default=2, help="Fewest hits kept by an adaptive cut")
+    parser.add_argument("--max-k", type=int, default=10, help="Most hits kept by an adaptive cut")
+    parser.add_argument("--baseline", help="Previous report; exit with status 1 if any metric regressed")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="Allowed absolute drop per metric")
+    args = parser.parse_args()
+
+    policies = []
+    for spec in args.policy:
+        rule, _, value = spec.partition(":")
+        policies.append(RetrievalPolicy(rule=rule, cut_value=float(value or 0), min_k=args.min_k, max_k=args.max_k))
+
+    report = asyncio.run(run_retrieval_benchmark(
+        sample_size=args.sample_size,
+        batch_size=args.batch_size,
+        top_k=args.top_k,
+        ks=[k for k in (1, 3, 5, 10) if k <= args.top_k],
+        seed=args.seed,
+        policies=policies
+    ))
+
+    print("\n===== RETRIEVAL BENCHMARK =====")
+    for metric, value in report["metrics"].items():
+        print(f"{metric:<12}{value:.4f}")
+    for result in report["policies"]:
+        policy = result["policy"]
+        print(f"{policy['rule']}:{policy['cut_value']:<8} mean k {result['k'].get('mean', 0):.2f}  "
+              f"p95 k {result['k'].get('p95', 0):.0f}  recall@chosen k {result['recall_at_chosen_k']:.4f}")
+    latency = report["latency"]
+    print(f"Embedding: {latency['embedding_ms_per_query']:.2f} ms/query (batched)")
+    print(f"Search: {latency['batch_search_ms_per_query']:.2f} ms/query (batched), "
+          f"p50 {latency['single_search_ms'].get('p50', 0):.2f} ms / p95 {latency['single_search_ms'].get('p95', 0):.2f} ms (single)")
+    print(f"\nReport saved to {save_report(report, args.output_dir)}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = check_regression(report, json.load(f), args.tolerance)
+        if failures:
+            print("\nRetrieval regression detected:")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print("\nNo retrieval regression against baseline")
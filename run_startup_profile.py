@@ -0,0 +1,64 @@
+from app.core.startup_profiler import startup_profiler, profile_imports
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import time
+from datetime import datetime
+
+
+async def profile_startup(main):
+    """Run the app's startup hook, then its shutdown hook, so background tasks stop and flush cleanly."""
+    try:
+        await main.startup_events()
+    finally:
+        await main.shutdown_events()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile server cold start: module imports and startup phases")
+    parser.add_argument("--imports-only", action="store_true",
+                        help="Only profile imports (startup phases need a reachable Qdrant)")
+    parser.add_argument("--top", type=int, default=25, help="Number of slowest imports to report")
+    parser.add_argument("--output-dir", default="benchmark_results", help="Directory for the JSON report")
+    args = parser.parse_args()
+
+    # Fresh interpreter, so the numbers match a replica starting cold
+    import_profile = profile_imports("app.main", args.top)
+
+    report = {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "imports": import_profile,
+    }
+
+    if not args.imports_only:
+        start = time.perf_counter()
+        main = importlib.import_module("app.main")
+        startup_profiler.record("import_app", (time.perf_counter() - start) * 1000)
+        asyncio.run(profile_startup(main))
+        report["startup"] = startup_profiler.report()
+
+    from app.benchmarks.load_test import current_commit
+    report["commit"] = current_commit()
+
+    print("\n===== STARTUP PROFILE =====")
+    print(f"import app.main: {import_profile['total_ms']:.1f} ms ({import_profile['modules_imported']} modules)")
+    print(f"\n{'cumulative ms':>14}{'self ms':>10}  module")
+    for item in import_profile["top_imports"]:
+        print(f"{item['cumulative_ms']:>14.1f}{item['self_ms']:>10.1f}  {'  ' * item['depth']}{item['module']}")
+
+    if "startup" in report:
+        print(f"\n{'phase':<32}{'ms':>10}")
+        for phase in report["startup"]["phases"]:
+            print(f"{phase['phase']:<32}{phase['time_ms']:>10.1f}")
+        print(f"{'total':<32}{report['startup']['total_ms']:>10.1f}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    filename = os.path.join(
+        args.output_dir,
+        f"startup_profile_{report['commit'] or 'nocommit'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(filename, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {filename}")
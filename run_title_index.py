@@ -0,0 +1,50 @@
+from app.core.config import settings
+import argparse
+import asyncio
+import time
+
+
+async def build(batch_size: int, output: str):
+    from app.dependencies.qdrant import get_qdrant_client
+    from app.services.title_index import build_title_index
+
+    client = await get_qdrant_client()
+    index = build_title_index(client, settings.COLLECTION_NAME, batch_size)
+    index.save(output)
+    print(f"Indexed {len(index)} titles, saved to {output}")
+
+
+def lookup(path: str, queries, limit: int):
+    from app.services.title_index import TitleIndex
+
+    start = time.perf_counter()
+    index = TitleIndex.load(path, threshold=settings.TITLE_MATCH_THRESHOLD)
+    print(f"Loaded {index.stats()} in {(time.perf_counter() - start) * 1000:.0f} ms")
+    for query in queries:
+        start = time.perf_counter()
+        matches = index.lookup(query, limit)
+        print(f"\n{query} ({(time.perf_counter() - start) * 1000:.2f} ms)")
+        for match in matches:
+            print(f"  {match.score:.3f}  {match.id}  {match.title}")
+        if not matches:
+            print("  no confident match")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query the judgement title index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Index the titles of the stored judgements")
+    build_parser.add_argument("--batch-size", type=int, default=1000, help="Points scrolled per request")
+    build_parser.add_argument("--output", default=settings.TITLE_INDEX_PATH, help="Index file")
+
+    lookup_parser = subparsers.add_parser("lookup", help="Show the confident title matches of queries")
+    lookup_parser.add_argument("queries", nargs="+", help="Queries to look up")
+    lookup_parser.add_argument("--index", default=settings.TITLE_INDEX_PATH, help="Index file")
+    lookup_parser.add_argument("--limit", type=int, default=settings.TITLE_MATCH_LIMIT, help="Matches shown per query")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        asyncio.run(build(args.batch_size, args.output))
+    else:
+        lookup(args.index, args.queries, args.limit)
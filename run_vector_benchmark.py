@@ -0,0 +1,13 @@
+from app.benchmarks.vector_transport import run_vector_benchmark, save_results, print_report
+import argparse
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the cost of sending embeddings to Qdrant as lists vs float32 arrays")
+    parser.add_argument("--batch-size", type=int, default=100, help="Embeddings per upsert batch")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed runs per measurement (median reported)")
+    parser.add_argument("--output-dir", default="benchmark_results", help="Directory for the JSON report")
+    args = parser.parse_args()
+
+    results = run_vector_benchmark(args.batch_size, iterations=args.iterations)
+    print_report(results)
+    print(f"\nResults saved to {save_results(results, args.output_dir)}")
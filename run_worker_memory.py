@@ -0,0 +1,136 @@
+"""
+Measure per-worker memory of the embedding model with and without preload-then-fork.
+Workers are forked the way gunicorn forks them, each warms up and encodes a batch of queries,
+then RSS, PSS and private memory are read from /proc (Linux only).
+Pass --pid to measure a running gunicorn master and its workers instead.
+"""
+from app.services.embedder_service import EmbedderService
+import argparse
+import gc
+import json
+import os
+import signal
+import time
+from datetime import datetime
+from typing import Dict, List
+
+QUERIES = [
+    "What are the grounds for granting anticipatory bail?",
+    "How is cheating under section 420 IPC proved at trial?",
+    "What is the procedure for filing a plaint in a civil case in India?",
+] * 8
+
+
+def read_memory(pid: int) -> Dict[str, float]:
+    """Return RSS, PSS, private and shared memory of a process in MiB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss_mib": fields.get("Rss", 0.0),
+        "pss_mib": fields.get("Pss", 0.0),
+        "private_mib": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+        "shared_mib": fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0),
+    }
+
+
+def child_pids(pid: int) -> List[int]:
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children.extend(int(child) for child in f.read().split())
+    return children
+
+
+def run_workers(workers: int, preload: bool) -> Dict:
+    """Fork `workers` processes that load (or inherit) the model, warm up and encode, then measure them."""
+    embedder = EmbedderService()
+    if preload:
+        embedder.model
+        gc.freeze()
+
+    pids = []
+    ready_fds = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            embedder.warm_up()
+            embedder.model.encode(QUERIES)
+            os.write(write_fd, b"1")
+            signal.pause()
+            os._exit(0)
+        os.close(write_fd)
+        pids.append(pid)
+        ready_fds.append(read_fd)
+
+    for fd in ready_fds:
+        os.read(fd, 1)
+        os.close(fd)
+    time.sleep(0.5)
+
+    result = {
+        "mode": "preload" if preload else "per_worker",
+        "workers": [read_memory(pid) for pid in pids],
+    }
+    for pid in pids:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+    return result
+
+
+def summarize_workers(result: Dict) -> Dict[str, float]:
+    workers = result["workers"]
+    return {
+        key: sum(worker[key] for worker in workers) / len(workers)
+        for key in ("rss_mib", "pss_mib", "private_mib", "shared_mib")
+    } | {"total_pss_mib": sum(worker["pss_mib"] for worker in workers)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure per-worker memory with and without preloaded model weights")
+    parser.add_argument("--workers", type=int, default=4, help="Number of forked workers")
+    parser.add_argument("--mode", choices=["preload", "per_worker", "both"], default="both")
+    parser.add_argument("--pid", type=int, help="Measure a running gunicorn master and its workers instead")
+    parser.add_argument("--output-dir", default="benchmark_results", help="Directory for the JSON report")
+    args = parser.parse_args()
+
+    if args.pid:
+        results = [{
+            "mode": "gunicorn",
+            "master": read_memory(args.pid),
+            "workers": [read_memory(pid) for pid in child_pids(args.pid)],
+        }]
+    else:
+        modes = ["per_worker", "preload"] if args.mode == "both" else [args.mode]
+        # Each mode runs in its own child so the parent's model does not leak into the other measurement
+        results = []
+        for mode in modes:
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                os.write(write_fd, json.dumps(run_workers(args.workers, mode == "preload")).encode())
+                os._exit(0)
+            os.close(write_fd)
+            with os.fdopen(read_fd) as f:
+                results.append(json.loads(f.read()))
+            os.waitpid(pid, 0)
+
+    print(f"\n===== WORKER MEMORY ({os.environ.get('EMBEDDING_MODEL') or 'default embedding model'}) =====")
+    print(f"{'mode':<12}{'workers':>8}{'RSS':>10}{'PSS':>10}{'private':>10}{'shared':>10}{'total PSS':>12}  (MiB, per worker)")
+    for result in results:
+        summary = summarize_workers(result)
+        result["summary"] = summary
+        print(f"{result['mode']:<12}{len(result['workers']):>8}{summary['rss_mib']:>10.1f}{summary['pss_mib']:>10.1f}"
+              f"{summary['private_mib']:>10.1f}{summary['shared_mib']:>10.1f}{summary['total_pss_mib']:>12.1f}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    filename = os.path.join(args.output_dir, f"worker_memory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(filename, "w") as f:
+        json.dump({"timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "results": results}, f, indent=2)
+    print(f"\nReport saved to {filename}")
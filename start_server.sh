@@ -1,4 +1,9 @@
 #!/bin/bash
 cd /root/NyAI-Saathi-Server
 source .venv/bin/activate
-exec uvicorn app.main:app --host 0.0.0.0 --port 8000
\ No newline at end of file
+WORKERS=${WORKERS:-1}
+if [ "$WORKERS" -gt 1 ]; then
+    # Preload-then-fork: model weights are loaded once and shared by all workers
+    exec gunicorn app.main:app -c gunicorn.conf.py
+fi
+exec uvicorn app.main:app --host 0.0.0.0 --port 8000